@@ -0,0 +1,195 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Benchmarks of the simulation and optimization codes. Run this file to time
+the hot paths and compare them with the baseline file: the evaluation rate of
+the material balances, the simulation of each schedule, the construction of
+FunctionforPF for growing nfe and the IPOPT solve of each epsilon point. The
+objective values of the schedules are checked as well.'''
+
+import numpy as np
+import json
+import os
+import time
+import tracemalloc
+import pyomo.environ as pe
+import Kinetics_CascadeMOO as Kinetics
+import Simulation_CascadeMOO as SIM
+import Optimization2_CascadeMOO as FfPF
+import Optimization1_CascadeMOO as OPT
+
+# the schedules (control vectors in the order of Kinetics.U_names) that are
+# simulated; add the Pareto-optimal schedules of Tables 6-13 of the
+# supplementary material here. Each entry holds the label and the control
+# vector.
+Schedules = [('Simulation_CascadeMOO', SIM.Control_vector())]
+
+# the relative slow-down against the baseline that is reported as regression
+# and the tolerances of the objective check
+Regression = 0.2
+Objective_rtol = 1e-4
+
+
+def Time_call(function, repeat = 5, number = 1):
+    '''Returns the best wall time (s) of one call of function over repeat
+    rounds of number calls.'''
+    best = np.inf
+    for k in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            function()
+        best = min(best, (time.perf_counter()-start)/number)
+    return best
+
+def Objectives(u, X):
+    '''The space-time yield (mM/min) and the yield of the trajectory X of the
+    schedule u, defined as in FunctionforPF.'''
+    return {'SpaceTimeYield': X[-1,6]/(u[0]+30),
+            'Yield': (X[-1,6]-X[0,6])/X[0,1]}
+
+def Benchmark_material_balances(n = 20000, lanes = 1000):
+    '''Evaluations per second of the dict-based Material_balances, of the
+    array kernel used by Simulate and of Material_balances_array on a batch
+    of lanes states.'''
+    results = {}
+    u = SIM.Control_vector()
+    p = Kinetics.Parameter_vector()
+    X = SIM.Initial_state(u)
+    X[2:7] = 1
+    t = 0.5*u[0]
+    seconds = Time_call(lambda: [SIM.Material_balances(X, t) for k in range(n)])
+    results['material_balances_dict'] = {'value': n/seconds, 'unit': 'evals/s', 'higher': True}
+    rhs, jac = SIM.Array_kernel(p, u)
+    seconds = Time_call(lambda: [rhs(X, t) for k in range(n)])
+    results['material_balances_kernel'] = {'value': n/seconds, 'unit': 'evals/s', 'higher': True}
+    U = np.repeat(u[:, None], lanes, axis=1)
+    XB = np.repeat(X[:, None], lanes, axis=1)
+    dXdt = np.zeros_like(XB)
+    seconds = Time_call(lambda: SIM.Material_balances_array(XB, t, p, U, dXdt), 5, 20)
+    results['material_balances_array'] = {'value': lanes/seconds, 'unit': 'evals/s', 'higher': True}
+    return results
+
+def Benchmark_simulation(n = 100):
+    '''Wall time of the simulation of each schedule with odeint (Simulate) and
+    of all schedules at once (Simulate_batch), with the odeint counters and
+    the objective values of each schedule.'''
+    results = {}
+    for label, u in Schedules:
+        t = np.linspace(0, u[0], n)
+        seconds = Time_call(lambda: SIM.Simulate(u, t), 3)
+        X, info = SIM.Simulate(u, t, full_output = True)
+        results['simulate_' + label] = {'value': seconds, 'unit': 's', 'higher': False, **info}
+        for name, value in Objectives(u, X).items():
+            results['objective_{}_{}'.format(name, label)] = {'value': float(value), 'unit': '-',
+                                                              'objective': True}
+    U = np.array([u for label, u in Schedules])
+    seconds = Time_call(lambda: SIM.Simulate_batch(U, n), 3)
+    results['simulate_batch'] = {'value': seconds/len(Schedules), 'unit': 's/schedule',
+                                 'higher': False}
+    return results
+
+def Benchmark_build(nfes = (50, 100, 200, 500, 1000, 2000), compact = False):
+    '''Construction time (best of three) and peak memory of FunctionforPF for 
+    each number of finite elements. The memory is traced in a separate 
+    construction, so that tracing does not slow down the timed ones.'''
+    results = {}
+    for nfe in nfes:
+        build = lambda: FfPF.FunctionforPF(0.05, **OPT.Initial_guess, compact=compact, nfe=nfe)
+        seconds = Time_call(build, 3)
+        tracemalloc.start()
+        model = build()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = {'variables': model.nvariables(), 'constraints': model.nconstraints()}
+        del model
+        results['build_nfe{}'.format(nfe)] = {'value': seconds, 'unit': 's', 'higher': False, **size}
+        results['memory_nfe{}'.format(nfe)] = {'value': peak/2**20, 'unit': 'MiB', 'higher': False}
+    return results
+
+def Benchmark_solve(epsilons = (0, 0.05, 0.1, 0.15), **options):
+    '''IPOPT solve time of each epsilon point from Initial_guess (cold) and
+    warm-started from the previous point, with the objective values. Skipped
+    if IPOPT is not available.'''
+    results = {}
+    if not pe.SolverFactory('ipopt').available(exception_flag=False):
+        return results
+    model = None
+    for ECi in epsilons:
+        start = time.perf_counter()
+        cold, cold_results = OPT.Solve_point(ECi, dict(OPT.Initial_guess), False, **options)
+        results['solve_cold_EC{}'.format(ECi)] = {'value': time.perf_counter()-start,
+                                                   'unit': 's', 'higher': False,
+                                                   'termination': str(cold_results.solver.termination_condition)}
+        results['objective_SpaceTimeYield_EC{}'.format(ECi)] = {'value': pe.value(cold.obj),
+                                                                 'unit': '-', 'objective': True}
+        if model is not None:
+            start = time.perf_counter()
+            warm_results = OPT.Resolve_point(model, ECi, False)
+            results['solve_warm_EC{}'.format(ECi)] = {'value': time.perf_counter()-start,
+                                                       'unit': 's', 'higher': False,
+                                                       'termination': str(warm_results.solver.termination_condition)}
+        model = cold
+    return results
+
+def Compare(results, baseline):
+    '''Compares the results with the baseline. Returns the list of the
+    benchmarks that are slower (or faster, for rates) than the baseline by
+    more than Regression and of the objective values that differ by more
+    than Objective_rtol, as (name, baseline value, value) tuples.'''
+    failures = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference, value = baseline[name]['value'], result['value']
+        if result.get('objective'):
+            if not np.isclose(value, reference, rtol=Objective_rtol, atol=1e-9):
+                failures.append((name, reference, value))
+        elif result['higher'] and value < reference*(1-Regression):
+            failures.append((name, reference, value))
+        elif not result['higher'] and value > reference*(1+Regression):
+            failures.append((name, reference, value))
+    return failures
+
+
+if __name__ == '__main__':
+    # the baseline file and whether it is replaced by the results of this run
+    # (it is written if it does not exist)
+    baseline_file = 'Benchmark_baseline.json'
+    update_baseline = False
+    # the benchmarks that are run
+    nfes = (50, 100, 200, 500, 1000, 2000)
+    epsilons = (0, 0.05, 0.1, 0.15)
+
+    results = {}
+    results.update(Benchmark_material_balances())
+    results.update(Benchmark_simulation())
+    results.update(Benchmark_build(nfes))
+    results.update(Benchmark_solve(epsilons))
+
+    for name, result in results.items():
+        print('{:40s} {:14.6g} {}'.format(name, result['value'], result['unit']))
+    # the schedules must satisfy the yield constraint of the optimization
+    for label, u in Schedules:
+        if results['objective_Yield_' + label]['value'] < 0.95:
+            print('Yield of the schedule {} below the bound 0.95 of the optimization'.format(label))
+
+    if update_baseline or not os.path.isfile(baseline_file):
+        with open(baseline_file, 'w') as file:
+            json.dump(results, file, indent = 1)
+        print('Baseline written to', baseline_file)
+    else:
+        with open(baseline_file) as file:
+            baseline = json.load(file)
+        failures = Compare(results, baseline)
+        for name, reference, value in failures:
+            print('REGRESSION {:40s} baseline {:.6g}, now {:.6g}'.format(name, reference, value))
+        if not failures:
+            print('No regressions against', baseline_file)
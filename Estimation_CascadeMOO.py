@@ -0,0 +1,173 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Estimation of the kinetic parameters from the time courses of several
+experimental runs at once. The material balances of the simulation code are
+integrated together with their forward sensitivities with respect to the
+fitted parameters (the parameter Jacobian is generated from the rate laws
+like the Jacobian of the states), so the least-squares Jacobian is exact and
+no finite differences are needed. The runs are integrated in parallel
+worker processes. The fitted parameters are written with
+Kinetics.Save_parameters to a file that the simulation and the optimization
+codes read with Kinetics.Load_parameters (see parameter_file in both).'''
+
+import numpy as np
+import math as mt
+import time
+from scipy.integrate import odeint
+import scipy.optimize as opt
+from concurrent.futures import ProcessPoolExecutor
+import Kinetics_CascadeMOO as Kinetics
+import Simulation_CascadeMOO as SIM
+
+# the parameters that are fitted by default (names of P_names)
+Fit_names = ['Vmax_UDH', 'Vmax_GlucD', 'Vmax_KdgD', 'Vmax_KgsalDH', 'Vmax_NOX', 
+             'kNOX', 'kII']
+
+# the measurable species by column name and their index in the state vector
+Species_index = dict({name: i for i, name in enumerate(Kinetics.Substrates, 1)}, 
+                     ENOX = Kinetics.Enzyme_index['NOX'])
+
+
+def Experiment(u, t, Y, species, X0 = None, sigma = 1):
+    '''An experimental run: the control vector u (U_names), the measurement
+    times t (m,) in min, the measured concentrations Y (m x k, NaN where not
+    measured) of the species (k names of Species_index), the initial state
+    X0 (by default SIM.Initial_state(u) with the titers of the simulation
+    code) and the standard deviation sigma of the measurements (scalar or
+    per species).'''
+    u = np.asarray(u, dtype=float)
+    return {'u': u, 't': np.asarray(t, dtype=float), 
+            'Y': np.asarray(Y, dtype=float).reshape(len(t), len(species)), 
+            'index': [Species_index[name] for name in species], 
+            'X0': SIM.Initial_state(u) if X0 is None else np.asarray(X0, dtype=float), 
+            'sigma': np.broadcast_to(np.asarray(sigma, dtype=float), (len(species),))}
+
+def Read_experiment(filename, u, X0 = None, sigma = 1):
+    '''Reads an experimental run from a CSV file with a header line: the
+    column 'time' (min) and one column per measured species (S1-S9, ENOX);
+    empty fields are missing measurements.'''
+    data = np.genfromtxt(filename, delimiter = ',', names = True)
+    species = [name for name in data.dtype.names if name != 'time']
+    Y = np.array([data[name] for name in species]).T
+    return Experiment(u, data['time'], Y, species, X0, sigma)
+
+def Sensitivity_rhs(y, t, p, u, fit, f, J, Jp):
+    '''Right-hand side of the states and their sensitivities S = dX/dp[fit]
+    (15 x n, stored by columns).'''
+    X = y[:15].tolist()
+    S = y[15:].reshape(len(fit), 15)
+    SIM.Balances_kernel(X, t, p, u, f, mt.tanh)
+    SIM.Jacobian_kernel(X, t, p, u, J, mt.tanh)
+    SIM.Parameter_jacobian_kernel(X, t, p, u, Jp, mt.tanh)
+    return np.concatenate((f, (S @ J.T + Jp[:,fit].T).ravel()))
+
+def Sensitivity_jacobian(y, t, p, u, fit, f, J, Jp):
+    '''Banded Jacobian of Sensitivity_rhs: one block J per column, without
+    the second derivatives of the sensitivity equations.'''
+    SIM.Jacobian_kernel(y[:15].tolist(), t, p, u, J, mt.tanh)
+    blocks = len(fit)+1
+    rows = np.tile(14+np.subtract.outer(np.arange(15), np.arange(15)).ravel(), blocks)
+    columns = (np.tile(np.arange(15), 15)+15*np.arange(blocks)[:,None]).ravel()
+    band = np.zeros((29, 15*blocks))
+    band[rows, columns] = np.tile(J.ravel(), blocks)
+    return band
+
+def Simulate_sensitivities(experiment, p, fit, rtol = 1e-8, atol = 1e-10):
+    '''Integrates the run for the parameter vector p. Returns the states at
+    the measurement times (m x 15) and their sensitivities with respect to
+    the parameters fit (indices of P_names, m x 15 x n).'''
+    p = [float(pk) for pk in p]
+    u = [float(uk) for uk in experiment['u']]
+    t = np.concatenate(([0], experiment['t']))
+    y0 = np.concatenate((experiment['X0'], np.zeros(15*len(fit))))
+    f, J, Jp = np.zeros(15), np.zeros((15, 15)), np.zeros((15, len(p)))
+    y = odeint(Sensitivity_rhs, y0, t, args = (p, u, fit, f, J, Jp), 
+               Dfun = Sensitivity_jacobian, ml = 14, mu = 14, rtol = rtol, atol = atol, 
+               hmax = u[0]/100, mxstep = 100000)[1:]
+    return y[:,:15], y[:,15:].reshape(len(t)-1, len(fit), 15).transpose(0, 2, 1)
+
+def Experiment_residuals(experiment, p, fit):
+    '''The weighted residuals of the run and their derivatives with respect
+    to the logarithms of the parameters fit.'''
+    X, S = Simulate_sensitivities(experiment, p, fit)
+    index, sigma = experiment['index'], experiment['sigma']
+    r = (X[:,index]-experiment['Y'])/sigma
+    D = S[:,index,:]*np.asarray(p)[fit]/sigma[:,None]
+    missing = np.isnan(r)
+    r[missing] = 0
+    D[missing] = 0
+    return r.ravel(), D.reshape(-1, len(fit))
+
+def Estimate(experiments, fit = Fit_names, p = None, max_workers = None, 
+             factor = 10, **options):
+    '''Fits the parameters fit (names of P_names) to all experiments by
+    weighted least squares (scipy.optimize.least_squares, options are passed
+    on) on the logarithms of the parameters, which may change by at most
+    factor from their initial values p (by default the parameters of
+    Kinetics_CascadeMOO.py). The runs are integrated in a process pool.
+    Returns the fitted parameter vector, the relative standard errors of the
+    fitted parameters and the result of least_squares.'''
+    p0 = Kinetics.Parameter_vector() if p is None else np.asarray(p, dtype=float)
+    index = [Kinetics.P_names.index(name) for name in fit]
+    cache = {}
+    def evaluate(theta):
+        key = theta.tobytes()
+        if key not in cache:
+            cache.clear()
+            p = p0.copy()
+            p[index] = p0[index]*np.exp(theta)
+            parts = list(pool.map(Experiment_residuals, experiments, 
+                                  [p]*len(experiments), [index]*len(experiments)))
+            cache[key] = (np.concatenate([r for r, D in parts]), 
+                          np.vstack([D for r, D in parts]))
+        return cache[key]
+    bound = np.log(factor)*np.ones(len(index))
+    with ProcessPoolExecutor(max_workers = max_workers) as pool:
+        result = opt.least_squares(lambda theta: evaluate(theta)[0], np.zeros(len(index)), 
+                                   jac = lambda theta: evaluate(theta)[1], 
+                                   bounds = (-bound, bound), **options)
+    p = p0.copy()
+    p[index] = p0[index]*np.exp(result.x)
+    dof = max(np.count_nonzero(result.fun)-len(index), 1)
+    covariance = np.linalg.pinv(result.jac.T @ result.jac)*2*result.cost/dof
+    return p, np.sqrt(np.diag(covariance)), result
+
+
+if __name__ == '__main__':
+    # the experimental runs: CSV file (see Read_experiment), control vector
+    # and initial state (None for the titers of Simulation_CascadeMOO.py);
+    # without runs a synthetic run of the schedule of Simulation_CascadeMOO.py
+    # with 20 % lower Vmax values and 2 % noise is fitted
+    runs = []
+    # the fitted parameters and the file that receives the fitted set
+    fit = Fit_names
+    parameter_file = 'FittedParameters.json'
+
+    if runs:
+        experiments = [Read_experiment(filename, u, X0) for filename, u, X0 in runs]
+    else:
+        rng = np.random.default_rng(0)
+        u = SIM.Control_vector()
+        t = np.linspace(10, u[0], 30)
+        p_true = Kinetics.Parameter_vector()
+        p_true[:5] *= 0.8
+        X = SIM.Simulate(u, np.concatenate(([0], t)), p_true)[1:]
+        Y = X[:,[1, 6, 7, 9]]*(1+0.02*rng.standard_normal((len(t), 4)))
+        experiments = [Experiment(u, t, Y, ['S1', 'S6', 'S7', 'S9'], sigma = 0.02*Y.mean(axis=0))]
+
+    start = time.perf_counter()
+    p, errors, result = Estimate(experiments, fit, verbose = 1)
+    print('Fitted in {:.1f} s ({} evaluations):'.format(time.perf_counter()-start, result.nfev))
+    for name, error in zip(fit, errors):
+        k = Kinetics.P_names.index(name)
+        print('{:14s} {:12.6g} +- {:.1f} %'.format(name, p[k], 100*error))
+    Kinetics.Save_parameters(parameter_file, p)
@@ -0,0 +1,345 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''The kinetic model of the cascade in one place: the kinetic parameters, the
+species, the rate laws, the stoichiometry and the NOX supplementation pulses.
+The simulation code (Simulation_CascadeMOO.py) compiles it into the array
+kernel and its Jacobian, the optimization code (Optimization2_CascadeMOO.py)
+builds the rate and material balance constraints from it. Changes of the
+model are made here and apply to both.'''
+
+import numpy as np
+import json
+import re
+
+#------------------------------------------------------------------ Parameters
+
+# Maximum reaction rates (U/mg)
+Vmax = {}
+Vmax['UDH'] =     221.331
+Vmax['GlucD'] =     8.876
+Vmax['KdgD'] =      5.109
+Vmax['KgsalDH'] =  40.701
+Vmax['NOX'] =      16.409
+# Kinetic parameters (mM), keyed by the enzyme and the index of the species
+Km = {}
+Km['UDH',1] =       0.0780
+Km['UDH',7] =       0.5884
+Km['GlucD',3] =     0.2945
+Km['KdgD',4] =      0.4652
+Km['KgsalDH',5] =   0.4812
+Km['KgsalDH',7] =   0.1760
+Km['NOX',7] =       0.1420
+Km['NOX',8] =       0.0050
+Km['NOX',9] =       0.0045
+# Molecular weights (mg/mmol)
+MW = {}
+MW['UDH'] =     31210
+MW['GlucD'] =   51010
+MW['KdgD'] =    34790
+MW['KgsalDH'] = 57700
+MW['NOX'] =     51940
+# First order decay constant for NOX (min^(-1))
+kNOX = 0.030
+# Rate constant for the glucaro-1,4-lactone opening (min^(-1))
+kII = 0.013
+# Total pressure of the gas bubbles (atm), mole fraction of oxygen in the air
+# (mol/mol) and Henry's constant (m^3 atm / (mol))
+ptot = 1
+y9 = 0.2099
+Hc = 0.774
+# Oxygen solubilty (mM)
+S9_Star = ptot*y9/Hc
+
+# Order of the kinetic parameters in the parameter vector p, with the dict
+# and the key of each parameter (None for the scalars)
+P_names = ['Vmax_UDH', 'Vmax_GlucD', 'Vmax_KdgD', 'Vmax_KgsalDH', 'Vmax_NOX',
+           'Km_UDH_1', 'Km_UDH_7', 'Km_GlucD_3', 'Km_KdgD_4', 'Km_KgsalDH_5',
+           'Km_KgsalDH_7', 'Km_NOX_7', 'Km_NOX_8', 'Km_NOX_9', 'kNOX', 'kII']
+P_keys = [('Vmax','UDH'), ('Vmax','GlucD'), ('Vmax','KdgD'), ('Vmax','KgsalDH'),
+          ('Vmax','NOX'), ('Km',('UDH',1)), ('Km',('UDH',7)), ('Km',('GlucD',3)),
+          ('Km',('KdgD',4)), ('Km',('KgsalDH',5)), ('Km',('KgsalDH',7)),
+          ('Km',('NOX',7)), ('Km',('NOX',8)), ('Km',('NOX',9)), ('kNOX',None),
+          ('kII',None)]
+
+def Parameter_list():
+    '''The kinetic parameters defined above as a list in the order of P_names.'''
+    values = {'Vmax': Vmax, 'Km': Km, 'kNOX': kNOX, 'kII': kII}
+    return [values[name] if key is None else values[name][key] for name, key in P_keys]
+
+def Parameter_vector():
+    '''Packs the kinetic parameters defined above into the parameter vector p.'''
+    return np.array(Parameter_list())
+
+def Parameter_dicts(p):
+    '''The parameter vector p unpacked into the dicts Vmax and Km and the 
+    scalars kNOX and kII, keyed like the definitions above.'''
+    values = {'Vmax': {}, 'Km': {}}
+    for (name, key), x in zip(P_keys, p):
+        if key is None:
+            values[name] = float(x)
+        else:
+            values[name][key] = float(x)
+    return values
+
+def Set_parameters(p):
+    '''Replaces the kinetic parameters defined above by the parameter vector 
+    p. The dicts are updated in place, so that the simulation and the 
+    optimization code, which share them, use the new values.'''
+    global kNOX, kII
+    values = Parameter_dicts(p)
+    Vmax.update(values['Vmax'])
+    Km.update(values['Km'])
+    kNOX, kII = values['kNOX'], values['kII']
+
+def Save_parameters(filename, p = None):
+    '''Writes the parameter vector p (by default the parameters defined 
+    above) to filename as a JSON object keyed by P_names.'''
+    p = Parameter_list() if p is None else p
+    with open(filename, 'w') as file:
+        json.dump({name: float(x) for name, x in zip(P_names, p)}, file, indent = 1)
+
+def Load_parameters(filename):
+    '''Reads a file written by Save_parameters (e.g. the parameters fitted 
+    with Estimation_CascadeMOO.py) and replaces the parameters defined above 
+    by its values (Set_parameters); parameters missing in the file keep 
+    their values. Returns the new parameter vector.'''
+    with open(filename) as file:
+        values = json.load(file)
+    p = [values.get(name, x) for name, x in zip(P_names, Parameter_list())]
+    Set_parameters(p)
+    return np.array(p)
+
+def Constants(p, kLa):
+    '''The constants of the rate laws by name for the parameter vector p and
+    the oxygen mass transfer coefficient kLa.'''
+    k = dict(zip(P_names, p))
+    for enzyme in Enzymes:
+        k['MW_' + enzyme] = MW[enzyme]
+    k['S9_Star'] = S9_Star
+    k['kLa'] = kLa
+    return k
+
+#--------------------------------------------------------------------- Species
+# The state vector X: index 0 is unused, 1-9 hold the substrates S1-S9 (mM)
+# and 10-14 the enzymes (μM)
+Substrates = ['S1', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7', 'S8', 'S9']
+Enzymes = ['UDH', 'GlucD', 'KdgD', 'KgsalDH', 'NOX']
+Enzyme_index = {'UDH': 10, 'GlucD': 11, 'KdgD': 12, 'KgsalDH': 13, 'NOX': 14}
+# Order of the control variables in the control vector u
+U_names = ['t_f', 'E_UDH_initial', 'E_GlucD_initial', 'E_KdgD_initial',
+           'E_KgsalDH_initial', 'E_NOX_initial', 'A_1', 'A_2', 'A_3',
+           't_1', 't_2', 't_3', 'kLa']
+
+#------------------------------------------------------------------- Rate laws
+'''The rate laws only use +, -, * and /, so the same functions are evaluated
+on floats, on numpy arrays, on Pyomo expressions and on the terms of the
+compiler below. X is indexed like the state vector and k holds the constants
+of Constants by name. The rates are in mM/min, the NOX rates in μM/min.'''
+
+def Rate_I(X, k):
+    '''UDH: S1 + S7 -> S2 + S8'''
+    return k['MW_UDH']/1000000*k['Vmax_UDH']*X[10]*X[1]*X[7]/(k['Km_UDH_7']*X[7]+k['Km_UDH_1']*X[1]+X[1]*X[7])
+
+def Rate_II(X, k):
+    '''lactone opening: S2 -> S3'''
+    return k['kII']*X[2]
+
+def Rate_III(X, k):
+    '''GlucD: S3 -> S4'''
+    return k['MW_GlucD']/1000000*k['Vmax_GlucD']*X[11]*X[3]/(k['Km_GlucD_3']+X[3])
+
+def Rate_IV(X, k):
+    '''KdgD: S4 -> S5'''
+    return k['MW_KdgD']/1000000*k['Vmax_KdgD']*X[12]*X[4]/(k['Km_KdgD_4']+X[4])
+
+def Rate_V(X, k):
+    '''KgsalDH: S5 + S7 -> S6 + S8'''
+    return k['MW_KgsalDH']/1000000*k['Vmax_KgsalDH']*X[13]*X[5]*X[7]/(k['Km_KgsalDH_7']*X[7]+k['Km_KgsalDH_5']*X[5]+X[5]*X[7])
+
+def Rate_VI(X, k):
+    '''NOX: S8 + 1/2 S9 -> S7'''
+    return k['MW_NOX']/1000000*k['Vmax_NOX']*X[14]*X[8]*X[9]/((k['Km_NOX_8']+X[8]*(1+X[7]/k['Km_NOX_7']))*(k['Km_NOX_9']+X[9]))
+
+def Deactivation(X, k):
+    '''first order deactivation of NOX'''
+    return k['kNOX']*X[14]
+
+def Oxygen_transfer(X, k):
+    '''oxygen mass transfer from the air bubbles'''
+    return k['kLa']*(k['S9_Star']-X[9])
+
+def Pulse(tau, tau_k, tf, tanh):
+    '''Shape of a NOX supplementation at the scaled time tau = t/t_f, starting
+    at tau_k = 100*t_k/t_f; the rate is the magnitude times the pulse. tanh is
+    passed in, so that numpy, math or Pyomo can evaluate it.'''
+    return tanh(100*tau-tau_k)-tanh(100*tau-(tau_k+4/tf))
+
+def Supplementation(t, tf, pulses, tanh):
+    '''NOX supplementation rate at the time t (min) of the batch with the
+    running time tf (min) and the pulses (magnitude, time t_k) in μM/min and
+    min.'''
+    total = 0
+    for A, tk in pulses:
+        total = total+A*Pulse(t/tf, 100*tk/tf, tf, tanh)
+    return total
+
+# The rate laws of the reactions and the stoichiometric coefficients of the
+# species (by index in X). The NOX supplementation 'sNOX' has no rate law, it
+# is the sum of the pulses.
+Rate_laws = {'I': Rate_I, 'II': Rate_II, 'III': Rate_III, 'IV': Rate_IV,
+             'V': Rate_V, 'VI': Rate_VI, 'dNOX': Deactivation,
+             'O2': Oxygen_transfer}
+Stoichiometry = {'I':    {1: -1, 7: -1, 2: 1, 8: 1},
+                 'II':   {2: -1, 3: 1},
+                 'III':  {3: -1, 4: 1},
+                 'IV':   {4: -1, 5: 1},
+                 'V':    {5: -1, 7: -1, 6: 1, 8: 1},
+                 'VI':   {8: -1, 9: -1/2, 7: 1},
+                 'dNOX': {14: -1},
+                 'O2':   {9: 1},
+                 'sNOX': {14: 1}}
+
+# the rates and coefficients that appear in the balance of each species 
+Balance_terms = {i: [(name, nu[i]) for name, nu in Stoichiometry.items() if i in nu]
+                 for i in range(1,15)}
+
+def Balance(i, v):
+    '''Time derivative of the species i of X from the rates v (dict by the
+    names of Stoichiometry).'''
+    total = None
+    for name, nu in Balance_terms[i]:
+        if total is None:
+            total = v[name] if nu == 1 else -v[name] if nu == -1 else nu*v[name]
+        else:
+            total = total+v[name] if nu == 1 else total-v[name] if nu == -1 else total+nu*v[name]
+    return 0 if total is None else total
+
+#-------------------------------------------------------------------- COMPILER
+'''The array kernel of the simulation is generated from the rate laws: they
+are evaluated once on terms that write every operation as a line of Python
+source, together with the lines of its partial derivatives with respect to
+the states (forward mode). The generated functions work on floats and on
+numpy arrays of states (15,N) alike.'''
+
+class Term:
+    '''A value in the generated source: its name or literal and the names of
+    its nonzero partial derivatives with respect to the states. Equal lines
+    are emitted once and operations on literals are folded.'''
+    def __init__(self, source, code, grad = None):
+        self.source, self.code, self.grad = source, code, grad or {}
+    def Emit(self, line):
+        if line not in self.source['names']:
+            self.source['names'][line] = 'e{}'.format(len(self.source['names']))
+            self.source['lines'].append('    {} = {}'.format(self.source['names'][line], line))
+        return self.source['names'][line]
+    def Op(self, a, op, b):
+        na, nb = Literal(a), Literal(b)
+        if na is not None and nb is not None:
+            return repr(Operators[op](na, nb))
+        if op in '+-' and nb == 0:
+            return a
+        if op == '+' and na == 0:
+            return b
+        if op == '*' and (na == 0 or nb == 0):
+            return '0'
+        if op in '*/' and nb == 1:
+            return a
+        if op == '*' and na == 1:
+            return b
+        if op == '-' and na == 0:
+            return self.Emit('-' + b)
+        return self.Emit(a + op + b)
+    def Wrap(self, other):
+        return other if isinstance(other, Term) else Term(self.source, repr(other))
+    def Combine(self, other, op, rule):
+        other = self.Wrap(other)
+        code = self.Op(self.code, op, other.code)
+        grad = {}
+        for j in set(self.grad) | set(other.grad):
+            g = rule(self.code, self.grad.get(j, '0'), other.code, other.grad.get(j, '0'), code)
+            if g != '0':
+                grad[j] = g
+        return Term(self.source, code, grad)
+    def __add__(self, other):
+        return self.Combine(other, '+', lambda a, ga, b, gb, c: self.Op(ga, '+', gb))
+    def __sub__(self, other):
+        return self.Combine(other, '-', lambda a, ga, b, gb, c: self.Op(ga, '-', gb))
+    def __mul__(self, other):
+        return self.Combine(other, '*', lambda a, ga, b, gb, c: self.Op(self.Op(ga, '*', b), '+', self.Op(a, '*', gb)))
+    def __truediv__(self, other):
+        return self.Combine(other, '/', lambda a, ga, b, gb, c: self.Op(self.Op(ga, '-', self.Op(c, '*', gb)), '/', b))
+    def __neg__(self):
+        return self.Wrap(0) - self
+    def __radd__(self, other):
+        return self.Wrap(other) + self
+    def __rsub__(self, other):
+        return self.Wrap(other) - self
+    def __rmul__(self, other):
+        return self.Wrap(other) * self
+    def __rtruediv__(self, other):
+        return self.Wrap(other) / self
+
+Operators = {'+': lambda a, b: a+b, '-': lambda a, b: a-b, '*': lambda a, b: a*b, '/': lambda a, b: a/b}
+
+def Literal(code):
+    '''The number of a literal in the generated source, None for names.'''
+    try:
+        return float(code)
+    except ValueError:
+        return None
+
+def Compile(jacobian = False, parameters = False):
+    '''Generates the function f(X, t, p, u, out, tanh) that writes the time
+    derivatives of the states 1-14 at the time t into out (15,) or (15,N), for
+    the parameter vector p and the control vector u. With jacobian set, the
+    function writes the structurally nonzero entries of the Jacobian
+    d(dXdt[i])/dX[j] into out (15,15) or (15,15,N) instead; with parameters 
+    set, those of d(dXdt[i])/dp[j] into out (15,16) or (15,16,N). The 
+    generated source is kept in f.source.'''
+    source = {'lines': ['    x{0} = X[{0}]'.format(i) for i in range(1,15)], 'names': {}}
+    def Tanh(x):
+        # the pulses do not depend on the states 
+        return Term(source, x.Emit('tanh({})'.format(x.code)))
+    control = {name: Term(source, 'u[{}]'.format(j)) for j, name in enumerate(U_names)}
+    X = [None] + [Term(source, 'x{}'.format(i), {i: '1'} if jacobian else None) for i in range(1,15)]
+    k = Constants([Term(source, 'p[{}]'.format(j), {j: '1'} if parameters else None)
+                   for j in range(len(P_names))], control['kLa'])
+    v = {name: law(X, k) for name, law in Rate_laws.items()}
+    jacobian = jacobian or parameters
+    if jacobian:
+        v['sNOX'] = 0
+    else:
+        pulses = [(control['A_1'], control['t_1']), (control['A_2'], control['t_2']),
+                  (control['A_3'], control['t_3'])]
+        v['sNOX'] = Supplementation(Term(source, 't'), control['t_f'], pulses, Tanh)
+    outputs = []
+    for i in range(1,15):
+        dXdt = Balance(i, v)
+        if not isinstance(dXdt, Term):
+            continue
+        if jacobian:
+            outputs += ['    out[{},{}] = {}'.format(i, j, g) for j, g in sorted(dXdt.grad.items())]
+        else:
+            outputs.append('    out[{}] = {}'.format(i, dXdt.code))
+    # only the lines that the outputs depend on are kept 
+    used = set(re.findall(r'\b[ex]\d+\b', ' '.join(outputs)))
+    lines = []
+    for line in reversed(source['lines']):
+        name, value = line.split(' = ')
+        if name.strip() in used:
+            lines.insert(0, line)
+            used.update(re.findall(r'\b[ex]\d+\b', value))
+    code = '\n'.join(['def f(X, t, p, u, out, tanh):'] + lines + outputs + ['    return out'])
+    namespace = {}
+    exec(compile(code, '<Kinetics_CascadeMOO>', 'exec'), namespace)
+    namespace['f'].source = code
+    return namespace['f']
@@ -12,225 +12,1043 @@
 import pyomo.environ as pe
 from pyomo.dae import *
 import Optimization2_CascadeMOO as FfPF
+import Simulation_CascadeMOO as SIM
+import Kinetics_CascadeMOO as Kinetics
 import pylab
 import matplotlib.pyplot as plt
+from pyomo.contrib.sensitivity_toolbox.sens import SensitivityInterface
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import time
+import numpy as np
+import hashlib
+import os
+import pickle
+import subprocess
+import json
+import re
+import tempfile
+import warnings
+from pyomo.opt import SolverResults
+from pyomo.common.errors import ApplicationError
 
-SpaceTimeYield=[]
-CofactorConsumption=[]
-EnzymeConsumption=[] 
-FinalTime=[]
-InitialS1Concentration=[]
-InitialS7Concentration=[]
-EUDH=[]
-EGlucD=[]
-EKdgD=[]
-EKgsalDH=[]
-ENOX=[]
-t1=[]
-t2=[]
-t3=[]
-A1=[]
-A2=[]
-A3=[]
-TotalEnzymeConcentration=[] 
-info1=[]
-info2=[]
-O1s=[]
-O2s=[]
-O3s=[]
-
-
-
-i = 1
-w1 = 1
-
-# a for loop for the epsilon-EC constraint 
-for ECi in [0, 0.025, 0.050, 0.075, 0.100, 0.125, 0.150]:
-    # initial values for the control variables 
-    if ECi == 0: 
-        tfi = 300
-        S1i = 0
-        S7i = 0
-        EUDHi = 0
-        EGlucDi = 0
-        EKdgDi = 0
-        EKgsalDHi = 0
-        ENOXi = 0
-        tau1i = 40
-        tau2i = 60 
-        tau3i = 80
-        A1i = 0
-        A2i = 0
-        A3i = 0
-    elif ECi == 0.025: 
-        tfi = 300
-        S1i = 0
-        S7i = 0
-        EUDHi = 0
-        EGlucDi = 0
-        EKdgDi = 0
-        EKgsalDHi = 0
-        ENOXi = 0
-        tau1i = 40
-        tau2i = 60 
-        tau3i = 80
-        A1i = 0
-        A2i = 0
-        A3i = 0
-    else: 
-        # the control variables are initialized from the solutions of the previous run
-        # in order to ensure faster conversion
-        tfi = model.tf
-        S1i = model.S1[model.tau.first()]
-        S7i = model.S7[model.tau.first()]
-        EUDHi = model.EUDH[model.tau.first()]
-        EGlucDi = model.EGlucD[model.tau.first()]
-        EKdgDi = model.EKdgD[model.tau.first()]
-        EKgsalDHi = model.EKgsalDH[model.tau.first()]
-        ENOXi = model.ENOX[model.tau.first()]
-        tau1i = model.tau1
-        tau2i = model.tau2 
-        tau3i = model.tau3
-        A1i = model.A1
-        A2i = model.A2
-        A3i = model.A3
-    model = FfPF.FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,tau1i,tau2i,tau3i,A1i,A2i,A3i)
+# initial values for the control variables when no previous solution is available
+Initial_guess = {'tfi': 300, 'S1i': 0, 'S7i': 0, 'EUDHi': 0, 'EGlucDi': 0, 
+                 'EKdgDi': 0, 'EKgsalDHi': 0, 'ENOXi': 0, 'tau1i': 40, 
+                 'tau2i': 60, 'tau3i': 80, 'A1i': 0, 'A2i': 0, 'A3i': 0}
+
+# the profiles saved for each Pareto-optimal point (label, model variable)
+Profiles = [('S1', 'S1'), ('S2', 'S2'), ('S3', 'S3'), ('S4', 'S4'), ('S5', 'S5'),
+            ('S6', 'S6'), ('S7', 'S7'), ('S8', 'S8'), ('S9', 'S9'), 
+            ('v1', 'vI'), ('v2', 'vII'), ('v3', 'vIII'), ('v4', 'vIV'), 
+            ('v5', 'vV'), ('v7', 'vVI'), ('rdNOX', 'rdNOX'), ('rsNOX', 'rsNOX'),
+            ('NO2', 'NO2'), ('Ep1', 'EUDH'), ('Ep3', 'EGlucD'), ('Ep4', 'EKdgD'),
+            ('Ep5', 'EKgsalDH'), ('Ep6', 'ENOX')]
+
+# the scalar results saved for each Pareto-optimal point (overview)
+Overview = ['ECi', 'CCi', 'kLai', 'SpaceTimeYield', 'EnzymeConsumption', 'CofactorConsumption', 
+            'FinalTime', 'InitialS1Concentration', 'InitialS7Concentration',
+            'EUDH', 'EGlucD', 'EKdgD', 'EKgsalDH', 'ENOX', 'A1', 'A2', 'A3',
+            't1', 't2', 't3', 'TotalEnzymeConcentration', 'Yield', 'info1', 
+            'info2', 'O1s', 'O2s', 'O3s']
+
+# the parameters that vary between the points of a sweep and the scales used 
+# to measure the distance between points in the solve cache
+Sweep_params = [('ECc', 0.1), ('CCc', 0.01), ('kLa', 1.0)]
+
+# the ranges from which Multistart draws the initial values of the control 
+# variables (the keys of Initial_guess); the magnitudes A_k are those of 
+# FunctionforPF (μM per unit of tau)
+Multistart_ranges = {'tfi': (100, 1500), 'S1i': (10, 200), 'S7i': (0.1, 5), 
+                     'EUDHi': (0.1, 5), 'EGlucDi': (0.1, 5), 'EKdgDi': (0.1, 5), 
+                     'EKgsalDHi': (0.1, 5), 'ENOXi': (0.1, 10), 'tau1i': (0, 100), 
+                     'tau2i': (0, 100), 'tau3i': (0, 100), 'A1i': (0, 30000), 
+                     'A2i': (0, 30000), 'A3i': (0, 30000)}
+
+# the models kept by a worker process of Grid_sweep between its points
+Worker_models = {}
+
+# the interface to IPOPT: 'ipopt' (the executable, through .nl and .sol 
+# files), 'appsi' (the persistent APPSI interface, which keeps the NL writer 
+# of a model between solves and only updates changed parameters and values) 
+# or 'cyipopt' (IPOPT called in-process through cyipopt/PyNumero); see 
+# Set_backend for their limits (neither is faster than 'ipopt')
+Backend = 'ipopt'
+
+# the JSON lines file that receives the timing and solver statistics records 
+# (None records nothing); see Set_profile and Record
+Profile_file = None
+
+# the IPOPT statistics read from its output (name, pattern)
+Ipopt_counters = [
+    ('iterations', r'Number of Iterations\.*:\s*(\d+)'),
+    ('objective_evaluations', r'Number of objective function evaluations\s*=\s*(\d+)'),
+    ('gradient_evaluations', r'Number of objective gradient evaluations\s*=\s*(\d+)'),
+    ('equality_constraint_evaluations', r'Number of equality constraint evaluations\s*=\s*(\d+)'),
+    ('inequality_constraint_evaluations', r'Number of inequality constraint evaluations\s*=\s*(\d+)'),
+    ('equality_jacobian_evaluations', r'Number of equality constraint Jacobian evaluations\s*=\s*(\d+)'),
+    ('inequality_jacobian_evaluations', r'Number of inequality constraint Jacobian evaluations\s*=\s*(\d+)'),
+    ('hessian_evaluations', r'Number of Lagrangian Hessian evaluations\s*=\s*(\d+)'),
+    ('ipopt_seconds', r'Total (?:CPU )?sec(?:ond)?s in IPOPT[^=\n]*=\s*([-+\d.eE]+)'),
+    ('function_evaluation_seconds', r'Total (?:CPU )?sec(?:ond)?s in NLP function evaluations\s*=\s*([-+\d.eE]+)'),
+    ('exit', r'EXIT:\s*(.*)')]
+
+
+def Set_backend(backend):
+    '''Selects the interface to IPOPT (see Backend) in this process. No 
+    backend avoids files: 'appsi' still writes an .nl file and runs the IPOPT 
+    executable for every solve, and 'cyipopt' writes an .nl file for every 
+    solve to build its PyNumero model again. Only 'ipopt' passes the bound 
+    multipliers ipopt_zL_in/zU_in to IPOPT; with the other backends the warm 
+    starts (Resolve_point) only start from the primal values (see Solver). 
+    The other backends are therefore alternatives for environments without 
+    the executable interface, not a speedup of the sweep.'''
+    global Backend
+    if backend not in ('ipopt', 'appsi', 'cyipopt'):
+        raise ValueError('unknown backend: {}'.format(backend))
+    Backend = backend
+
+def Set_profile(profile):
+    '''Selects the JSON lines file for the records of this process (see 
+    Record); None switches the records off.'''
+    global Profile_file
+    Profile_file = profile
+
+def Initialize_worker(backend, profile, parameters = None):
+    '''Passes the Backend, the Profile_file and the kinetic parameters (e.g. 
+    loaded with Kinetics.Load_parameters) to a worker process.'''
+    Set_backend(backend)
+    Set_profile(profile)
+    if parameters is not None:
+        Kinetics.Set_parameters(parameters)
+
+def Record(kind, **fields):
+    '''Appends one record of the given kind (build, solve, extract, ...) with 
+    the process id and the time stamp to the Profile_file as a JSON line. 
+    Each record is written with a single append, so that the processes of a 
+    parallel sweep can share the file.'''
+    if Profile_file is None:
+        return
+    record = dict(kind = kind, pid = os.getpid(), stamp = time.time(), **fields)
+    with open(Profile_file, 'a') as file:
+        file.write(json.dumps(record, default = str) + '\n')
+
+def Ipopt_statistics(log):
+    '''Reads the iteration and evaluation counts, the time spent in IPOPT and 
+    in the function evaluations and the exit message from the output of 
+    IPOPT.'''
+    statistics = {}
+    for name, pattern in Ipopt_counters:
+        match = re.search(pattern, log)
+        if match is not None:
+            value = match.group(1).strip()
+            if name == 'exit':
+                statistics[name] = value
+            else:
+                statistics[name] = float(value) if name.endswith('seconds') else int(value)
+    return statistics
+
+def Solver_options(solver):
+    '''Returns the dict of IPOPT options of a solver of the current Backend.'''
+    return solver.config.options if Backend == 'cyipopt' else solver.options
+
+# the options of IPOPT that start it from a converged primal and dual solution
+Warm_start_options = {'warm_start_init_point': 'yes', 
+                      'warm_start_bound_push': 10**(-9), 
+                      'warm_start_mult_bound_push': 10**(-9), 
+                      'mu_init': 10**(-6)}
+
+def Solver(warm = False):
+    '''IPOPT with the options of the sweep. With warm = True IPOPT starts from 
+    the primal and dual values passed with the model (see Add_suffixes); the 
+    backends other than 'ipopt' cannot pass the bound multipliers, so they 
+    only start from the primal values and a warning is given.'''
     # solver selection
-    solver=pe.SolverFactory('ipopt')
+    solver=pe.SolverFactory({'ipopt': 'ipopt', 'appsi': 'appsi_ipopt', 
+                             'cyipopt': 'cyipopt'}[Backend])
+    options = Solver_options(solver)
     # maximum iteration count limit 
-    solver.options['max_iter'] = 100000
+    options['max_iter'] = 100000
     # selection of the acceptible tolerance to be stricter than default 
-    solver.options['acceptable_tol'] = 10**(-10)
-    results = solver.solve(model, tee=True)
-    
-    # saving the results of each optimization run inside the for loop 
-    SpaceTimeYield.append(pe.value(model.OBJ[1]))   
-    EnzymeConsumption.append(pe.value(model.EC))
-    CofactorConsumption.append(pe.value(model.CC))
-    FinalTime.append(pe.value(model.tf))
-    InitialS1Concentration.append(pe.value(model.S1[model.tau.first()]))
-    InitialS7Concentration.append(pe.value(model.S7[model.tau.first()]))
-    EUDH.append(pe.value(model.EUDH[model.tau.first()]))
-    EGlucD.append(pe.value(model.EGlucD[model.tau.first()]))
-    EKdgD.append(pe.value(model.EKdgD[model.tau.first()]))
-    EKgsalDH.append(pe.value(model.EKgsalDH[model.tau.first()]))
-    ENOX.append(pe.value(model.ENOX[model.tau.first()]))
-    A1c = pe.value(model.A1)/pe.value(model.tf)
-    A2c = pe.value(model.A2)/pe.value(model.tf)
-    A3c = pe.value(model.A3)/pe.value(model.tf)
-    t1c = pe.value(model.tau1)*pe.value(model.tf)/100
-    t2c = pe.value(model.tau2)*pe.value(model.tf)/100
-    t3c = pe.value(model.tau3)*pe.value(model.tf)/100
-    A1.append(A1c)
-    A2.append(A2c)
-    A3.append(A3c)
-    t1.append(t1c)
-    t2.append(t2c)
-    t3.append(t3c)
-
-    TotalEnzymeConcentration.append(pe.value(model.SumEnzymes))
-    info1.append(results.solver.termination_condition)
-    info2.append(results.solver.status)
-    O1s.append(pe.value(model.O1[1])) 
-    O2s.append(pe.value(model.O2[1])) 
-    O3s.append(pe.value(model.O3[1])) 
-
-
-    # printing the results of each optimization on an individual text file 
-    print('tau', file = open("ParetoOptimalPoint{}.txt".format(w1), "w+"))
-    print(list(model.tau), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S1', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S1[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S2', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S2[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S3', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S3[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S4', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S4[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S5', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S5[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S6', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S6[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S7', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S7[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S8', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S8[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S9', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.S9[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('v1', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.vI[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('v2', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.vII[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('v3', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.vIII[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('v4', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.vIV[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('v5', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.vV[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('v7', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.vVI[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('rdNOX', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.rdNOX[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('rsNOX', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.rsNOX[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('NO2', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.NO2[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('Ep1', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.EUDH[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('Ep3', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.EGlucD[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('Ep4', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.EKdgD[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('Ep5', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.EKgsalDH[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('Ep6', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print([pe.value(model.ENOX[jo]) for jo in model.tau], file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('tf', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.tf), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('tau1', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(t1c, file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('tau2', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(t2c, file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('tau3', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(t3c, file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('A1', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(A1c, file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('A2', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(A2c, file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('A3', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(A3c, file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('SumEnzymes', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.SumEnzymes), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('OBJF', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.OBJ[1]), file = open("ParetoOptimalPoint{}.txt".format(w1), "a")) 
-    print('Yield', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.Yield), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S1[0]', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.S1[model.tau.first()]), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('S7[0]', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.S7[model.tau.first()]), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('O1', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.O1[1]), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('O2', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.O2[1]), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print('O3', file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    print(pe.value(model.O3[1]), file = open("ParetoOptimalPoint{}.txt".format(w1), "a"))
-    
+    options['acceptable_tol'] = 10**(-10)
+    if warm and Backend != 'ipopt':
+        # the warm start options with zero bound multipliers would slow IPOPT 
+        # down, so only the primal values are passed 
+        warnings.warn("the backend '{}' cannot pass the bound multipliers to IPOPT; "
+                      "the warm start only uses the primal values".format(Backend), stacklevel = 2)
+    elif warm:
+        options.update(Warm_start_options)
+    return solver
+
+def Solve(model, tee = True, warm = False, timeout = None):
+    '''Solves the model with Solver(warm). With a timeout (s) IPOPT stops 
+    after timeout seconds of CPU time and is killed after about timeout 
+    seconds of wall-clock time; a killed or failed run returns results with 
+    the termination condition maxTimeLimit or error instead of raising, so 
+    that a sweep can go on with the next point. With a Profile_file IPOPT 
+    writes its output to a temporary file and a solve record with the wall 
+    time, the statistics of IPOPT (Ipopt_statistics) and the termination 
+    condition is written.'''
+    solver = Solver(warm)
+    if Profile_file is None:
+        return Run_solver(solver, model, tee, timeout)
+    handle, log = tempfile.mkstemp(suffix = '.log')
+    os.close(handle)
+    Solver_options(solver)['output_file'] = log
+    start = time.perf_counter()
+    results = Run_solver(solver, model, tee, timeout)
+    wall_time = time.perf_counter()-start
+    with open(log) as file:
+        statistics = Ipopt_statistics(file.read())
+    os.remove(log)
+    Record('solve', ECc = pe.value(model.ECc), CCc = pe.value(model.CCc), 
+           kLa = pe.value(model.kLa), warm = warm, backend = Backend, 
+           wall_time = wall_time, termination = str(results.solver.termination_condition), 
+           status = str(results.solver.status), **statistics)
+    return results
+
+def Run_solver(solver, model, tee, timeout):
+    '''Runs the solver on the model (see Solve). With the 'appsi' Backend the 
+    model keeps its persistent solver between solves; the in-process 
+    'cyipopt' Backend is only limited in CPU time.'''
+    if Backend == 'appsi':
+        persistent = getattr(model, '_persistent_solver', None)
+        if persistent is None:
+            model._persistent_solver = solver
+        else:
+            persistent.options = dict(solver.options)
+            solver = persistent
+    if timeout is None:
+        return solver.solve(model, tee=tee)
+    Solver_options(solver)['max_cpu_time'] = timeout
+    results = SolverResults()
+    try:
+        if Backend == 'cyipopt':
+            results = solver.solve(model, tee=tee)
+        else:
+            results = solver.solve(model, tee=tee, timelimit=timeout)
+    except subprocess.TimeoutExpired:
+        results.solver.termination_condition = pe.TerminationCondition.maxTimeLimit
+        results.solver.status = pe.SolverStatus.aborted
+    except (ApplicationError, ValueError):
+        results.solver.termination_condition = pe.TerminationCondition.error
+        results.solver.status = pe.SolverStatus.error
+    return results
+
+def Add_suffixes(model):
+    '''Declares the suffixes that exchange the constraint multipliers (dual) 
+    and the bound multipliers (ipopt_zL/zU) with IPOPT.'''
+    model.dual = pe.Suffix(direction=pe.Suffix.IMPORT_EXPORT)
+    model.ipopt_zL_out = pe.Suffix(direction=pe.Suffix.IMPORT)
+    model.ipopt_zU_out = pe.Suffix(direction=pe.Suffix.IMPORT)
+    model.ipopt_zL_in = pe.Suffix(direction=pe.Suffix.EXPORT)
+    model.ipopt_zU_in = pe.Suffix(direction=pe.Suffix.EXPORT)
+
+def Build_model(ECi, initial, **options):
+    '''Builds the model for the epsilon value ECi with the initial values 
+    initial (see Initial_guess) and the options of FunctionforPF and declares 
+    the suffixes of IPOPT.'''
+    start = time.perf_counter()
+    model = FfPF.FunctionforPF(ECi, **initial, **options)
+    Add_suffixes(model)
+    Record('build', ECi = ECi, wall_time = time.perf_counter()-start, 
+           variables = model.nvariables(), constraints = model.nconstraints(), 
+           **model._build_times, 
+           **{key: value for key, value in options.items() if key not in ('mesh', 'p')})
+    return model
+
+def Solve_point(ECi, initial, tee = True, timeout = None, refinements = 0, **options):
+    '''Builds the model for the epsilon value ECi with the initial values 
+    initial (see Initial_guess) and solves it with IPOPT. options are passed 
+    to FunctionforPF (CCi, kLai, compact, nfe, scheme, ncp, mesh). With 
+    refinements > 0 the mesh of nfe uniform elements is refined a posteriori 
+    up to refinements times (see Solve_adaptive).'''
+    if refinements:
+        return Solve_adaptive(ECi, initial, tee, refinements = refinements, 
+                              timeout = timeout, **options)
+    model = Build_model(ECi, initial, **options)
+    results = Solve(model, tee, timeout = timeout)
+    return model, results
+
+def Resolve_point(model, ECi, tee = True, timeout = None):
+    '''Re-solves an already solved model for the epsilon value ECi. The model 
+    is neither rebuilt nor discretized again and IPOPT is warm-started from the 
+    previous primal and dual solution.'''
+    model.ECc = ECi
+    model.ipopt_zL_in.update(model.ipopt_zL_out)
+    model.ipopt_zU_in.update(model.ipopt_zU_out)
+    results = Solve(model, tee, warm = True, timeout = timeout)
+    return results
+
+def Store_solution(model):
+    '''Returns the primal values, bound multipliers and constraint multipliers 
+    of a solved model as arrays, in the order of the model components. They 
+    can be loaded into any model built with the same options (Load_solution).'''
+    variables = list(model.component_data_objects(pe.Var))
+    constraints = list(model.component_data_objects(pe.Constraint, active=True))
+    value = lambda x: np.nan if x is None else x
+    return {'primal': np.array([value(v.value) for v in variables], dtype=float),
+            'zL': np.array([model.ipopt_zL_out.get(v, 0) for v in variables], dtype=float),
+            'zU': np.array([model.ipopt_zU_out.get(v, 0) for v in variables], dtype=float),
+            'dual': np.array([model.dual.get(c, 0) for c in constraints], dtype=float)}
+
+def Load_solution(model, solution):
+    '''Loads a solution stored with Store_solution into the model, so that the 
+    next Resolve_point is warm-started from it.'''
+    variables = list(model.component_data_objects(pe.Var))
+    constraints = list(model.component_data_objects(pe.Constraint, active=True))
+    for v, x, zL, zU in zip(variables, solution['primal'], solution['zL'], solution['zU']):
+        if not np.isnan(x):
+            v.set_value(x, skip_validation=True)
+        model.ipopt_zL_out[v] = zL
+        model.ipopt_zU_out[v] = zU
+    for c, y in zip(constraints, solution['dual']):
+        model.dual[c] = y
+
+def Solve_adaptive(ECi, initial, tee = True, nfe = 20, refinements = 5, tol = 0.05, 
+                   timeout = None, **options):
+    '''Solves the point ECi on a uniform mesh of nfe elements and then refines 
+    the mesh a posteriori around the optimized supplementation times and steep 
+    concentration fronts (see Refine_mesh). After each refinement the model is 
+    rebuilt on the new mesh, initialized from the previous solution and solved 
+    again, until no element is refined, a solve is not optimal or after 
+    refinements rounds. Every solve is limited to timeout seconds.'''
+    mesh = [k/nfe for k in range(nfe+1)]
+    model, results = Solve_point(ECi, initial, tee, timeout, mesh=mesh, **options)
+    for k in range(refinements):
+        if results.solver.termination_condition != pe.TerminationCondition.optimal:
+            break
+        mesh = FfPF.Refine_mesh(model, tol)
+        if mesh is None:
+            break
+        refined = Build_model(ECi, initial, mesh=mesh, **options)
+        FfPF.Interpolate_solution(refined, model)
+        results = Solve(refined, tee, timeout = timeout)
+        model = refined
+    Record('refine', ECi = ECi, elements = len(model.tau.get_finite_elements())-1, 
+           termination = str(results.solver.termination_condition))
+    return model, results
+
+def Refined_sweep(epsilons, refinements = 5, tee = True, timeout = None, **options):
+    '''Solves every epsilon value on its own adaptively refined mesh 
+    (Solve_adaptive with refinements rounds, starting from nfe uniform 
+    elements). The meshes of the points differ, so the points are solved 
+    from Initial_guess instead of being warm-started from each other.'''
+    points = []
+    for ECi in epsilons:
+        model, results = Solve_point(ECi, dict(Initial_guess), tee, timeout, 
+                                     refinements = refinements, **options)
+        points.append(Extract_point(ECi, model, results))
+    return points
+
+def Value(expression):
+    '''The value of a variable or expression of a model, NaN if it has no 
+    value (a model that was never solved) or cannot be evaluated.'''
+    try:
+        value = pe.value(expression, exception=False)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return np.nan
+    return np.nan if value is None else value
+
+def Extract_profile(model, name):
+    '''Returns the values of a tau-indexed variable or expression as an array 
+    ordered like model.tau (NaN where there is no value). Variables are read 
+    in one pass over their data instead of evaluating every node.'''
+    component = getattr(model, name)
+    if component.ctype is pe.Var:
+        values = component.extract_values()
+        return np.array([values[jo] for jo in model.tau], dtype=float)
+    return np.array([Value(component[jo]) for jo in model.tau], dtype=float)
+
+def Extract_point(ECi, model, results):
+    '''Collects the results of a solved model in a dict of plain values and 
+    arrays, so that it can be returned from a worker process. If the solve 
+    was not optimal (a timeout or an error, after which the model holds no 
+    values or those of the previous point), all values are NaN and only the 
+    termination condition and status are reported.'''
+    start = time.perf_counter()
+    solved = results.solver.termination_condition == pe.TerminationCondition.optimal
+    value = Value if solved else lambda expression: np.nan
+    first = model.tau.first()
+    point = {}
+    point['ECi'] = ECi
+    point['CCi'] = pe.value(model.CCc)
+    point['kLai'] = pe.value(model.kLa)
+    point['tau'] = np.array(list(model.tau))
+    for label, name in Profiles:
+        point[label] = Extract_profile(model, name) if solved else np.full(len(model.tau), np.nan)
+    point['SpaceTimeYield'] = value(model.obj)
+    point['EnzymeConsumption'] = value(model.EC)
+    point['CofactorConsumption'] = value(model.CC)
+    point['FinalTime'] = value(model.tf)
+    point['InitialS1Concentration'] = value(model.S1[first])
+    point['InitialS7Concentration'] = value(model.S7[first])
+    point['EUDH'] = value(model.EUDH[first])
+    point['EGlucD'] = value(model.EGlucD[first])
+    point['EKdgD'] = value(model.EKdgD[first])
+    point['EKgsalDH'] = value(model.EKgsalDH[first])
+    point['ENOX'] = value(model.ENOX[first])
+    point['A1'] = value(model.A1)/value(model.tf)
+    point['A2'] = value(model.A2)/value(model.tf)
+    point['A3'] = value(model.A3)/value(model.tf)
+    point['t1'] = value(model.tau1)*value(model.tf)/100
+    point['t2'] = value(model.tau2)*value(model.tf)/100
+    point['t3'] = value(model.tau3)*value(model.tf)/100
+    point['TotalEnzymeConcentration'] = value(model.SumEnzymes)
+    point['Yield'] = value(model.Yield)
+    point['info1'] = str(results.solver.termination_condition)
+    point['info2'] = str(results.solver.status)
+    point['O1s'] = value(model.O1[1])
+    point['O2s'] = value(model.O2[1])
+    point['O3s'] = value(model.O3[1])
+    Record('extract', ECi = ECi, wall_time = time.perf_counter()-start)
+    return point
+
+def Cache_key(model):
+    '''Returns the cache key of a built model: a hash of everything that 
+    defines the model apart from the swept parameters (the kinetic Params, the 
+    discretization and the solver options) and the values of the swept 
+    parameters ECc, CCc and kLa.'''
+    swept = [name for name, scale in Sweep_params]
+    content = []
+    for param in model.component_objects(pe.Param):
+        if param.local_name not in swept:
+            values = param.extract_values()
+            content.append((param.local_name, sorted((str(k), repr(pe.value(v))) 
+                                                     for k, v in values.items())))
+    content.append(('tau', [repr(jo) for jo in model.tau]))
+    content.append(('discretization', sorted(model.tau.get_discretization_info().items())))
+    content.append(('size', model.nvariables(), model.nconstraints()))
+    content.append(('solver', Backend, sorted(Solver_options(Solver()).items())))
+    family = hashlib.sha256(repr(content).encode()).hexdigest()[:32]
+    return family, tuple(float(pe.value(getattr(model, name))) for name in swept)
+
+def Cache_distance(a, b):
+    '''The scaled distance of two points (ECc, CCc, kLa) of a sweep.'''
+    return np.sqrt(sum(((x-y)/scale)**2 for x, y, (name, scale) in zip(a, b, Sweep_params)))
+
+def Cache_lookup(cache_dir, family, key):
+    '''Looks up the point key in the cache. Returns the entry of the point and 
+    True if it is cached, otherwise the entry of the nearest cached point of 
+    the same family and False, or (None, False) if the family is empty.'''
+    directory = os.path.join(cache_dir, family)
+    if not os.path.isdir(directory):
+        return None, False
+    best, distance = None, np.inf
+    for name in os.listdir(directory):
+        if name.endswith('.pkl'):
+            d = Cache_distance(tuple(float(x) for x in name[:-4].split('_')), key)
+            if d < distance:
+                best, distance = name, d
+    if best is None:
+        return None, False
+    path = os.path.join(directory, best)
+    try:
+        with open(path, 'rb') as file:
+            entry = pickle.load(file)
+        os.utime(path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None, False
+    return entry, distance == 0
+
+def Cache_store(cache_dir, family, key, point, solution, max_bytes = 2**30):
+    '''Stores a point and its solution (Store_solution) in the cache and 
+    evicts the least recently used entries while the cache is larger than 
+    max_bytes.'''
+    directory = os.path.join(cache_dir, family)
+    os.makedirs(directory, exist_ok = True)
+    path = os.path.join(directory, '_'.join(repr(x) for x in key) + '.pkl')
+    # written to a temporary file first, so that parallel workers never read 
+    # an incomplete entry
+    temporary = path + '.{}.tmp'.format(os.getpid())
+    with open(temporary, 'wb') as file:
+        pickle.dump({'key': key, 'point': point, 'solution': solution}, file)
+    os.replace(temporary, path)
+    entries = []
+    for root, dirs, files in os.walk(cache_dir):
+        for name in files:
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+    size = sum(nbytes for mtime, nbytes, name in entries)
+    for mtime, nbytes, name in sorted(entries):
+        if size <= max_bytes:
+            break
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+        size = size - nbytes
+
+def Cached_point(model, ECi, cache_dir, tee = True, previous = None, max_bytes = 2**30, 
+                 timeout = None, **options):
+    '''Solves the epsilon value ECi through the solve cache in cache_dir. A 
+    cached point is returned without solving and its solution is loaded into 
+    the model. Otherwise the model is warm-started from the nearest cached 
+    point of the same family if it is nearer than the point previous (ECc, 
+    CCc, kLa) whose solution the model holds, solved and stored. With model = 
+    None the model is built first and holds no solution. Returns the model 
+    and the point.'''
+    if model is None:
+        model = Build_model(ECi, Initial_guess, **options)
+        previous = None
+    model.ECc = ECi
+    family, key = Cache_key(model)
+    entry, exact = Cache_lookup(cache_dir, family, key)
+    if exact:
+        Load_solution(model, entry['solution'])
+        return model, dict(entry['point'], ECi = ECi)
+    if entry is not None and (previous is None or 
+                              Cache_distance(entry['key'], key) < Cache_distance(previous, key)):
+        Load_solution(model, entry['solution'])
+        previous = entry['key']
+    if previous is None:
+        results = Solve(model, tee, timeout = timeout)
+    else:
+        results = Resolve_point(model, ECi, tee, timeout)
+    point = Extract_point(ECi, model, results)
+    if results.solver.termination_condition == pe.TerminationCondition.optimal:
+        Cache_store(cache_dir, family, key, point, Store_solution(model), max_bytes)
+    return model, point
+
+def Save_checkpoint(checkpoint, state):
+    '''Writes the state of a sweep chain to the file checkpoint. The file is 
+    replaced atomically, so that a crash never leaves a broken checkpoint.'''
+    temporary = checkpoint + '.tmp'
+    with open(temporary, 'wb') as file:
+        pickle.dump(state, file)
+    os.replace(temporary, checkpoint)
+
+def Load_checkpoint(checkpoint):
+    '''Reads the state of a sweep chain written by Save_checkpoint, or returns 
+    None if there is no checkpoint.'''
+    if not os.path.isfile(checkpoint):
+        return None
+    with open(checkpoint, 'rb') as file:
+        return pickle.load(file)
+
+def Sweep_chain(epsilons, tee = True, cache_dir = None, checkpoint = None, 
+                timeout = None, **options):
+    '''Solves the epsilon values in the given order. The model is built once 
+    and re-solved for each point, warm-started from the previous one; after a 
+    solve that was not optimal the model is built again from Initial_guess. 
+    With a cache_dir the points are solved through the solve cache (see 
+    Cached_point). With a checkpoint file the completed points, their 
+    termination status and the warm-start vector (Store_solution) are saved 
+    after every point, and a chain that finds its checkpoint resumes after 
+    the last completed point. timeout limits each solve (see Solve); a point 
+    that runs out of time is recorded and the chain goes on.'''
+    points = []
+    model = None
+    solution = None
+    # the point (ECc, CCc, kLa) of the solution in the model 
+    previous = None
+    state = Load_checkpoint(checkpoint) if checkpoint is not None else None
+    if state is not None and state['epsilons'] == list(epsilons) and state['options'] == options:
+        points = state['points']
+        solution = state['solution']
+        if solution is not None:
+            previous = (points[-1]['ECi'], points[-1]['CCi'], points[-1]['kLai'])
+    for ECi in epsilons[len(points):]:
+        if model is None and solution is not None:
+            # resuming: the model is rebuilt and the saved solution is loaded 
+            # as warm start
+            model = Build_model(ECi, Initial_guess, **options)
+            Load_solution(model, solution)
+        if cache_dir is not None:
+            model, point = Cached_point(model, ECi, cache_dir, tee, previous, timeout = timeout, 
+                                        **options)
+        else:
+            if model is None:
+                model, results = Solve_point(ECi, dict(Initial_guess), tee, timeout, **options)
+            else:
+                results = Resolve_point(model, ECi, tee, timeout)
+            point = Extract_point(ECi, model, results)
+        points.append(point)
+        if point['info1'] != str(pe.TerminationCondition.optimal):
+            model = None
+            solution = None
+            previous = None
+        else:
+            previous = (point['ECi'], point['CCi'], point['kLai'])
+            if checkpoint is not None:
+                solution = Store_solution(model)
+        if checkpoint is not None:
+            Save_checkpoint(checkpoint, {'epsilons': list(epsilons), 'options': options, 
+                                         'points': points, 'solution': solution})
+    return points
+
+def Predict_sensitivity(model, ECi, tee = False):
+    '''Predicts the solution for the epsilon value ECi from the solved model 
+    with the parametric sensitivity of its KKT system with respect to ECc 
+    (sIPOPT, ipopt_sens). sIPOPT solves the NLP again before it computes the 
+    sensitivity; this solve on a copy of the model is warm-started from the 
+    primal and dual solution of the model, so that it only needs a few 
+    iterations. Returns the predicted primal values and bound multipliers in 
+    the format of Store_solution; the constraint multipliers are taken from 
+    the current solution.'''
+    start = time.perf_counter()
+    interface = SensitivityInterface(model, clone_model=True)
+    interface.setup_sensitivity([model.ECc])
+    sens = interface.model_instance
+    sens.ipopt_zL_in.update(sens.ipopt_zL_out)
+    sens.ipopt_zU_in.update(sens.ipopt_zU_out)
+    interface.perturb_parameters([ECi])
+    solver = pe.SolverFactory('ipopt_sens', solver_io='nl')
+    solver.options['run_sens'] = 'yes'
+    solver.options.update(Warm_start_options)
+    results = solver.solve(sens, tee=tee)
+    Record('sensitivity', ECc = pe.value(model.ECc), ECi = ECi, 
+           wall_time = time.perf_counter()-start, 
+           termination = str(results.solver.termination_condition))
+    prediction = Store_solution(model)
+    variables = list(model.component_data_objects(pe.Var))
+    for k, v in enumerate(variables):
+        w = pe.ComponentUID(v).find_component_on(sens)
+        if w in sens.sens_sol_state_1:
+            prediction['primal'][k] = sens.sens_sol_state_1[w]
+            prediction['zL'][k] = sens.sens_sol_state_1_z_L.get(w, 0)
+            prediction['zU'][k] = sens.sens_sol_state_1_z_U.get(w, 0)
+    return prediction
+
+def Predict_secant(previous, current, EC0, EC1, ECi):
+    '''Predicts the solution for the epsilon value ECi by linear extrapolation 
+    of the two solutions previous (at EC0) and current (at EC1), stored with 
+    Store_solution. This is the finite-difference counterpart of 
+    Predict_sensitivity and needs no additional solver.'''
+    step = (ECi-EC1)/(EC1-EC0)
+    return {key: current[key]+step*(current[key]-previous[key]) for key in current}
+
+def Path_sweep(epsilons, predictor = 'sipopt', tee = True, **options):
+    '''Follows the Pareto front along the sorted epsilon values. From each 
+    solved point the solution at the next epsilon value is predicted (primal 
+    and dual), either with the KKT sensitivity with respect to ECc 
+    (predictor = 'sipopt') or by extrapolating the last two solutions 
+    (predictor = 'secant'), and then corrected by a warm-started IPOPT solve. 
+    If the corrector does not converge, the point is solved again from the 
+    previous solution; as in Sweep_chain the model is rebuilt after a solve 
+    that was not optimal.'''
+    if predictor not in ('sipopt', 'secant'):
+        raise ValueError('unknown predictor: {}'.format(predictor))
+    points = []
+    model = None
+    last = []
+    for ECi in sorted(epsilons):
+        if model is None:
+            model, results = Solve_point(ECi, dict(Initial_guess), tee, **options)
+            last = []
+        else:
+            if predictor == 'sipopt':
+                Load_solution(model, Predict_sensitivity(model, ECi, tee))
+            elif predictor == 'secant' and len(last) == 2:
+                Load_solution(model, Predict_secant(last[0][1], last[1][1], 
+                                                    last[0][0], last[1][0], ECi))
+            results = Resolve_point(model, ECi, tee)
+            if results.solver.termination_condition != pe.TerminationCondition.optimal:
+                Load_solution(model, last[-1][1])
+                results = Resolve_point(model, ECi, tee)
+        points.append(Extract_point(ECi, model, results))
+        if results.solver.termination_condition != pe.TerminationCondition.optimal:
+            model = None
+        else:
+            last = (last+[(ECi, Store_solution(model))])[-2:]
+    return points
+
+def Front_scores(points, tol_gap, tol_angle):
+    '''Scores the epsilon intervals between neighbouring points of the front. 
+    The front is normalized to the range of the enzyme consumption and the 
+    space-time yield; an interval scores above 1 when the distance of its end 
+    points exceeds tol_gap or the front turns by more than tol_angle (rad) at 
+    one of its end points. Points that were not solved to optimality do not 
+    take part in the front.'''
+    optimal = [point['info1'] == 'optimal' for point in points]
+    front = np.array([[point['EnzymeConsumption'], point['SpaceTimeYield']] 
+                      for point in points], dtype=float)
+    valid = front[optimal] if any(optimal) else front
+    scale = np.where(np.ptp(valid, axis=0) > 0, np.ptp(valid, axis=0), 1)
+    front = (front-valid.min(axis=0))/scale
+    # the turning angle of the front at each point
+    angle = np.zeros(len(points))
+    for k in range(1, len(points)-1):
+        if optimal[k-1] and optimal[k] and optimal[k+1]:
+            d1, d2 = front[k]-front[k-1], front[k+1]-front[k]
+            norm = np.linalg.norm(d1)*np.linalg.norm(d2)
+            if norm > 0:
+                angle[k] = np.arccos(np.clip(np.dot(d1, d2)/norm, -1, 1))
+    scores = []
+    for k in range(len(points)-1):
+        if optimal[k] and optimal[k+1]:
+            gap = np.linalg.norm(front[k+1]-front[k])
+        else:
+            gap = np.inf
+        scores.append(max(gap/tol_gap, max(angle[k], angle[k+1])/tol_angle))
+    return scores
+
+def Adaptive_sweep(lower, upper, budget = 15, tol_gap = 0.2, tol_angle = 0.3, 
+                   min_width = 0.001, max_infeasible = 3, tee = True, **options):
+    '''Generates the Pareto front between the epsilon values lower and upper 
+    adaptively. After the two anchor points, the epsilon interval with the 
+    highest score (see Front_scores) is bisected and its midpoint is solved, 
+    warm-started from the solution at an optimal end of the interval (from 
+    Initial_guess if neither end is optimal). An interval with an end that 
+    was not optimal (e.g. an infeasible anchor) is bisected at most 
+    max_infeasible times, down to (upper-lower)/2**max_infeasible, and an 
+    interval without an optimal end not at all. The sweep stops when no 
+    interval scores above 1, the intervals are narrower than min_width or 
+    budget points have been solved. The points are returned in ascending 
+    epsilon order.'''
+    model = None
+    points, solutions = [], []
+    def solve(ECi, k):
+        nonlocal model
+        # cold start unless the neighbouring point k is optimal
+        if k is None or points[k]['info1'] != 'optimal':
+            model, results = Solve_point(ECi, dict(Initial_guess), tee, **options)
+        else:
+            if model is None:
+                model = Build_model(ECi, Initial_guess, **options)
+            Load_solution(model, solutions[k])
+            results = Resolve_point(model, ECi, tee)
+        point = Extract_point(ECi, model, results)
+        solution = Store_solution(model)
+        if results.solver.termination_condition != pe.TerminationCondition.optimal:
+            model = None
+        return point, solution
+
+    for ECi in (lower, upper)[:budget]:
+        point, solution = solve(ECi, len(points)-1 if points else None)
+        points.append(point)
+        solutions.append(solution)
+    while len(points) < budget:
+        scores = Front_scores(points, tol_gap, tol_angle)
+        for k in range(len(scores)):
+            width = points[k+1]['ECi']-points[k]['ECi']
+            failed = [point['info1'] != 'optimal' for point in points[k:k+2]]
+            if (width < 2*min_width or all(failed) 
+                or (any(failed) and width <= (upper-lower)/2**max_infeasible)):
+                scores[k] = 0
+        k = int(np.argmax(scores)) if scores else 0
+        if not scores or scores[k] <= 1:
+            break
+        ECi = (points[k]['ECi']+points[k+1]['ECi'])/2
+        # warm start from the lower end point unless it was not optimal
+        start = k if points[k]['info1'] == 'optimal' else k+1
+        point, solution = solve(ECi, start)
+        points.insert(k+1, point)
+        solutions.insert(k+1, solution)
+    return points
+
+def Parallel_sweep(epsilons, n_chains = 2, max_workers = None, tee = False, 
+                   cache_dir = None, checkpoint = None, timeout = None, **options):
+    '''Solves the epsilon-constraint sweep as n_chains independent warm-start 
+    chains in a process pool. The sorted epsilon values are split into 
+    contiguous blocks and every second block is solved in descending order, 
+    so two chains start from both ends of the range. Each worker builds its 
+    own model. The points are returned in ascending epsilon order. cache_dir 
+    and timeout are passed to Sweep_chain; chain k is checkpointed in the 
+    file checkpoint + '_chain{k}.pkl'.'''
+    epsilons = sorted(epsilons)
+    n_chains = max(1, min(n_chains, len(epsilons)))
+    size = -(-len(epsilons)//n_chains)
+    chains = [epsilons[k:k+size] for k in range(0, len(epsilons), size)]
+    chains = [chain if k % 2 == 0 else chain[::-1] for k, chain in enumerate(chains)]
+    files = [None if checkpoint is None else checkpoint + '_chain{}.pkl'.format(k) 
+             for k in range(len(chains))]
+    if len(chains) == 1:
+        points = Sweep_chain(chains[0], tee, cache_dir, files[0], timeout, **options)
+    else:
+        with ProcessPoolExecutor(max_workers = max_workers or len(chains), 
+                                 initializer = Initialize_worker, 
+                                 initargs = (Backend, Profile_file, Kinetics.Parameter_list())) as pool:
+            futures = [pool.submit(Sweep_chain, chain, tee, cache_dir, file, timeout, **options) 
+                       for chain, file in zip(chains, files)]
+            points = [point for future in futures for point in future.result()]
+    return sorted(points, key = lambda point: point['ECi'])
+
+def Set_point(model, key):
+    '''Sets the swept parameters ECc, CCc and kLa of the model to the values 
+    key (see Sweep_params).'''
+    for (name, scale), value in zip(Sweep_params, key):
+        getattr(model, name).set_value(value)
+
+def Grid_worker(key, solution, tee = False, timeout = None, **options):
+    '''Solves one point key = (ECc, CCc, kLa) of Grid_sweep in a worker 
+    process. With a solution (Store_solution) of a neighbouring point the 
+    model of the worker, built on its first call, is reused and warm-started 
+    from it; without one the model is built again and solved from 
+    Initial_guess. Returns the point and its solution (None if the solve was 
+    not optimal).'''
+    name = repr(sorted(options.items()))
+    model = Worker_models.pop(name, None)
+    if model is None or solution is None:
+        model = Build_model(key[0], Initial_guess, CCi=key[1], kLai=key[2], **options)
+    Set_point(model, key)
+    if solution is None:
+        results = Solve(model, tee, timeout = timeout)
+    else:
+        Load_solution(model, solution)
+        results = Resolve_point(model, key[0], tee, timeout)
+    point = Extract_point(key[0], model, results)
+    if results.solver.termination_condition != pe.TerminationCondition.optimal:
+        return point, None
+    Worker_models[name] = model
+    return point, Store_solution(model)
+
+def Grid_sweep(design, max_workers = None, tee = False, timeout = None, **options):
+    '''Solves the points (ECc, CCc, kLa) of a grid or scattered design in a 
+    process pool. Every point is warm-started from the solution of the 
+    nearest optimal point solved so far, and the unsolved point nearest to 
+    the solved ones is scheduled next, so the solved region grows from the 
+    first points. As long as no point is solved, the workers solve points 
+    from Initial_guess that are spread over the design (each as far as 
+    possible from the points attempted before). options are passed to 
+    FunctionforPF (without CCi and kLai). The points are returned in the 
+    order of the design.'''
+    design = [tuple(float(x) for x in key) for key in design]
+    max_workers = max_workers or os.cpu_count()
+    # the scaled coordinates, the distance of each point to the nearest 
+    # solved and the nearest attempted point and the nearest solved point
+    scaled = np.array(design).reshape(-1, len(Sweep_params))/[scale for name, scale in Sweep_params]
+    nearest = np.full(len(design), np.inf)
+    farthest = np.full(len(design), np.inf)
+    neighbour = np.full(len(design), -1)
+    pending = np.ones(len(design), dtype=bool)
+    solutions, points = {}, {}
+    with ProcessPoolExecutor(max_workers = max_workers, initializer = Initialize_worker, 
+                             initargs = (Backend, Profile_file, Kinetics.Parameter_list())) as pool:
+        running = {}
+        while pending.any() or running:
+            while pending.any() and len(running) < max_workers:
+                if solutions:
+                    k = int(np.argmin(np.where(pending, nearest, np.inf)))
+                    solution = solutions[neighbour[k]]
+                else:
+                    k = int(np.argmax(np.where(pending, farthest, -1)))
+                    solution = None
+                pending[k] = False
+                farthest = np.minimum(farthest, np.linalg.norm(scaled-scaled[k], axis=1))
+                running[pool.submit(Grid_worker, design[k], solution, tee, timeout, **options)] = k
+            done, not_done = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                k = running.pop(future)
+                points[k], solution = future.result()
+                if solution is not None:
+                    solutions[k] = solution
+                    distance = np.linalg.norm(scaled-scaled[k], axis=1)
+                    neighbour = np.where(distance < nearest, k, neighbour)
+                    nearest = np.minimum(nearest, distance)
+    return [points[k] for k in range(len(design))]
+
+def Pareto_filter(points):
+    '''Returns the optimal points that are not dominated with respect to the 
+    three objectives: maximal space-time yield, minimal enzyme consumption 
+    and minimal cofactor consumption.'''
+    points = [point for point in points if point['info1'] == str(pe.TerminationCondition.optimal)]
+    F = np.array([[-point['SpaceTimeYield'], point['EnzymeConsumption'], 
+                   point['CofactorConsumption']] for point in points], dtype=float)
+    pareto = []
+    for k, point in enumerate(points):
+        dominated = np.any(np.all(F <= F[k], axis=1) & np.any(F < F[k], axis=1))
+        if not dominated:
+            pareto.append(point)
+    return pareto
+
+def Latin_hypercube(n, ranges = Multistart_ranges, seed = None):
+    '''Draws n initial values of the control variables (dicts like 
+    Initial_guess) from a Latin hypercube over ranges: the range of every 
+    variable is split into n intervals and each interval is drawn once. The 
+    supplementation times are sorted, since FunctionforPF requires 
+    tau1 <= tau2 <= tau3.'''
+    rng = np.random.default_rng(seed)
+    names = list(ranges)
+    lower, upper = np.array([ranges[name] for name in names], dtype=float).T
+    strata = rng.permuted(np.tile(np.arange(n), (len(names), 1)), axis=1).T
+    samples = lower+(strata+rng.random((n, len(names))))/n*(upper-lower)
+    starts = [dict(zip(names, sample.tolist())) for sample in samples]
+    for start in starts:
+        times = sorted(start[name] for name in ('tau1i', 'tau2i', 'tau3i'))
+        start.update(zip(('tau1i', 'tau2i', 'tau3i'), times))
+    return starts
+
+def Prescreen(starts, kLai = 1.2, n = 51):
+    '''Simulates the schedules of the initial values starts at once with 
+    SIM.Simulate_batch, with the initial states of FunctionforPF. Returns the 
+    yield and the space-time yield of each start.'''
+    tf = np.array([start['tfi'] for start in starts])
+    U = np.array([[start['tfi'], start['EUDHi'], start['EGlucDi'], start['EKdgDi'], 
+                   start['EKgsalDHi'], start['ENOXi'], start['A1i']/start['tfi'], 
+                   start['A2i']/start['tfi'], start['A3i']/start['tfi'], 
+                   start['tau1i']*start['tfi']/100, start['tau2i']*start['tfi']/100, 
+                   start['tau3i']*start['tfi']/100, kLai] for start in starts])
+    X0 = SIM.Initial_state(U.T)
+    X0[1] = [start['S1i'] for start in starts]
+    X0[7] = [start['S7i'] for start in starts]
+    X0[[2, 3, 4, 5, 6, 8]] = 0.001
+    t, X = SIM.Simulate_batch(U, n, X0 = X0)
+    Yield = (X[:,-1,6]-X[:,0,6])/X[:,0,1]
+    return Yield, X[:,-1,6]/(tf+30)
+
+def Multistart_worker(ECi, initial, tee = False, timeout = None, **options):
+    '''Solves the point ECi from the initial values initial in a worker 
+    process of Multistart and returns the point.'''
+    model, results = Solve_point(ECi, initial, tee, timeout, **options)
+    return Extract_point(ECi, model, results)
+
+def Multistart(ECi, starts, n_optima = 3, max_workers = None, tol = 1e-4, 
+               tee = False, timeout = None, **options):
+    '''Solves the point ECi from each of the initial values starts in a 
+    process pool, in the order of starts, and returns the best optimal point 
+    and the list of all points. Two optimal points are distinct local optima 
+    if their space-time yields differ by more than the relative tolerance tol; 
+    once n_optima distinct optima are found no further starts are submitted. 
+    options are passed to FunctionforPF.'''
+    max_workers = max_workers or os.cpu_count()
+    points, optima = [], []
+    pending = list(starts)
+    with ProcessPoolExecutor(max_workers = max_workers, initializer = Initialize_worker, 
+                             initargs = (Backend, Profile_file, Kinetics.Parameter_list())) as pool:
+        running = set()
+        while (pending and len(optima) < n_optima) or running:
+            while pending and len(optima) < n_optima and len(running) < max_workers:
+                running.add(pool.submit(Multistart_worker, ECi, pending.pop(0), tee, 
+                                        timeout, **options))
+            done, running = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                point = future.result()
+                points.append(point)
+                if point['info1'] != str(pe.TerminationCondition.optimal):
+                    continue
+                value = point['SpaceTimeYield']
+                if all(abs(value-other) > tol*max(abs(other), 1e-12) for other in optima):
+                    optima.append(value)
+    optimal = [point for point in points if point['info1'] == str(pe.TerminationCondition.optimal)]
+    best = max(optimal or points, key = lambda point: point['SpaceTimeYield'])
+    Record('multistart', ECi = ECi, starts = len(points), optimal = len(optimal), 
+           optima = len(optima), best = best['SpaceTimeYield'])
+    return best, points
+
+def Multistart_sweep(epsilons, n_starts = 32, n_optima = 3, max_workers = None, 
+                     seed = None, tee = False, timeout = None, **options):
+    '''Solves every epsilon value with Multistart from n_starts initial 
+    values drawn with Latin_hypercube. The starts whose simulated yield is 
+    below the bound 0.95 of FunctionforPF are discarded before any solve 
+    (Prescreen), and the others are solved in the order of their simulated 
+    space-time yield. If no start passes, Initial_guess is solved instead. 
+    Returns the best point of each epsilon value.'''
+    start = time.perf_counter()
+    starts = Latin_hypercube(n_starts, seed = seed)
+    Yield, SpaceTimeYield = Prescreen(starts, options.get('kLai', 1.2))
+    order = [k for k in np.argsort(-SpaceTimeYield) if Yield[k] >= 0.95]
+    starts = [starts[k] for k in order] or [dict(Initial_guess)]
+    Record('prescreen', starts = n_starts, feasible = len(starts), 
+           wall_time = time.perf_counter()-start)
+    return [Multistart(ECi, starts, n_optima, max_workers, tee = tee, timeout = timeout, 
+                       **options)[0] for ECi in epsilons]
+
+def Schedule_guess(u = None):
+    '''The initial values of FunctionforPF (see Initial_guess) of a control 
+    vector u of the simulation code (SIM.Control_vector() by default) with 
+    the initial S1 and S7 titers of the simulation code.'''
+    u = SIM.Control_vector() if u is None else u
+    tf = u[0]
+    guess = {'tfi': tf, 'S1i': SIM.S1_initial, 'S7i': SIM.S7_initial}
+    guess.update(zip(('EUDHi', 'EGlucDi', 'EKdgDi', 'EKgsalDHi', 'ENOXi'), u[1:6]))
+    guess.update(zip(('A1i', 'A2i', 'A3i'), u[6:9]*tf))
+    guess.update(zip(('tau1i', 'tau2i', 'tau3i'), 100*u[9:12]/tf))
+    return {key: float(value) for key, value in guess.items()}
+
+def Compare_formulations(ECi, initial = None, tee = False, timeout = None, **options):
+    '''Builds and solves the full and the compact formulation for the epsilon 
+    value ECi from the initial values initial (Schedule_guess by default; the 
+    compact rate expressions cannot be evaluated at the zero titers of 
+    Initial_guess) and reports the number of variables and constraints, the 
+    build and solve times, the objective and the termination of both. Each 
+    report is also written as a 'compare' record.'''
+    initial = Schedule_guess() if initial is None else initial
+    report = {}
+    for compact in (False, True):
+        start = time.perf_counter()
+        model = FfPF.FunctionforPF(ECi, **initial, compact=compact, **options)
+        Add_suffixes(model)
+        built = time.perf_counter()
+        results = Solve(model, tee, timeout = timeout)
+        solved = time.perf_counter()
+        report['compact' if compact else 'full'] = {
+            'variables': model.nvariables(),
+            'constraints': model.nconstraints(),
+            'build time': built-start,
+            'solve time': solved-built,
+            'objective': Value(model.obj),
+            'termination': str(results.solver.termination_condition)}
+        Record('compare', ECi = ECi, compact = compact, 
+               **{key.replace(' ', '_'): value for key, value in report['compact' if compact else 'full'].items()})
+    return report
+
+def Write_point(point, w1):
+    '''Prints the results of one optimization on an individual text file.'''
+    with open("ParetoOptimalPoint{}.txt".format(w1), "w+") as file:
+        print('tau', file = file)
+        print(np.asarray(point['tau']).tolist(), file = file)
+        for label, name in Profiles:
+            print(label, file = file)
+            print(np.asarray(point[label]).tolist(), file = file)
+        for label, key in [('tf', 'FinalTime'), ('tau1', 't1'), ('tau2', 't2'), 
+                           ('tau3', 't3'), ('A1', 'A1'), ('A2', 'A2'), ('A3', 'A3'),
+                           ('SumEnzymes', 'TotalEnzymeConcentration'), 
+                           ('OBJF', 'SpaceTimeYield'), ('Yield', 'Yield'),
+                           ('S1[0]', 'InitialS1Concentration'), 
+                           ('S7[0]', 'InitialS7Concentration'),
+                           ('O1', 'O1s'), ('O2', 'O2s'), ('O3', 'O3s')]:
+            print(label, file = file)
+            print(point[key], file = file)
+
+def Save_results(points, filename = 'ParetoOptimalPoints.npz'):
+    '''Saves all Pareto-optimal points in one compressed columnar file. Each 
+    overview quantity is stored as one column with an entry per point. The 
+    profiles of all points are concatenated into one column per profile, 
+    point k occupying the rows offsets[k]:offsets[k+1] (the meshes of the 
+    points may differ in size).'''
+    columns = {}
+    for key in Overview:
+        columns[key] = np.array([point[key] for point in points])
+    lengths = [len(point['tau']) for point in points]
+    columns['offsets'] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    for label in ['tau'] + [label for label, name in Profiles]:
+        columns[label] = np.concatenate([np.asarray(point[label], dtype=float) 
+                                         for point in points]) if points else np.zeros(0)
+    np.savez_compressed(filename, **columns)
+
+def Load_results(filename = 'ParetoOptimalPoints.npz'):
+    '''Loads a file written by Save_results and returns its columns as a dict 
+    of arrays. Single points are recovered with Get_point.'''
+    with np.load(filename) as data:
+        return {key: data[key] for key in data.files}
+
+def Get_point(results, k):
+    '''Returns point k of the columns loaded by Load_results as a dict like 
+    the ones built by Extract_point.'''
+    start, end = results['offsets'][k], results['offsets'][k+1]
+    point = {key: results[key][k].item() for key in Overview}
+    for label in ['tau'] + [label for label, name in Profiles]:
+        point[label] = results[label][start:end]
+    return point
+
+def Plot_point(point, i):
+    '''Plots the process schedule of one Pareto-optimal point.'''
     # definition of the real time variable for plotting 
-    tfp = pe.value(model.tf)
-    realtime = [element * tfp for element in list(model.tau)]
+    tfp = point['FinalTime']
+    realtime = [element * tfp for element in point['tau']]
 
     # plotting the process schedules     
     plt.figure(figsize=(9,8))
     plt.subplot(311)
-    plt.plot(realtime, [pe.value(model.S1[x]) for x in model.tau], label = 'S1', c = 'b', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S2[x]) for x in model.tau], label = 'S2', c = 'c', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S3[x]) for x in model.tau], label = 'S3', c = 'm', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S4[x]) for x in model.tau], label = 'S4', c = 'y', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S5[x]) for x in model.tau], label = 'S5', c = 'r', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S6[x]) for x in model.tau], label = 'S6', c = 'k', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S7[x]) for x in model.tau], label = 'S7', c = 'g', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.S8[x]) for x in model.tau], label = 'S8', c = '0.75',  ls = '-', lw = '2')
+    plt.plot(realtime, point['S1'], label = 'S1', c = 'b', ls = '-', lw = '2')
+    plt.plot(realtime, point['S2'], label = 'S2', c = 'c', ls = '-', lw = '2')
+    plt.plot(realtime, point['S3'], label = 'S3', c = 'm', ls = '-', lw = '2')
+    plt.plot(realtime, point['S4'], label = 'S4', c = 'y', ls = '-', lw = '2')
+    plt.plot(realtime, point['S5'], label = 'S5', c = 'r', ls = '-', lw = '2')
+    plt.plot(realtime, point['S6'], label = 'S6', c = 'k', ls = '-', lw = '2')
+    plt.plot(realtime, point['S7'], label = 'S7', c = 'g', ls = '-', lw = '2')
+    plt.plot(realtime, point['S8'], label = 'S8', c = '0.75',  ls = '-', lw = '2')
     plt.xlabel('$\it{t}$ / (min)', fontsize=17)
     plt.ylabel('$\it{S}$$_i$ / (mM)', fontsize=17)
     plt.grid(False)
@@ -238,11 +1056,11 @@ for ECi in [0, 0.025, 0.050, 0.075, 0.100, 0.125, 0.150]:
     plt.yticks(fontsize=17)
 
     plt.subplot(312)
-    plt.plot(realtime, [pe.value(model.EUDH[x]) for x in model.tau], label = 'UDH', c = 'b', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.EGlucD[x]) for x in model.tau], label = 'GlucD', c = 'r', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.EKdgD[x]) for x in model.tau], label = 'KdgD', c = 'c', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.EKgsalDH[x]) for x in model.tau], label = 'KgsalDH', c = 'g', ls = '-', lw = '2')
-    plt.plot(realtime, [pe.value(model.ENOX[x]) for x in model.tau], label = 'NOX', c = 'm', ls = '-', lw = '2')
+    plt.plot(realtime, point['Ep1'], label = 'UDH', c = 'b', ls = '-', lw = '2')
+    plt.plot(realtime, point['Ep3'], label = 'GlucD', c = 'r', ls = '-', lw = '2')
+    plt.plot(realtime, point['Ep4'], label = 'KdgD', c = 'c', ls = '-', lw = '2')
+    plt.plot(realtime, point['Ep5'], label = 'KgsalDH', c = 'g', ls = '-', lw = '2')
+    plt.plot(realtime, point['Ep6'], label = 'NOX', c = 'm', ls = '-', lw = '2')
     plt.xlabel('$\it{t}$ / (min)', fontsize=17)  
     plt.ylabel('$\it{E}$$^{\mathrm{j}}$ / (μM)', fontsize=17)
     plt.grid(False)
@@ -250,7 +1068,7 @@ for ECi in [0, 0.025, 0.050, 0.075, 0.100, 0.125, 0.150]:
     plt.xticks(fontsize=17)
 
     plt.subplot(313)
-    plt.plot(realtime, [pe.value(model.S9[x]) for x in model.tau], label = 'S9', c = 'b', ls = '-', lw = '2')
+    plt.plot(realtime, point['S9'], label = 'S9', c = 'b', ls = '-', lw = '2')
     plt.xlabel('$\it{t}$ / (min)', fontsize=17)
     plt.ylabel('$\it{S}$$_{9}$ / (mM)', fontsize=17)
     plt.grid(False)
@@ -263,55 +1081,109 @@ for ECi in [0, 0.025, 0.050, 0.075, 0.100, 0.125, 0.150]:
     pylab.savefig('ParetoOptimalPoint{}.PNG'.format(i))
     pylab.savefig('ParetoOptimalPoint{}.PDF'.format(i))
     plt.show() 
-    
-    i = i + 1
-    w1 = w1 + 1
-
-# printing an overview of the results of all runs 
-print('SpaceTimeYield', file = open("Overview.txt", "w+"))
-print(SpaceTimeYield, file = open("Overview.txt", "a"))
-print('EnzymeConsumption', file = open("Overview.txt", "a"))
-print(EnzymeConsumption, file = open("Overview.txt", "a"))
-print('CofactorConsumption', file = open("Overview.txt", "a"))
-print(CofactorConsumption, file = open("Overview.txt", "a"))
-print('FinalTime', file = open("Overview.txt", "a"))
-print(FinalTime, file = open("Overview.txt", "a"))
-print('InitialS1Concentration', file = open("Overview.txt", "a"))
-print(InitialS1Concentration, file = open("Overview.txt", "a"))
-print('InitialS7Concentration', file = open("Overview.txt", "a"))
-print(InitialS7Concentration, file = open("Overview.txt", "a"))
-print('EUDH', file = open("Overview.txt", "a"))
-print(EUDH, file = open("Overview.txt", "a"))
-print('EGlucD', file = open("Overview.txt", "a"))
-print(EGlucD, file = open("Overview.txt", "a"))
-print('EKdgD', file = open("Overview.txt", "a"))
-print(EKdgD, file = open("Overview.txt", "a"))
-print('EKgsalDH', file = open("Overview.txt", "a"))
-print(EKgsalDH, file = open("Overview.txt", "a"))
-print('ENOX', file = open("Overview.txt", "a"))
-print(ENOX, file = open("Overview.txt", "a"))
-print('A1', file = open("Overview.txt", "a"))
-print(A1, file = open("Overview.txt", "a"))
-print('A2', file = open("Overview.txt", "a"))
-print(A2, file = open("Overview.txt", "a"))
-print('A3', file = open("Overview.txt", "a"))
-print(A3, file = open("Overview.txt", "a"))
-print('t1', file = open("Overview.txt", "a"))
-print(t1, file = open("Overview.txt", "a"))
-print('t2', file = open("Overview.txt", "a"))
-print(t2, file = open("Overview.txt", "a"))
-print('t3', file = open("Overview.txt", "a"))
-print(t3, file = open("Overview.txt", "a"))
-
-print('TotalEnzymeConcentration', file = open("Overview.txt", "a"))
-print(TotalEnzymeConcentration, file = open("Overview.txt", "a"))
-print('info1', file = open("Overview.txt", "a"))
-print(info1, file = open("Overview.txt", "a"))
-print('info2', file = open("Overview.txt", "a"))
-print(info2, file = open("Overview.txt", "a"))
-print('O1s', file = open("Overview.txt", "a"))
-print(O1s, file = open("Overview.txt", "a"))
-print('O2s', file = open("Overview.txt", "a"))
-print(O2s, file = open("Overview.txt", "a"))
-print('O3s', file = open("Overview.txt", "a"))
-print(O3s, file = open("Overview.txt", "a"))
\ No newline at end of file
+
+
+if __name__ == '__main__':
+    # the epsilon values for the epsilon-EC constraint 
+    Epsilons = [0, 0.025, 0.050, 0.075, 0.100, 0.125, 0.150]
+    # the epsilon value for the cofactor consumption (mM/min), the volumetric 
+    # mass transfer coefficient (min^(-1)), the choice of the compact 
+    # formulation of the model and the discretization (number of finite 
+    # elements, 'BACKWARD' finite differences or 'LAGRANGE-RADAU' collocation 
+    # with ncp collocation points)
+    options = {'CCi': 0.005, 'kLai': 1.2, 'compact': False, 
+               'nfe': 100, 'scheme': 'BACKWARD', 'ncp': 3, 'exp_tanh': False}
+    # the number of warm-start chains solved in parallel (1 solves all points 
+    # in one serial chain)
+    n_chains = 2
+    # generate the front adaptively between the first and the last epsilon 
+    # value with at most budget solves instead of solving every epsilon value
+    adaptive = False
+    budget = 15
+    # follow the front with a predictor-corrector path ('sipopt' sensitivity 
+    # or 'secant' extrapolation) instead of the parallel chains (None)
+    predictor = None
+    # the directory of the solve cache (None solves every point)
+    cache_dir = 'SolveCache'
+    # the prefix of the checkpoint files of the sweep (None: no checkpoints; 
+    # delete the files to start the sweep again) and the time limit of each 
+    # solve (s)
+    checkpoint = 'SweepCheckpoint'
+    timeout = 3600
+    # additionally print each point and the overview on text files and plot 
+    # each point (for short sweeps)
+    write_text = True
+    # the points (ECc, CC bound, kLa) of a grid over all three parameters, 
+    # e.g. list(itertools.product(Epsilons, [0.005, 0.01], [0.8, 1.2, 1.6])); 
+    # None sweeps only the epsilon values above
+    grid = None
+    # solve every epsilon value from n_starts Latin-hypercube initial values 
+    # (see Multistart_sweep) until n_optima distinct local optima are found 
+    # and keep the best point (0 solves the warm-start chains instead)
+    n_starts = 0
+    n_optima = 3
+    # refine the mesh of every point a posteriori up to refinements times, 
+    # starting from nfe uniform elements (see Solve_adaptive; 0 solves the 
+    # warm-start chains on the uniform mesh)
+    refinements = 0
+    # compare the full and the compact formulation at the epsilon value 
+    # compare before the sweep (see Compare_formulations; None skips it)
+    compare = None
+    # the interface to IPOPT ('ipopt', 'appsi' or 'cyipopt'); 'appsi' needs 
+    # the option 'exp_tanh': True
+    Set_backend('ipopt')
+    # the file of the timing and solver statistics records (JSON lines)
+    Set_profile('Profile.jsonl')
+    # the file of fitted kinetic parameters (Estimation_CascadeMOO.py); None 
+    # keeps the parameters of Kinetics_CascadeMOO.py
+    parameter_file = None
+    if parameter_file is not None:
+        Kinetics.Load_parameters(parameter_file)
+
+    if compare is not None:
+        formulation_options = {key: value for key, value in options.items() if key != 'compact'}
+        for name, row in Compare_formulations(compare, timeout = timeout, **formulation_options).items():
+            print(name, row)
+    if grid is not None:
+        grid_options = {key: value for key, value in options.items() 
+                        if key not in ('CCi', 'kLai')}
+        points = Grid_sweep(grid, tee = False, timeout = timeout, **grid_options)
+        # the three-objective Pareto set (STY, EC, CC) of the grid
+        Save_results(Pareto_filter(points), 'ParetoSet.npz')
+    elif n_starts:
+        points = Multistart_sweep(Epsilons, n_starts, n_optima, timeout = timeout, **options)
+    elif refinements:
+        points = Refined_sweep(Epsilons, refinements, timeout = timeout, **options)
+    elif adaptive:
+        points = Adaptive_sweep(min(Epsilons), max(Epsilons), budget, **options)
+    elif predictor:
+        points = Path_sweep(Epsilons, predictor, **options)
+    else:
+        points = Parallel_sweep(Epsilons, n_chains, tee = (n_chains == 1), 
+                                cache_dir = cache_dir, checkpoint = checkpoint, 
+                                timeout = timeout, **options)
+
+    # saving the results of all optimization runs 
+    start = time.perf_counter()
+    Save_results(points, 'ParetoOptimalPoints.npz')
+    Record('save', points = len(points), wall_time = time.perf_counter()-start)
+
+    if write_text:
+        i = 1
+        w1 = 1
+        for point in points:
+            start = time.perf_counter()
+            Write_point(point, w1)
+            written = time.perf_counter()
+            Plot_point(point, i)
+            Record('write', ECi = point['ECi'], wall_time = written-start)
+            Record('plot', ECi = point['ECi'], wall_time = time.perf_counter()-written)
+            i = i + 1
+            w1 = w1 + 1
+
+        # printing an overview of the results of all runs 
+        Results = Load_results('ParetoOptimalPoints.npz')
+        with open("Overview.txt", "w+") as file:
+            for key in Overview:
+                print(key, file = file)
+                print(Results[key].tolist(), file = file)
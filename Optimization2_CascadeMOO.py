@@ -11,31 +11,66 @@
 # ----------------------------------------------------------------------------
 from pyomo.environ import *
 from pyomo.dae import *
+import numpy as np
+import time
+import Kinetics_CascadeMOO as Kinetics
 
 def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
-                  tau1i,tau2i,tau3i,A1i,A2i,A3i): 
-    
-
+                  tau1i,tau2i,tau3i,A1i,A2i,A3i,CCi=0.005,kLai=1.2,
+                  compact=False,nfe=100,scheme='BACKWARD',ncp=3,mesh=None,
+                  exp_tanh=False,p=None): 
+    '''Builds the discretized model. ECc, CCc and kLa are mutable Params, so the 
+    same model can be re-solved for other epsilon values and kLa values.
+    
+    With compact=True a reduced formulation of the same NLP is built: the 
+    reaction, deactivation, supplementation and oxygen transfer rates are 
+    substituted as Expressions instead of algebraic variables, the enzymes 
+    except NOX are scalar variables, the epsilon constraint on EC is stated 
+    once and the objective is S6[1]/(tf+30) without the indexed OBJ variable. 
+    The results are accessed with the same names in both formulations.
+    
+    scheme selects the discretization: 'BACKWARD', 'FORWARD' or 'CENTRAL' 
+    finite differences, or orthogonal collocation with ncp points per element 
+    ('LAGRANGE-RADAU' or 'LAGRANGE-LEGENDRE'). The nfe elements are uniform 
+    unless the element boundaries are given as mesh (including 0 and 1).
+    
+    With exp_tanh=True the supplementation pulses use tanh(x) written as 
+    1-2/(exp(2x)+1), for NL writers without tanh (the APPSI interface); the 
+    arguments stay within about +-100, so exp does not overflow.
+    
+    p is a parameter vector in the order of Kinetics.P_names (one scenario of 
+    the kinetic parameters); by default the parameters of 
+    Kinetics_CascadeMOO.py are used.
+    
+    The wall times of the construction and the discretization are kept in 
+    model._build_times.'''
+    
+    start = time.perf_counter()
     model = ConcreteModel()
 
 
     # total batch running time (min)
     model.tf = Var(bounds = (10,50000), initialize = tfi)     
     # scaled batch running time (min/min)                 
-    model.tau = ContinuousSet(bounds=(0,1)) 
-    # the reaction rates (mM/min)
-    model.vI = Var(model.tau, within=NonNegativeReals)
-    model.vII = Var(model.tau, within=NonNegativeReals)
-    model.vIII = Var(model.tau, within=NonNegativeReals)
-    model.vIV = Var(model.tau, within=NonNegativeReals)
-    model.vV = Var(model.tau, within=NonNegativeReals)
-    model.vVI = Var(model.tau, within=NonNegativeReals)
-    # the NOX deactivation rate (mM/min)
-    model.rdNOX = Var(model.tau, within=NonNegativeReals) 
-    # the NOX supplementation rate (mM/min)
-    model.rsNOX = Var(model.tau, within=NonNegativeReals)
-    # the oxygen mass transfer rate (mM/min)
-    model.NO2 = Var(model.tau, within=NonNegativeReals)
+    if mesh is None:
+        model.tau = ContinuousSet(bounds=(0,1)) 
+    else:
+        model.tau = ContinuousSet(initialize=mesh) 
+        nfe = len(mesh)-1
+    if not compact:
+        # the reaction rates (mM/min)
+        model.vI = Var(model.tau, within=NonNegativeReals)
+        model.vII = Var(model.tau, within=NonNegativeReals)
+        model.vIII = Var(model.tau, within=NonNegativeReals)
+        model.vIV = Var(model.tau, within=NonNegativeReals)
+        model.vV = Var(model.tau, within=NonNegativeReals)
+        model.vVI = Var(model.tau, within=NonNegativeReals)
+        # the NOX deactivation rate (mM/min)
+        model.rdNOX = Var(model.tau, within=NonNegativeReals) 
+        # the NOX supplementation rate (mM/min)
+        model.rsNOX = Var(model.tau, within=NonNegativeReals)
+        # the oxygen mass transfer rate (mM/min)
+        model.NO2 = Var(model.tau, within=NonNegativeReals)
     # the substrate concentrations (mM)
     model.S1 = Var(model.tau, bounds = (0, 1000), initialize = S1i)
     model.S2 = Var(model.tau, bounds = (0, 1000))
@@ -47,10 +82,21 @@ def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
     model.S8 = Var(model.tau, bounds = (0, 500))
     model.S9 = Var(model.tau, bounds = (0, 1000))
     # the enzyme concentrations (μM)
-    model.EUDH= Var(model.tau, bounds = (0, 1000), initialize = EUDHi)
-    model.EGlucD= Var(model.tau, bounds = (0, 1000), initialize = EGlucDi)
-    model.EKdgD= Var(model.tau, bounds = (0, 1000), initialize = EKdgDi)
-    model.EKgsalDH= Var(model.tau, bounds = (0, 1000), initialize = EKgsalDHi)
+    if compact:
+        # the enzymes except NOX are constant during the batch 
+        model.EUDH0 = Var(bounds = (0, 1000), initialize = EUDHi)
+        model.EGlucD0 = Var(bounds = (0, 1000), initialize = EGlucDi)
+        model.EKdgD0 = Var(bounds = (0, 1000), initialize = EKdgDi)
+        model.EKgsalDH0 = Var(bounds = (0, 1000), initialize = EKgsalDHi)
+        model.EUDH = Expression(model.tau, rule=lambda m, tau: m.EUDH0)
+        model.EGlucD = Expression(model.tau, rule=lambda m, tau: m.EGlucD0)
+        model.EKdgD = Expression(model.tau, rule=lambda m, tau: m.EKdgD0)
+        model.EKgsalDH = Expression(model.tau, rule=lambda m, tau: m.EKgsalDH0)
+    else:
+        model.EUDH= Var(model.tau, bounds = (0, 1000), initialize = EUDHi)
+        model.EGlucD= Var(model.tau, bounds = (0, 1000), initialize = EGlucDi)
+        model.EKdgD= Var(model.tau, bounds = (0, 1000), initialize = EKdgDi)
+        model.EKgsalDH= Var(model.tau, bounds = (0, 1000), initialize = EKgsalDHi)
     model.ENOX= Var(model.tau, bounds = (0, 1000), initialize = ENOXi)
     # the first order derivatives of the substrate concentrations (mM/min)
     model.dS1dt = DerivativeVar(model.S1, wrt=model.tau, within=Reals)
@@ -63,17 +109,19 @@ def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
     model.dS8dt = DerivativeVar(model.S8, wrt=model.tau, within=Reals)
     model.dS9dt = DerivativeVar(model.S9, wrt=model.tau, within=Reals)
     # the first order derivatives of the enzyme concentrations (μΜ)
-    model.dEUDHdt = DerivativeVar(model.EUDH, wrt=model.tau, within=Reals)
-    model.dEGlucDdt = DerivativeVar(model.EGlucD, wrt=model.tau, within=Reals)
-    model.dEKdgDdt = DerivativeVar(model.EKdgD, wrt=model.tau, within=Reals)
-    model.dEKgsalDHdt = DerivativeVar(model.EKgsalDH, wrt=model.tau, within=Reals)
+    if not compact:
+        model.dEUDHdt = DerivativeVar(model.EUDH, wrt=model.tau, within=Reals)
+        model.dEGlucDdt = DerivativeVar(model.EGlucD, wrt=model.tau, within=Reals)
+        model.dEKdgDdt = DerivativeVar(model.EKdgD, wrt=model.tau, within=Reals)
+        model.dEKgsalDHdt = DerivativeVar(model.EKgsalDH, wrt=model.tau, within=Reals)
     model.dENOXdt = DerivativeVar(model.ENOX, wrt=model.tau, within=Reals)
-    # the supplementation rate for the first NOX supplementation (μΜ/min)
-    model.NOXSup1 = Var(model.tau)
-    # the supplementation rate for the second NOX supplementation (μΜ/min)
-    model.NOXSup2 = Var(model.tau)
-    # the supplementation rate for the third NOX supplementation (μΜ/min)
-    model.NOXSup3 = Var(model.tau)
+    if not compact:
+        # the supplementation rate for the first NOX supplementation (μΜ/min)
+        model.NOXSup1 = Var(model.tau)
+        # the supplementation rate for the second NOX supplementation (μΜ/min)
+        model.NOXSup2 = Var(model.tau)
+        # the supplementation rate for the third NOX supplementation (μΜ/min)
+        model.NOXSup3 = Var(model.tau)
     # the total amount of NOX added  during the first supplementation (μΜ)
     model.O1 = Var(model.tau, within=NonNegativeReals)
     # the total amount of NOX added  during the second supplementation (μΜ)
@@ -98,8 +146,9 @@ def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
     model.A2 = Var(within=NonNegativeReals, initialize = A2i)
     # the magnitude of the first NOX supplementation (μΜ/min)
     model.A3 = Var(within=NonNegativeReals, initialize = A3i)
-    # the solubility of oxygen (mM)
-    model.S9star = Var(within=NonNegativeReals)
+    if not compact:
+        # the solubility of oxygen (mM)
+        model.S9star = Var(within=NonNegativeReals)
     # the total concentration of all enzymes used during the batch (μΜ)
     model.SumEnzymes = Var(within=NonNegativeReals)
     # the yield (mM/mM)
@@ -108,181 +157,213 @@ def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
     model.CC = Var(within=NonNegativeReals)
     # the enzyme consumption (μΜ/min)
     model.EC = Var(within=NonNegativeReals, initialize = ECi)
-    # the objective (Space-time yield) (mM/min)
-    model.OBJ = Var(model.tau, within=NonNegativeReals)
+    if not compact:
+        # the objective (Space-time yield) (mM/min)
+        model.OBJ = Var(model.tau, within=NonNegativeReals)
 
     
     model.L = Set(initialize = ['UDH','GlucD','KdgD','KgsalDH','NOX'])
     model.M = Set(initialize = [1,2,3,4,5,6,7,8,9])
 
+    # the kinetic parameters are shared with the simulation (Kinetics_CascadeMOO.py)
+    kinetic = Kinetics.Parameter_dicts(Kinetics.Parameter_list() if p is None else p)
     # the molecular weights of all enzymes (mg/mM)
-    mw = {}
-    mw['UDH']    = 31210
-    mw['GlucD']  = 51010
-    mw['KdgD']   = 34790
-    mw['KgsalDH'] = 57700
-    mw['NOX']    = 51940
-    model.mw = Param(model.L, initialize = mw)
-
+    model.mw = Param(model.L, initialize = Kinetics.MW)
     # the maximum reaction rates of all enzyme catalyzed reactions (U/mg)
-    Vmax = {}
-    Vmax['UDH'] = 221.331
-    Vmax['GlucD'] = 8.876
-    Vmax['KdgD'] = 5.109
-    Vmax['KgsalDH'] = 40.701
-    Vmax['NOX'] = 16.409
-    model.Vmax = Param(model.L, initialize = Vmax)
-    
+    model.Vmax = Param(model.L, initialize = kinetic['Vmax'])
     # the kinetic parameters of all enzyme catalyzed reactions (mM)
-    Km = {}
-    Km['UDH',1] = 0.0780
-    Km['UDH',7] = 0.5884
-    Km['GlucD',3] = 0.2945
-    Km['KdgD',3] = 0.4652
-    Km['KgsalDH',5] = 0.4812
-    Km['KgsalDH',7] = 0.1760
-    Km['NOX',7] = 0.1420
-    Km['NOX',8] = 0.0050
-    Km['NOX',9] = 0.0045
-    model.Km = Param(model.L, model.M, initialize = Km)
+    model.Km = Param(model.L, model.M, initialize = kinetic['Km'])
     
     # the first order kinetic parameter for the lactone opening (min^(-1))
-    model.kII = Param(initialize = 0.013)
+    model.kII = Param(initialize = kinetic['kII'])
     # the first order decay constant for the NOX deactivation (min^(-1))
-    model.kNOX = Param(initialize = 0.03)
+    model.kNOX = Param(initialize = kinetic['kNOX'])
     # the epsilon constraint for the enzyme consumption (μΜ/min)
-    model.ECc = Param(initialize = ECi)
+    model.ECc = Param(initialize = ECi, mutable = True)
+    # the epsilon constraint for the cofactor consumption (mM/min)
+    model.CCc = Param(initialize = CCi, mutable = True)
     # the total pressure of the gas bubbles (atm)
-    model.ptot = Param(initialize = 1)
+    model.ptot = Param(initialize = Kinetics.ptot)
     # the mole fraction of oxygen in the air bubbles (mol/mol)
-    model.y9 = Param(initialize = 0.2099)
+    model.y9 = Param(initialize = Kinetics.y9)
     # Henry's constant (m^3 atm / (mol))
-    model.Hc = Param(initialize = 0.774) 
+    model.Hc = Param(initialize = Kinetics.Hc) 
     # the volumetric mass transfer coefficient (min^(-1))
-    model.kLa = Param(initialize = 1.2)
+    model.kLa = Param(initialize = kLai, mutable = True)
+    
+    # the reaction rate kinetics from the rate laws of Kinetics_CascadeMOO.py 
+    def states(m, tau):
+        X = {i: getattr(m, name)[tau] for i, name in enumerate(Kinetics.Substrates, 1)}
+        for enzyme, i in Kinetics.Enzyme_index.items():
+            X[i] = getattr(m, 'E' + enzyme)[tau]
+        return X
+    
+    def constants(m):
+        k = {}
+        for name, (component, key) in zip(Kinetics.P_names, Kinetics.P_keys):
+            k[name] = getattr(m, component) if key is None else getattr(m, component)[key]
+        for enzyme in Kinetics.Enzymes:
+            k['MW_' + enzyme] = m.mw[enzyme]
+        k['S9_Star'] = m.S9star
+        k['kLa'] = m.kLa
+        return k
+    
+    def law(name):
+        return lambda m, tau: Kinetics.Rate_laws[name](states(m, tau), k)
+    
+    rate1, rate2, rate3 = law('I'), law('II'), law('III')
+    rate4, rate5, rate6 = law('IV'), law('V'), law('VI')
+
+    # the NOX deactivation and supplementation rates 
+    rateE1 = law('dNOX')
     
-    # the reaction rate kinetics 
-    def rr1(m, tau):
-        return model.vI[tau] == model.EUDH[tau]*model.mw['UDH']*10**(-6)*(model.Vmax['UDH']*model.S1[tau]*model.S7[tau])/((model.Km['UDH',7]*model.S7[tau])+(model.Km['UDH',1]*model.S1[tau])+(model.S1[tau]*model.S7[tau]))
-    model.rr1con = Constraint(model.tau, rule=rr1)
+    def rateE2(m, tau):
+        return model.NOXSup1[tau]/model.tf + model.NOXSup2[tau]/model.tf + model.NOXSup3[tau]/model.tf
     
-    def rr2(m, tau):
-        return model.vII[tau] == model.kII*model.S2[tau]
-    model.rr2con = Constraint(model.tau, rule=rr2)    
+    # tanh, or the same function through exp
+    if exp_tanh:
+        pulse = lambda x: 1-2/(exp(2*x)+1)
+    else:
+        pulse = tanh
+
+    def sup1(m, tau):
+        return model.A1*Kinetics.Pulse(tau, model.tau1, model.tf, pulse)
     
-    def rr3(m, tau):
-        return model.vIII[tau] == model.EGlucD[tau]*model.mw['GlucD']*10**(-6)*(model.Vmax['GlucD']*model.S3[tau])/(model.Km['GlucD',3]+model.S3[tau])
-    model.rr3con = Constraint(model.tau, rule=rr3)
+    def sup2(m, tau):
+        return model.A2*Kinetics.Pulse(tau, model.tau2, model.tf, pulse)
     
-    def rr4(m, tau):   
-        return model.vIV[tau] == model.EKdgD[tau]*model.mw['KdgD']*10**(-6)*(model.Vmax['KdgD']*model.S4[tau])/(model.Km['KdgD',3]+model.S4[tau])
-    model.rr4con = Constraint(model.tau, rule=rr4)
+    def sup3(m, tau):
+        return model.A3*Kinetics.Pulse(tau, model.tau3, model.tf, pulse)
     
-    def rr5(m, tau): 
-        return model.vV[tau] == model.EKgsalDH[tau]*model.mw['KgsalDH']*10**(-6)*(model.Vmax['KgsalDH']*model.S5[tau]*model.S7[tau])/((model.Km['KgsalDH',7]*model.S7[tau])+(model.Km['KgsalDH',5]*model.S5[tau])+(model.S5[tau]*model.S7[tau]))
-    model.rr5con = Constraint(model.tau, rule=rr5)
+    # the oxygen solubility and mass transfer rate 
+    def solubility(m):
+        return model.ptot*model.y9/model.Hc
     
-    def rr6(m, tau):  
-        return model.vVI[tau] == model.ENOX[tau]*model.mw['NOX']*10**(-6)*(model.Vmax['NOX']*model.S8[tau]*model.S9[tau])/((model.Km['NOX',8]+model.S8[tau]*(1+model.S7[tau]/model.Km['NOX',7]))*(model.Km['NOX',9]+model.S9[tau]))
-    model.rr6con = Constraint(model.tau, rule=rr6)
-
-    # the NOX deactivation and supplementation rates 
-    def rE1(m, tau):
-        return model.rdNOX[tau] == model.kNOX*model.ENOX[tau]
-    model.rE1con = Constraint(model.tau, rule=rE1)
+    transfer = law('O2')
     
-    def rE2(m, tau):
-        return model.rsNOX[tau] == model.NOXSup1[tau]/model.tf + model.NOXSup2[tau]/model.tf + model.NOXSup3[tau]/model.tf
-    model.rE2con = Constraint(model.tau, rule=rE2)
+    if compact:
+        model.S9star = Expression(rule=solubility)
+    k = constants(model)
+
+    if compact:
+        model.vI = Expression(model.tau, rule=rate1)
+        model.vII = Expression(model.tau, rule=rate2)
+        model.vIII = Expression(model.tau, rule=rate3)
+        model.vIV = Expression(model.tau, rule=rate4)
+        model.vV = Expression(model.tau, rule=rate5)
+        model.vVI = Expression(model.tau, rule=rate6)
+        model.rdNOX = Expression(model.tau, rule=rateE1)
+        model.NOXSup1 = Expression(model.tau, rule=sup1)
+        model.NOXSup2 = Expression(model.tau, rule=sup2)
+        model.NOXSup3 = Expression(model.tau, rule=sup3)
+        model.rsNOX = Expression(model.tau, rule=rateE2)
+        model.NO2 = Expression(model.tau, rule=transfer)
+    else:
+        def rr1(m, tau):
+            return model.vI[tau] == rate1(m, tau)
+        model.rr1con = Constraint(model.tau, rule=rr1)
+        
+        def rr2(m, tau):
+            return model.vII[tau] == rate2(m, tau)
+        model.rr2con = Constraint(model.tau, rule=rr2)    
+        
+        def rr3(m, tau):
+            return model.vIII[tau] == rate3(m, tau)
+        model.rr3con = Constraint(model.tau, rule=rr3)
+        
+        def rr4(m, tau):   
+            return model.vIV[tau] == rate4(m, tau)
+        model.rr4con = Constraint(model.tau, rule=rr4)
+        
+        def rr5(m, tau): 
+            return model.vV[tau] == rate5(m, tau)
+        model.rr5con = Constraint(model.tau, rule=rr5)
+        
+        def rr6(m, tau):  
+            return model.vVI[tau] == rate6(m, tau)
+        model.rr6con = Constraint(model.tau, rule=rr6)
     
-    def sup1NOX(m, tau):
-        return model.NOXSup1[tau] == model.A1*((tanh(100*tau-model.tau1))-(tanh(100*tau-(model.tau1+4/model.tf))))
-    model.sup1NOXcon = Constraint(model.tau, rule=sup1NOX)
+        def rE1(m, tau):
+            return model.rdNOX[tau] == rateE1(m, tau)
+        model.rE1con = Constraint(model.tau, rule=rE1)
+        
+        def rE2(m, tau):
+            return model.rsNOX[tau] == rateE2(m, tau)
+        model.rE2con = Constraint(model.tau, rule=rE2)
+        
+        def sup1NOX(m, tau):
+            return model.NOXSup1[tau] == sup1(m, tau)
+        model.sup1NOXcon = Constraint(model.tau, rule=sup1NOX)
+        
+        def sup2NOX(m, tau):
+            return model.NOXSup2[tau] == sup2(m, tau)
+        model.sup2NOXcon = Constraint(model.tau, rule=sup2NOX)
+        
+        def sup3NOX(m, tau):
+            return model.NOXSup3[tau] == sup3(m, tau)
+        model.sup3NOXcon = Constraint(model.tau, rule=sup3NOX)
+            
+        def ot1(m):
+            return model.S9star == solubility(m)
+        model.ot1con = Constraint(rule=ot1)
+        
+        def ot2(m, tau):
+            return model.NO2[tau] == transfer(m, tau)
+        model.ot2con = Constraint(model.tau, rule=ot2)    
     
+    # the cumulative NOX supplementations 
     def sup1NOXo(m, tau):
         return model.dO1[tau] == model.NOXSup1[tau] 
     model.sup1NOXocon = Constraint(model.tau, rule=sup1NOXo)
     
-    def sup2NOX(m, tau):
-        return model.NOXSup2[tau] == model.A2*((tanh(100*tau-model.tau2))-(tanh(100*tau-(model.tau2+4/model.tf))))
-    model.sup2NOXcon = Constraint(model.tau, rule=sup2NOX)
-    
     def sup2NOXo(m, tau):
         return model.dO2[tau] == model.NOXSup2[tau] 
     model.sup2NOXocon = Constraint(model.tau, rule=sup2NOXo)
     
-    def sup3NOX(m, tau):
-        return model.NOXSup3[tau] == model.A3*((tanh(100*tau-model.tau3))-(tanh(100*tau-(model.tau3+4/model.tf))))
-    model.sup3NOXcon = Constraint(model.tau, rule=sup3NOX)
-    
     def sup3NOXo(m, tau):
         return model.dO3[tau] == model.NOXSup3[tau] 
     model.sup3NOXocon = Constraint(model.tau, rule=sup3NOXo)
-        
-    def ot1(m):
-        return model.S9star == model.ptot*model.y9/model.Hc
-    model.ot1con = Constraint(rule=ot1)
-    
-    def ot2(m, tau):
-        return model.NO2[tau] == model.kLa*(model.S9star-model.S9[tau])
-    model.ot2con = Constraint(model.tau, rule=ot2)    
-    
-    # the material balances for all substrates 
-    def d1(m, tau):
-        return model.dS1dt[tau] / model.tf == -model.vI[tau]
-    model.d1con = Constraint(model.tau, rule=d1)
-    
-    def d2(m, tau):  
-        return model.dS2dt[tau] / model.tf == +model.vI[tau]-model.vII[tau]
-    model.d2con = Constraint(model.tau, rule=d2)
-    
-    def d3(m, tau):
-        return model.dS3dt[tau] / model.tf == +model.vII[tau]-model.vIII[tau]
-    model.d3con = Constraint(model.tau, rule=d3)
-    
-    def d4(m, tau):
-        return model.dS4dt[tau] / model.tf == +model.vIII[tau]-model.vIV[tau]
-    model.d4con = Constraint(model.tau, rule=d4)
-    
-    def d5(m, tau):
-        return model.dS5dt[tau] / model.tf == +model.vIV[tau]-model.vV[tau]
-    model.d5con = Constraint(model.tau, rule=d5)
-    
-    def d6(m, tau):
-        return model.dS6dt[tau] / model.tf == +model.vV[tau]
-    model.d6con = Constraint(model.tau, rule=d6)
-    
-    def d7(m, tau):
-        return model.dS7dt[tau] / model.tf == +model.vVI[tau]-model.vI[tau]-model.vV[tau]
-    model.d7con = Constraint(model.tau, rule=d7)
-    
-    def d8(m, tau):
-        return model.dS8dt[tau] / model.tf == -(+model.vVI[tau]-model.vI[tau]-model.vV[tau])
-    model.d8con = Constraint(model.tau, rule=d8)
     
-    def d9(m, tau):
-        return model.dS9dt[tau] / model.tf == +model.NO2[tau]-model.vVI[tau]/2
-    model.d9con = Constraint(model.tau, rule=d9)
+    # the material balances for all substrates from the stoichiometry of 
+    # Kinetics_CascadeMOO.py 
+    def rates(m, tau):
+        return {'I': m.vI[tau], 'II': m.vII[tau], 'III': m.vIII[tau], 'IV': m.vIV[tau],
+                'V': m.vV[tau], 'VI': m.vVI[tau], 'dNOX': m.rdNOX[tau], 
+                'O2': m.NO2[tau], 'sNOX': m.rsNOX[tau]}
+    
+    def balance(i):
+        return lambda m, tau: getattr(m, 'dS{}dt'.format(i))[tau] / m.tf == Kinetics.Balance(i, rates(m, tau))
+    
+    model.d1con = Constraint(model.tau, rule=balance(1))
+    model.d2con = Constraint(model.tau, rule=balance(2))
+    model.d3con = Constraint(model.tau, rule=balance(3))
+    model.d4con = Constraint(model.tau, rule=balance(4))
+    model.d5con = Constraint(model.tau, rule=balance(5))
+    model.d6con = Constraint(model.tau, rule=balance(6))
+    model.d7con = Constraint(model.tau, rule=balance(7))
+    model.d8con = Constraint(model.tau, rule=balance(8))
+    model.d9con = Constraint(model.tau, rule=balance(9))
     
     # the material balances for all enzymes 
-    def e1(m, tau):
-        return model.dEUDHdt[tau]  == 0
-    model.e1con = Constraint(model.tau, rule=e1)
-    
-    def e3(m, tau):
-        return model.dEGlucDdt[tau] == 0
-    model.e3con = Constraint(model.tau, rule=e3)
-    
-    def e4(m, tau):
-        return model.dEKdgDdt[tau] == 0
-    model.e4con = Constraint(model.tau, rule=e4)
-    
-    def e5(m, tau):
-        return model.dEKgsalDHdt[tau] == 0
-    model.e5con = Constraint(model.tau, rule=e5)
+    if not compact:
+        def e1(m, tau):
+            return model.dEUDHdt[tau]  == 0
+        model.e1con = Constraint(model.tau, rule=e1)
+        
+        def e3(m, tau):
+            return model.dEGlucDdt[tau] == 0
+        model.e3con = Constraint(model.tau, rule=e3)
+        
+        def e4(m, tau):
+            return model.dEKdgDdt[tau] == 0
+        model.e4con = Constraint(model.tau, rule=e4)
+        
+        def e5(m, tau):
+            return model.dEKgsalDHdt[tau] == 0
+        model.e5con = Constraint(model.tau, rule=e5)
 
     def e6(m, tau):
-        return model.dENOXdt[tau] / model.tf == -model.rdNOX[tau] +  model.rsNOX[tau]
+        return model.dENOXdt[tau] / model.tf == Kinetics.Balance(Kinetics.Enzyme_index['NOX'], rates(m, tau))
     model.e6con = Constraint(model.tau, rule=e6)
     
     # calculation of the total enzyme concentration used 
@@ -319,20 +400,25 @@ def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
         return model.EC == model.SumEnzymes / (model.tf+30) 
     model.c7con = Constraint(rule=c7)
     
-    # constraint on the cofactor consumption (changed manually)
+    # constraint on the cofactor consumption 
     def c8(m):
-        return model.CC <= 0.005
+        return model.CC <= model.CCc
     model.c8con = Constraint(rule=c8)
     
     # constraint on the enzyme consumption (changed automatically)
-    def c9(m, tau):
-        return model.EC <= model.ECc
-    model.c9con = Constraint(model.tau, rule=c9)
-    
-    # definition of the objective (space-time yield)
-    def OBJ(m, tau):
-        return model.OBJ[tau] == model.S6[1]/((model.tf+30))  
-    model.OBJcon = Constraint(model.tau, rule=OBJ)
+    if compact:
+        def c9(m):
+            return model.EC <= model.ECc
+        model.c9con = Constraint(rule=c9)
+    else:
+        def c9(m, tau):
+            return model.EC <= model.ECc
+        model.c9con = Constraint(model.tau, rule=c9)
+        
+        # definition of the objective (space-time yield)
+        def OBJ(m, tau):
+            return model.OBJ[tau] == model.S6[1]/((model.tf+30))  
+        model.OBJcon = Constraint(model.tau, rule=OBJ)
     
     # initial values for all substrates  
     model.ic = ConstraintList()
@@ -345,10 +431,69 @@ def FunctionforPF(ECi,tfi,S1i,S7i,EUDHi,EGlucDi,EKdgDi,EKgsalDHi,ENOXi,
     model.ic.add(model.S9[model.tau.first()] == model.S9star)
 
     # selection of the objective for pyomo
-    model.obj = Objective(expr=model.OBJ[1], sense=maximize)
-    # selection of a discretization method
-    discretizer = TransformationFactory('dae.finite_difference')
-    # selection of the number of finite elements and discretization options 
-    discretizer.apply_to(model, wrt=model.tau, nfe=100, scheme='BACKWARD')
+    if compact:
+        model.obj = Objective(expr=model.S6[1]/((model.tf+30)), sense=maximize)
+    else:
+        model.obj = Objective(expr=model.OBJ[1], sense=maximize)
+    # selection of a discretization method, the number of finite elements and 
+    # the discretization options 
+    constructed = time.perf_counter()
+    if scheme in ('BACKWARD', 'FORWARD', 'CENTRAL'):
+        discretizer = TransformationFactory('dae.finite_difference')
+        discretizer.apply_to(model, wrt=model.tau, nfe=nfe, scheme=scheme)
+    else:
+        discretizer = TransformationFactory('dae.collocation')
+        discretizer.apply_to(model, wrt=model.tau, nfe=nfe, ncp=ncp, scheme=scheme)
+    if compact:
+        # the bound NO2 >= 0 of the full formulation 
+        for tau in model.tau:
+            model.S9[tau].setub(value(model.S9star))
+    model._build_times = {'construction': constructed-start, 
+                          'discretization': time.perf_counter()-constructed}
    
-    return model
\ No newline at end of file
+    return model
+
+
+def Refine_mesh(model, tol=0.05, pulse_width=0.03, min_element=0.0025):
+    '''A posteriori refinement of the finite elements of a solved model. An 
+    element is bisected if it lies within pulse_width of one of the optimized 
+    supplementation times (the NOX pulses are centred at tau = tau_k/100) or if 
+    a concentration changes over it by more than tol times its maximum (steep 
+    fronts). Elements shorter than min_element are not bisected. Returns the 
+    new element boundaries, or None if no element has to be refined.'''
+    elements = sorted(model.tau.get_finite_elements())
+    states = [model.S1, model.S2, model.S3, model.S4, model.S5, model.S6, 
+              model.S7, model.S8, model.S9, model.ENOX]
+    scale = [max(abs(value(x[tau])) for tau in model.tau)+10**(-6) for x in states]
+    pulses = [value(tauk)/100 for tauk, Ak in ((model.tau1, model.A1), 
+              (model.tau2, model.A2), (model.tau3, model.A3)) if value(Ak) > 10**(-6)]
+    added = []
+    for a, b in zip(elements[:-1], elements[1:]):
+        if b-a < min_element:
+            continue
+        near_pulse = any(a <= c+pulse_width and b >= c-pulse_width for c in pulses)
+        front = any(abs(value(x[b])-value(x[a])) > tol*xs for x, xs in zip(states, scale))
+        if near_pulse or front:
+            added.append((a+b)/2)
+    if not added:
+        return None
+    return sorted(elements+added)
+
+def Interpolate_solution(model, previous):
+    '''Initializes all variables of model from the solved model previous, which 
+    may be discretized on another mesh; the time-dependent variables are 
+    interpolated linearly in tau.'''
+    tau_old = np.array(list(previous.tau))
+    for var in previous.component_objects(Var, descend_into=True):
+        new = model.find_component(var.name)
+        if new is None or new.is_indexed() != var.is_indexed():
+            continue
+        if not var.is_indexed():
+            if var.value is not None:
+                new.set_value(var.value, skip_validation=True)
+        elif var.index_set() is previous.tau and new.index_set() is model.tau:
+            values = [var[tau].value for tau in previous.tau]
+            if any(v is None for v in values):
+                continue
+            for tau in model.tau:
+                new[tau].set_value(float(np.interp(tau, tau_old, values)), skip_validation=True)
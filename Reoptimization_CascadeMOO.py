@@ -0,0 +1,177 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Shrinking-horizon re-optimization of a running batch. When concentrations
+are measured at the time t of a batch that follows a planned Pareto-optimal
+point, the remaining NOX supplementations are re-planned with FunctionforPF:
+the mesh gets a node at t, the past part of the batch and the controls that
+are already applied are fixed, the measured state is imposed at t and the
+rest of the batch is re-optimized, initialized from the plan. The batch time
+tf of the plan is kept, so that the measurement stays on its node. If the
+re-optimization does not end optimal within the wall-clock budget, the plan
+is kept.'''
+
+import pyomo.environ as pe
+import numpy as np
+import re
+import time
+import Kinetics_CascadeMOO as Kinetics
+import Optimization1_CascadeMOO as OPT
+
+# the measured states (the substrates S1-S9 and the NOX activity); states
+# that are not measured are taken from the plan
+Measured_names = Kinetics.Substrates + ['ENOX']
+
+# the constraints of the dynamics (material balances, enzyme balances and
+# the discretization equations of their derivatives), which are deactivated
+# in the past part of the batch
+Dynamics = re.compile(r'^(d\dcon|e\dcon|d(S\d|E\w+)dt_disc_eq)$')
+
+# the part of the budget (s) that is kept for extracting the new point after
+# the solve (about 0.02 s for the compact model with nfe = 100)
+Extraction_reserve = 0.1
+
+
+def Initial_values(plan):
+    '''The initial values of FunctionforPF (see OPT.Initial_guess) of a
+    point (Extract_point or OPT.Get_point).'''
+    tf = plan['FinalTime']
+    return {'tfi': tf, 'S1i': plan['InitialS1Concentration'], 
+            'S7i': plan['InitialS7Concentration'], 'EUDHi': plan['EUDH'], 
+            'EGlucDi': plan['EGlucD'], 'EKdgDi': plan['EKdgD'], 
+            'EKgsalDHi': plan['EKgsalDH'], 'ENOXi': plan['ENOX'], 
+            'tau1i': 100*plan['t1']/tf, 'tau2i': 100*plan['t2']/tf, 
+            'tau3i': 100*plan['t3']/tf, 'A1i': plan['A1']*tf, 
+            'A2i': plan['A2']*tf, 'A3i': plan['A3']*tf}
+
+def Horizon_mesh(tau_m, nfe):
+    '''Uniform element boundaries with a node at tau_m; uniform nodes closer
+    than a quarter element to tau_m are dropped.'''
+    mesh = [k/nfe for k in range(nfe+1) if k in (0, nfe) or abs(k/nfe-tau_m) > 0.25/nfe]
+    return sorted(set(mesh) | {tau_m})
+
+def Initialize_from_plan(model, plan):
+    '''Initializes the variables of the model from the profiles and the
+    scalars of the plan; the profiles are interpolated linearly in tau.'''
+    for label, name in OPT.Profiles:
+        component = getattr(model, name + '0' if hasattr(model, name + '0') else name)
+        if component.ctype is not pe.Var:
+            continue
+        values = np.interp(list(model.tau), plan['tau'], plan[label])
+        if component.is_indexed():
+            for tau, value in zip(model.tau, values):
+                component[tau].set_value(float(value), skip_validation=True)
+        else:
+            component.set_value(float(values[0]), skip_validation=True)
+    for name, key in (('Yield', 'Yield'), ('EC', 'EnzymeConsumption'), 
+                      ('CC', 'CofactorConsumption'), ('SumEnzymes', 'TotalEnzymeConcentration')):
+        getattr(model, name).set_value(plan[key], skip_validation=True)
+
+def Fix_past(model, plan, t, measured):
+    '''Fixes the batch time, the past part of the batch (tau < t/tf) at the
+    values of the plan and the state at tau = t/tf at the measured values,
+    deactivates the dynamics up to t/tf and the initial conditions, fixes
+    the supplementations that have started before t and keeps the others
+    after t.'''
+    tf = plan['FinalTime']
+    tau_m = t/tf
+    model.tf.fix(tf)
+    model.ic.deactivate()
+    for constraint in model.component_objects(pe.Constraint):
+        if Dynamics.match(constraint.local_name):
+            for tau in constraint:
+                if tau <= tau_m:
+                    constraint[tau].deactivate()
+    states = [getattr(model, name) for name in Kinetics.Substrates + 
+              ['E' + enzyme for enzyme in Kinetics.Enzymes]]
+    for state in states:
+        if state.ctype is pe.Var:
+            for tau in model.tau:
+                if tau < tau_m:
+                    state[tau].fix()
+    for enzyme in Kinetics.Enzymes[:-1]:
+        if hasattr(model, 'E' + enzyme + '0'):
+            getattr(model, 'E' + enzyme + '0').fix()
+        else:
+            getattr(model, 'E' + enzyme)[tau_m].fix()
+    labels = {name: label for label, name in OPT.Profiles}
+    for name in Measured_names:
+        value = measured.get(name, float(np.interp(tau_m, plan['tau'], plan[labels[name]])))
+        getattr(model, name)[tau_m].fix(value)
+    for k, (A, tauk) in enumerate(((model.A1, model.tau1), (model.A2, model.tau2), 
+                                   (model.A3, model.tau3)), 1):
+        if plan['t{}'.format(k)] < t:
+            A.fix()
+            tauk.fix()
+        else:
+            tauk.setlb(100*tau_m)
+
+def Solver_timeout(available):
+    '''The time limit (s) of a solve that has to end within available
+    seconds of wall-clock time: Pyomo only kills IPOPT after the time limit
+    plus max(1 s, 1 % of it), and the limit of IPOPT itself (max_cpu_time)
+    counts CPU time, which is not more than the wall-clock time of the
+    single-threaded solver.'''
+    return min(available-1, available/1.01)
+
+def Reoptimize(plan, t, measured, budget = 10, nfe = 100, tee = False, **options):
+    '''Re-plans the remaining supplementations of the batch of the point plan
+    (Extract_point or OPT.Get_point) after the measurement measured (a dict
+    of Measured_names, missing states are taken from the plan) at the time t
+    (min). The model is built on Horizon_mesh, initialized from the plan and
+    solved with a time limit (Solver_timeout) that ends the solve before what
+    is left of the wall-clock budget (s), less the Extraction_reserve.
+    options are passed to FunctionforPF (without CCi, kLai and mesh). Returns
+    the new point and True, or the plan and False if the budget is exceeded
+    or the solve is not optimal.'''
+    start = time.perf_counter()
+    tf = plan['FinalTime']
+    if t >= tf:
+        return plan, False
+    model = OPT.Build_model(plan['ECi'], Initial_values(plan), CCi = plan['CCi'], 
+                            kLai = plan['kLai'], mesh = Horizon_mesh(t/tf, nfe), **options)
+    Initialize_from_plan(model, plan)
+    Fix_past(model, plan, t, measured)
+    timeout = Solver_timeout(budget-Extraction_reserve-(time.perf_counter()-start))
+    termination = 'budget'
+    point = None
+    if timeout > 0:
+        results = OPT.Solve(model, tee, timeout = timeout)
+        termination = str(results.solver.termination_condition)
+        if termination == str(pe.TerminationCondition.optimal):
+            point = OPT.Extract_point(plan['ECi'], model, results)
+    wall_time = time.perf_counter()-start
+    replanned = point is not None and wall_time <= budget
+    OPT.Record('reoptimize', t = t, budget = budget, wall_time = wall_time, 
+               termination = termination, replanned = replanned)
+    if not replanned:
+        return plan, False
+    return point, True
+
+
+if __name__ == '__main__':
+    # the offline plan (point k of ParetoOptimalPoints.npz), the time of the
+    # measurement (min), the measured concentrations (mM) and the wall-clock
+    # budget of the re-optimization (s)
+    Results = OPT.Load_results('ParetoOptimalPoints.npz')
+    plan = OPT.Get_point(Results, 0)
+    t = 0.5*plan['FinalTime']
+    measured = {'S1': 20.0, 'S6': 60.0, 'S9': 0.1}
+    budget = 10
+    options = {'compact': True, 'scheme': 'BACKWARD'}
+    OPT.Set_profile('Profile.jsonl')
+
+    point, replanned = Reoptimize(plan, t, measured, budget, **options)
+    if replanned:
+        print('Re-planned: A2 = {:.4g}, t2 = {:.4g}, A3 = {:.4g}, t3 = {:.4g}, STY = {:.4g}'.format(
+              point['A2'], point['t2'], point['A3'], point['t3'], point['SpaceTimeYield']))
+    else:
+        print('Budget exceeded or not optimal; the plan is kept')
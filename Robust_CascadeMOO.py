@@ -0,0 +1,180 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Robust schedules for several scenarios of the kinetic parameters and kLa
+(e.g. different enzyme lots) by progressive hedging. Every scenario is a
+model of FunctionforPF with its own parameter vector p and kLa; the scenario
+models are coupled only through the shared control variables (the batch
+time, the initial titers and the supplementations), which progressive
+hedging drives to one common schedule. In every iteration the scenario
+models are solved independently in worker processes, each warm-started from
+its previous solution, so no model holds more than one scenario. Every
+scenario is always solved by the same worker, which keeps only the models
+of its own scenarios. Run this
+file to compute a robust schedule for scenarios drawn with
+Uncertainty_CascadeMOO.py.'''
+
+import pyomo.environ as pe
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+import Kinetics_CascadeMOO as Kinetics
+import Optimization1_CascadeMOO as OPT
+import Uncertainty_CascadeMOO as UN
+
+# the control variables shared by all scenarios: the batch time, the initial
+# titers, the magnitudes and the scaled times of the supplementations (the
+# enzymes and S1, S7 at tau = 0)
+Shared_names = ['tf', 'S1', 'S7', 'EUDH', 'EGlucD', 'EKdgD', 'EKgsalDH', 'ENOX',
+                'A1', 'A2', 'A3', 'tau1', 'tau2', 'tau3']
+
+
+def Shared_variables(model):
+    '''The variables of the model that hold the shared control variables, in
+    the order of Shared_names (the compact formulation keeps the enzymes
+    except NOX in the scalar variables EUDH0, ...).'''
+    first = model.tau.first()
+    shared = []
+    for name in Shared_names:
+        if hasattr(model, name + '0'):
+            shared.append(getattr(model, name + '0'))
+        elif getattr(model, name).is_indexed():
+            shared.append(getattr(model, name)[first])
+        else:
+            shared.append(getattr(model, name))
+    return shared
+
+def Add_hedging(model):
+    '''Replaces the objective of a scenario model by the augmented Lagrangian
+    of progressive hedging: the space-time yield minus the weights ph_w times
+    the scaled shared variables x/ph_scale and minus ph_rho/2 times their
+    squared distance from the averages ph_xbar. With ph_w = ph_rho = 0 it is
+    the original objective.'''
+    shared = Shared_variables(model)
+    model.ph_index = pe.RangeSet(0, len(shared)-1)
+    model.ph_w = pe.Param(model.ph_index, initialize = 0, mutable = True)
+    model.ph_xbar = pe.Param(model.ph_index, initialize = 0, mutable = True)
+    model.ph_scale = pe.Param(model.ph_index, initialize = 1, mutable = True)
+    model.ph_rho = pe.Param(initialize = 0, mutable = True)
+    model.obj.deactivate()
+    scaled = [x/model.ph_scale[i] for i, x in enumerate(shared)]
+    model.ph_obj = pe.Objective(expr = model.obj.expr 
+                                - sum(model.ph_w[i]*x for i, x in enumerate(scaled))
+                                - model.ph_rho/2*sum((x-model.ph_xbar[i])**2 for i, x in enumerate(scaled)),
+                                sense = pe.maximize)
+
+def Scenario_worker(index, scenario, ECi, initial, solution, w, xbar, scale, rho, 
+                    tee = False, timeout = None, **options):
+    '''Solves scenario index (a dict with the parameter vector 'p' and 'kLa')
+    for the weights w, the averages xbar, the scales and the penalty rho in
+    a worker process. The model of the scenario is built on the first call
+    of the worker and kept in OPT.Worker_models (Progressive_hedging sends
+    every scenario to the same worker); it is warm-started from the
+    solution (OPT.Store_solution) of the previous iteration if there is one
+    and solved from initial otherwise. Returns the shared variables, the
+    point and the solution.'''
+    name = repr((index, sorted(options.items())))
+    model = OPT.Worker_models.get(name)
+    if model is None:
+        model = OPT.Build_model(ECi, initial, kLai = scenario['kLa'], p = scenario['p'], **options)
+        Add_hedging(model)
+        OPT.Worker_models[name] = model
+    for i in model.ph_index:
+        model.ph_w[i], model.ph_xbar[i], model.ph_scale[i] = w[i], xbar[i], scale[i]
+    model.ph_rho = rho
+    if solution is None:
+        model.ECc = ECi
+        results = OPT.Solve(model, tee, timeout = timeout)
+    else:
+        OPT.Load_solution(model, solution)
+        results = OPT.Resolve_point(model, ECi, tee, timeout)
+    x = np.array([pe.value(v) for v in Shared_variables(model)], dtype=float)
+    return x, OPT.Extract_point(ECi, model, results), OPT.Store_solution(model)
+
+def Progressive_hedging(ECi, scenarios, rho = 0.1, tol = 1e-3, max_iter = 50, 
+                        max_workers = None, initial = None, tee = False, 
+                        timeout = None, **options):
+    '''Solves the robust problem for the epsilon value ECi over the scenarios
+    (dicts with the parameter vector 'p', 'kLa' and optionally the
+    probability 'weight') by progressive hedging. The shared variables are
+    scaled by their averages over the independent solutions of the first
+    iteration. The iterations stop when the weighted root mean square
+    distance of the scaled shared variables from their averages is below
+    tol. The scenarios are distributed over max_workers single-process
+    pools, scenario k always to pool k % max_workers, so that every worker
+    keeps only the models of its scenarios between the iterations. options
+    are passed to FunctionforPF (without kLai and p). Returns
+    the robust schedule (a dict of Shared_names), the points of the
+    scenarios in the last iteration and the history of the distances.'''
+    n = len(scenarios)
+    weights = np.array([scenario.get('weight', 1) for scenario in scenarios], dtype=float)
+    weights /= weights.sum()
+    initial = dict(OPT.Initial_guess) if initial is None else initial
+    w = np.zeros((n, len(Shared_names)))
+    xbar = np.zeros(len(Shared_names))
+    scale = np.ones(len(Shared_names))
+    penalty = 0
+    solutions = [None]*n
+    history = []
+    with ExitStack() as stack:
+        pools = [stack.enter_context(ProcessPoolExecutor(max_workers = 1, 
+                                                         initializer = OPT.Initialize_worker, 
+                                                         initargs = (OPT.Backend, OPT.Profile_file, 
+                                                                     Kinetics.Parameter_list())))
+                 for _ in range(max_workers or min(n, os.cpu_count()))]
+        for iteration in range(max_iter+1):
+            start = time.perf_counter()
+            futures = [pools[k % len(pools)].submit(Scenario_worker, k, scenarios[k], ECi, initial, 
+                                                    solutions[k], w[k], xbar, scale, penalty, 
+                                                    tee, timeout, **options) 
+                       for k in range(n)]
+            X, points, solutions = map(list, zip(*[future.result() for future in futures]))
+            X = np.array(X)
+            if iteration == 0:
+                scale = np.maximum(np.abs(weights @ X), 1)
+                penalty = rho
+            xbar = weights @ (X/scale)
+            distance = float(np.sqrt(weights @ np.sum((X/scale-xbar)**2, axis=1)))
+            w += penalty*(X/scale-xbar)
+            history.append(distance)
+            OPT.Record('hedging', ECi = ECi, iteration = iteration, distance = distance, 
+                       scenarios = n, wall_time = time.perf_counter()-start,
+                       optimal = sum(point['info1'] == str(pe.TerminationCondition.optimal) 
+                                     for point in points))
+            if distance < tol:
+                break
+    return dict(zip(Shared_names, (xbar*scale).tolist())), points, history
+
+
+if __name__ == '__main__':
+    # the epsilon value, the number of scenarios drawn from the distributions
+    # of Uncertainty_CascadeMOO.py and their seed
+    ECi = 0.1
+    n_scenarios = 20
+    seed = 0
+    # the options of FunctionforPF, the penalty and the tolerance of
+    # progressive hedging
+    options = {'CCi': 0.005, 'compact': True, 'nfe': 100, 'scheme': 'BACKWARD'}
+    kLa = 1.2
+    rho = 0.1
+    tol = 1e-3
+    OPT.Set_profile('Profile.jsonl')
+
+    P, factors = UN.Sample_parameters(n_scenarios, seed = seed)
+    scenarios = [{'p': P[:,k], 'kLa': kLa*factors[k]} for k in range(n_scenarios)]
+    schedule, points, history = Progressive_hedging(ECi, scenarios, rho, tol, **options)
+    print('Robust schedule after {} iterations (distance {:.2e}):'.format(len(history), history[-1]))
+    for name, value in schedule.items():
+        print('{:10s} {:.6g}'.format(name, value))
+    print('Space-time yield of the scenarios:', [round(point['SpaceTimeYield'], 4) for point in points])
+    OPT.Save_results(points, 'RobustPoints.npz')
@@ -0,0 +1,124 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Screening of very large sets of schedules. The control vectors are read
+in chunks from a CSV file or a binary file, each chunk is simulated with
+SIM.Simulate_batch in a worker process and reduced to its KPIs
+(SIM.Performance), and the KPIs are appended to a CSV file in the order of
+the input. Only the trajectories of the schedules that pass the filter Keep
+are written (one file per chunk). At most two chunks per worker are in
+flight, so the memory stays bounded by the chunk size however many schedules
+are screened. Run this file to screen the schedules of Schedules.csv.'''
+
+import numpy as np
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import Kinetics_CascadeMOO as Kinetics
+import Simulation_CascadeMOO as SIM
+
+# the KPIs written for every schedule (see SIM.Performance)
+KPI_names = ['S6', 'Yield', 'SpaceTimeYield', 'EnzymeConsumption', 
+             'CofactorConsumption', 'S9_min']
+
+
+def Keep(kpis):
+    '''The filter of the schedules whose trajectories are kept: the KPIs of
+    a chunk (dict of arrays) to a boolean array. Edit it to select other
+    schedules; it has to be defined at module level, so that it can be sent
+    to the worker processes.'''
+    return kpis['Yield'] >= 0.95
+
+def Read_chunks(filename, chunk):
+    '''Yields the control vectors (N x 13, in the order of U_names) of a file
+    in chunks of chunk rows. CSV files (.csv, an optional header line is
+    skipped) are read line by line, .npy files are memory-mapped and other
+    files are read as raw float64 rows of 13 values.'''
+    width = len(Kinetics.U_names)
+    if filename.endswith('.csv'):
+        with open(filename) as file:
+            first = file.readline()
+            lines = file if not first.strip() or first[0].isalpha() else itertools.chain([first], file)
+            while True:
+                block = list(itertools.islice(lines, chunk))
+                if not block:
+                    return
+                yield np.loadtxt(block, delimiter = ',', ndmin = 2)
+    elif filename.endswith('.npy'):
+        U = np.load(filename, mmap_mode = 'r')
+        for k in range(0, len(U), chunk):
+            yield np.array(U[k:k+chunk], dtype=float)
+    else:
+        rows = os.path.getsize(filename)//(8*width)
+        for k in range(0, rows, chunk):
+            yield np.fromfile(filename, dtype=np.float64, count = min(chunk, rows-k)*width, 
+                              offset = 8*width*k).reshape(-1, width)
+
+def Screen_chunk(U, n = 51, keep = Keep):
+    '''Simulates the schedules U and returns their KPIs (len(KPI_names) x N),
+    the indices of the schedules that pass keep (None keeps none) and their
+    time grids and trajectories.'''
+    t, X = SIM.Simulate_batch(U, n)
+    kpis = SIM.Performance(U, X)
+    passed = np.flatnonzero(keep(kpis)) if keep is not None else np.zeros(0, dtype=int)
+    return np.array([kpis[name] for name in KPI_names]), passed, t[passed], X[passed]
+
+def Screen(filename, output = 'ScreeningKPIs.csv', trajectories = 'Trajectories', 
+           chunk = 1000, max_workers = None, n = 51, keep = Keep):
+    '''Screens all schedules of filename (Read_chunks) in a process pool and
+    streams the index and the KPIs of every schedule to the CSV file output.
+    The trajectories of the schedules that pass keep are written to the
+    directory trajectories, one .npz file (index, t, X) per chunk. Returns
+    the number of schedules and the number of kept schedules.'''
+    max_workers = max_workers or os.cpu_count()
+    if trajectories is not None:
+        os.makedirs(trajectories, exist_ok = True)
+    screened = kept = 0
+    with ProcessPoolExecutor(max_workers = max_workers) as pool, open(output, 'w') as file:
+        file.write(','.join(['index'] + KPI_names) + '\n')
+        running = deque()
+        def write(future, offset):
+            nonlocal screened, kept
+            values, passed, t, X = future.result()
+            index = offset+np.arange(values.shape[1])
+            np.savetxt(file, np.column_stack((index, values.T)), delimiter = ',', 
+                       fmt = ['%d'] + ['%.10g']*len(KPI_names))
+            if trajectories is not None and len(passed):
+                np.savez_compressed(os.path.join(trajectories, 'chunk_{:09d}.npz'.format(offset)), 
+                                    index = offset+passed, t = t, X = X)
+            screened += values.shape[1]
+            kept += len(passed)
+        offset = 0
+        for U in Read_chunks(filename, chunk):
+            if len(running) >= 2*max_workers:
+                write(*running.popleft())
+            running.append((pool.submit(Screen_chunk, U, n, keep), offset))
+            offset += len(U)
+        while running:
+            write(*running.popleft())
+    return screened, kept
+
+
+if __name__ == '__main__':
+    # the file of the control vectors (one row per schedule in the order of
+    # U_names: .csv, .npy or raw float64), the number of schedules simulated
+    # at once by a worker and the output files
+    filename = 'Schedules.csv'
+    chunk = 1000
+    output = 'ScreeningKPIs.csv'
+    trajectories = 'Trajectories'
+
+    start = time.perf_counter()
+    screened, kept = Screen(filename, output, trajectories, chunk)
+    print('{} schedules screened in {:.1f} s, {} trajectories kept'.format(
+          screened, time.perf_counter()-start, kept))
@@ -0,0 +1,168 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Variance-based global sensitivity analysis of the simulation code with
+respect to its 13 control variables. The first order and total Sobol indices
+of the KPIs are estimated from a Saltelli design: two base samples A and B
+from a scrambled Sobol sequence and the d samples AB_i, which are A with
+column i taken from B. The schedules are simulated in chunks with
+SIM.Simulate_batch in a process pool. The runs are kept in a state file, and
+Extend continues the Sobol sequence after the runs that are already done, so
+the estimates can be refined without recomputing them. Run this file to
+extend the state in SobolState.npz and print the indices.'''
+
+import numpy as np
+import os
+import time
+from scipy.stats import qmc
+from concurrent.futures import ProcessPoolExecutor
+import Kinetics_CascadeMOO as Kinetics
+import Simulation_CascadeMOO as SIM
+
+# the ranges of the control variables (in the order of U_names) over which
+# the indices are computed: half to one and a half times the schedule of
+# Simulation_CascadeMOO.py
+Control_ranges = [(0.5*x, 1.5*x) for x in SIM.Control_vector()]
+
+# the KPIs (see SIM.Performance) whose indices are computed
+Outputs = ['Yield', 'SpaceTimeYield', 'EnzymeConsumption', 'CofactorConsumption']
+
+# the number of output times of the simulations (SIM.Simulate_batch)
+Grid = 21
+
+
+def Saltelli_design(n, skip = 0, ranges = Control_ranges, seed = 0):
+    '''The Saltelli design of the points skip to skip+n of the Sobol sequence
+    of the given seed: the control vectors of A, B and AB_1..AB_d as an
+    array (d+2 x n x d).'''
+    d = len(ranges)
+    sampler = qmc.Sobol(2*d, scramble = True, seed = seed)
+    if skip:
+        sampler.fast_forward(skip)
+    base = sampler.random(n)
+    lower, upper = np.array(ranges, dtype=float).T
+    A = lower+base[:,:d]*(upper-lower)
+    B = lower+base[:,d:]*(upper-lower)
+    design = np.repeat(A[None], d+2, axis=0)
+    design[1] = B
+    for i in range(d):
+        design[2+i,:,i] = B[:,i]
+    return design
+
+def Evaluate_chunk(U, n = Grid):
+    '''Simulates the schedules U (N x 13) and returns their Outputs.'''
+    t, X = SIM.Simulate_batch(U, n)
+    values = SIM.Performance(U, X)
+    return np.array([values[name] for name in Outputs])
+
+def Evaluate(U, chunk = 1000, max_workers = None, n = Grid):
+    '''The Outputs (len(Outputs) x N) of the schedules U (N x 13), simulated
+    in chunks of chunk schedules in a process pool.'''
+    with ProcessPoolExecutor(max_workers = max_workers) as pool:
+        parts = pool.map(Evaluate_chunk, [U[k:k+chunk] for k in range(0, len(U), chunk)], 
+                         [n]*(-(-len(U)//chunk)))
+        return np.concatenate(list(parts), axis=1)
+
+def Check_design(state, ranges = Control_ranges, grid = Grid):
+    '''Raises a ValueError if the runs of state were computed for other
+    ranges of the control variables, another number of output times or
+    other Outputs, which cannot be combined with new runs.'''
+    design = {'ranges': np.array(ranges, dtype=float), 'grid': grid, 'outputs': list(Outputs)}
+    for key, value in design.items():
+        if key not in state:
+            raise ValueError('the Sobol state does not record its {}'.format(key))
+        if not np.array_equal(np.asarray(state[key]), np.asarray(value)):
+            raise ValueError('the Sobol state was computed for other {}; use a new state '
+                             'file for the current ones'.format(key))
+
+def Extend(state, n, chunk = 1000, max_workers = None, seed = 0, ranges = Control_ranges, 
+           grid = Grid):
+    '''Adds the runs of the next n points of the Sobol sequence to state (a
+    dict with the runs Y, len(Outputs) x d+2 x N, the seed and the design:
+    the ranges of the control variables, the number grid of output times and
+    the Outputs; or None to start) and returns it. A state of another design
+    raises a ValueError (see Check_design). Powers of two for n and for the
+    total give the best balanced samples.'''
+    if state is None:
+        d = len(ranges)
+        state = {'Y': np.zeros((len(Outputs), d+2, 0)), 'seed': seed, 
+                 'ranges': np.array(ranges, dtype=float), 'grid': grid, 'outputs': list(Outputs)}
+    Check_design(state, ranges, grid)
+    skip = state['Y'].shape[2]
+    design = Saltelli_design(n, skip, ranges, state['seed'])
+    Y = Evaluate(design.reshape(-1, design.shape[2]), chunk, max_workers, grid)
+    state['Y'] = np.concatenate((state['Y'], Y.reshape(len(Outputs), design.shape[0], n)), axis=2)
+    return state
+
+def Indices(Y):
+    '''The first order indices (Saltelli 2010) and the total indices (Jansen)
+    of the runs Y (d+2 x N) of one output.'''
+    fA, fB, fAB = Y[0], Y[1], Y[2:]
+    variance = np.var(np.concatenate((fA, fB)))
+    first = np.mean(fB*(fAB-fA), axis=1)/variance
+    total = 0.5*np.mean((fA-fAB)**2, axis=1)/variance
+    return first, total
+
+def Sobol_indices(state, n_bootstrap = 100, seed = 0):
+    '''The first order and total indices of all Outputs with the half widths
+    of their 95 % bootstrap confidence intervals, as a dict of arrays (d,)
+    keyed by '<output>_S1', '<output>_ST', '<output>_S1_conf' and
+    '<output>_ST_conf'.'''
+    rng = np.random.default_rng(seed)
+    N = state['Y'].shape[2]
+    resamples = [rng.integers(0, N, N) for k in range(n_bootstrap)]
+    result = {}
+    for name, Y in zip(Outputs, state['Y']):
+        result[name + '_S1'], result[name + '_ST'] = Indices(Y)
+        boot = np.array([Indices(Y[:,sample]) for sample in resamples])
+        result[name + '_S1_conf'], result[name + '_ST_conf'] = 1.96*np.std(boot, axis=0)
+    return result
+
+def Save_state(state, filename = 'SobolState.npz'):
+    '''Writes the runs and the design of a state to filename.'''
+    np.savez_compressed(filename, Y = state['Y'], seed = state['seed'], ranges = state['ranges'], 
+                        grid = state['grid'], outputs = np.array(state['outputs']))
+
+def Load_state(filename = 'SobolState.npz', ranges = Control_ranges, grid = Grid):
+    '''Reads a state written by Save_state, or returns None if there is no
+    file. A state of another design raises a ValueError (see Check_design).'''
+    if not os.path.isfile(filename):
+        return None
+    with np.load(filename) as data:
+        state = {key: data[key] for key in data.files}
+    state['seed'] = int(state['seed'])
+    if 'grid' in state:
+        state['grid'] = int(state['grid'])
+    if 'outputs' in state:
+        state['outputs'] = state['outputs'].tolist()
+    Check_design(state, ranges, grid)
+    return state
+
+
+if __name__ == '__main__':
+    # the number of new base points (each costs len(Control_ranges)+2
+    # simulations) and the state file that is extended
+    n = 1024
+    state_file = 'SobolState.npz'
+
+    start = time.perf_counter()
+    state = Extend(Load_state(state_file), n)
+    Save_state(state, state_file)
+    print('{} base points ({} simulations) in total, {} new in {:.1f} s'.format(
+          state['Y'].shape[2], state['Y'].shape[2]*state['Y'].shape[1], n, 
+          time.perf_counter()-start))
+    indices = Sobol_indices(state)
+    for name in Outputs:
+        print(name)
+        for k, control in enumerate(Kinetics.U_names):
+            print('  {:20s} S1 {:7.3f} +- {:.3f}   ST {:7.3f} +- {:.3f}'.format(control, 
+                  indices[name + '_S1'][k], indices[name + '_S1_conf'][k], 
+                  indices[name + '_ST'][k], indices[name + '_ST_conf'][k]))
@@ -0,0 +1,361 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Direct multiple shooting for the optimization problem of FunctionforPF
+(Optimization2_CascadeMOO.py). The scaled time tau is split into segments,
+each segment is integrated with the array kernel of the simulation code
+together with its forward sensitivities, and the small dense NLP in the
+decision variables and the states at the segment boundaries is solved with
+SLSQP. The size of the NLP does not depend on the time resolution. The
+segments are integrated in parallel worker processes.'''
+
+import numpy as np
+import pyomo.environ as pe
+from scipy.integrate import odeint
+import scipy.optimize as opt
+from concurrent.futures import ProcessPoolExecutor
+import math as mt
+import time
+import Kinetics_CascadeMOO as Kinetics
+import Simulation_CascadeMOO as SIM
+import Optimization1_CascadeMOO as OPT
+
+# the decision variables z of the NLP, as in FunctionforPF: the batch time
+# (min), the initial titers (mM, μM), the magnitudes A_k of the
+# supplementations (μM) and their scaled times tau_k; the states at the
+# boundaries between the segments follow
+Z_names = ['tf', 'S1', 'S7', 'EUDH', 'EGlucD', 'EKdgD', 'EKgsalDH', 'ENOX',
+           'A1', 'A2', 'A3', 'tau1', 'tau2', 'tau3']
+Z_bounds = [(10, 50000), (0, 1000), (0, 500), (0, 1000), (0, 1000), (0, 1000),
+            (0, 1000), (0, 1000), (0, None), (0, None), (0, None), (0, 100),
+            (0, 100), (0, 100)]
+# the states that are continuous between the segments (S1-S9 and NOX) and
+# their bounds; the enzymes 10-13 are constant decision variables. The lower
+# bound is kept above zero, since the rate law of UDH is 0/0 at S1 = S7 = 0
+Node_states = [1, 2, 3, 4, 5, 6, 7, 8, 9, 14]
+Node_bounds = [(1e-6, 1000)]*6 + [(1e-6, 500), (1e-6, 500), (1e-6, 1000), (0, 1000)]
+# the entries of z that parametrize the right-hand side (tf, A_k, tau_k)
+Q_index = [0, 8, 9, 10, 11, 12, 13]
+# the initial value of the substrates that are not decision variables (mM)
+Initial_titer = 0.001
+
+
+def Schedule_controls(q, kLa):
+    '''The control vector of the simulation code (Kinetics.U_names) that gives the
+    supplementations of the decisions q = (tf, A_1..A_3, tau_1..tau_3) of
+    the optimization model.'''
+    tf = q[0]
+    return [tf, 0, 0, 0, 0, 0, q[1]/tf, q[2]/tf, q[3]/tf,
+            q[4]*tf/100, q[5]*tf/100, q[6]*tf/100, kLa]
+
+# the augmented state holds X and the 22 columns of the sensitivities one after
+# the other, so that its Jacobian is block diagonal with 23 blocks of 15 x 15,
+# which odeint factorizes as a banded matrix (ml = mu = 14); the band
+# positions of the blocks
+Band_rows = np.tile(14+np.subtract.outer(np.arange(15), np.arange(15)).ravel(), 23)
+Band_columns = (np.tile(np.arange(15), 15)+15*np.arange(23)[:,None]).ravel()
+
+def Segment_rhs(y, tau, p, u, q, f, J):
+    '''Right-hand side of the states and their sensitivities S = dX/d(x0, q)
+    (15 x 22, stored by columns) in the scaled time tau.'''
+    tf = q[0]
+    X = y[:15].tolist()
+    S = y[15:].reshape(22, 15)
+    SIM.Balances_kernel(X, tau*tf, p, u, f, mt.tanh)
+    SIM.Jacobian_kernel(X, tau*tf, p, u, J, mt.tanh)
+    dS = tf*(S @ J.T)
+    # the derivatives of the right-hand side with respect to q
+    dS[15] += f
+    for k in range(3):
+        a = 100*tau-q[4+k]
+        ta, tb = mt.tanh(a), mt.tanh(a-4/tf)
+        dS[15,14] += -q[1+k]/tf*(ta-tb)-q[1+k]*(1-tb*tb)*4/tf**2
+        dS[16+k,14] += ta-tb
+        dS[19+k,14] += q[1+k]*((1-tb*tb)-(1-ta*ta))
+    return np.concatenate((tf*f, dS.ravel()))
+
+def Segment_jacobian(y, tau, p, u, q, f, J):
+    '''Banded Jacobian of Segment_rhs, without the second derivatives of the
+    sensitivity equations (staggered corrector).'''
+    tf = q[0]
+    SIM.Jacobian_kernel(y[:15].tolist(), tau*tf, p, u, J, mt.tanh)
+    band = np.zeros((29, 345))
+    band[Band_rows, Band_columns] = np.tile(tf*J.ravel(), 23)
+    return band
+
+def Integrate_segment(x0, q, p, kLa, tau_a, tau_b, rtol = 1e-8, atol = 1e-10):
+    '''Integrates the states x0 (15,) from tau_a to tau_b for the decisions q.
+    Returns the states at tau_b and the sensitivities dX/dx0 (15 x 15) and
+    dX/dq (15 x 7). The step is limited to the width of the pulses, so that
+    no supplementation is stepped over.'''
+    p = [float(pk) for pk in p]
+    q = [float(qk) for qk in q]
+    u = Schedule_controls(q, kLa)
+    y0 = np.concatenate((x0, np.eye(22, 15).ravel()))
+    f, J = np.zeros(15), np.zeros((15, 15))
+    y = odeint(Segment_rhs, y0, [tau_a, tau_b], args = (p, u, q, f, J),
+               Dfun = Segment_jacobian, ml = 14, mu = 14, rtol = rtol, atol = atol, 
+               hmax = 0.01, mxstep = 100000)[-1]
+    S = y[15:].reshape(22, 15).T
+    return y[:15], S[:,:15], S[:,15:]
+
+def Initial_state(z, m, n_z):
+    '''The initial state x0 of the segment m and its derivative dx0/dz.'''
+    x0, D0 = np.zeros(15), np.zeros((15, n_z))
+    if m == 0:
+        x0[[2, 3, 4, 5, 6, 8]] = Initial_titer
+        x0[9] = Kinetics.S9_Star
+        for i, j in ((1, 1), (7, 2), (14, 7)):
+            x0[i] = z[j]
+            D0[i, j] = 1
+    else:
+        for i, state in enumerate(Node_states):
+            j = len(Z_names)+len(Node_states)*(m-1)+i
+            x0[state] = z[j]
+            D0[state, j] = 1
+    for i in range(4):
+        x0[10+i] = z[3+i]
+        D0[10+i, 3+i] = 1
+    return x0, D0
+
+def Shoot(z, segments, p, kLa, pool = None):
+    '''Integrates all segments for the NLP variables z, in the process pool if
+    one is given. Returns the end states of the segments (segments x 15) and
+    their derivatives with respect to z (segments x 15 x len(z)).'''
+    z = np.asarray(z, dtype=float)
+    grid = np.linspace(0, 1, segments+1)
+    starts = [Initial_state(z, m, len(z)) for m in range(segments)]
+    q = z[Q_index]
+    jobs = [(x0, q, p, kLa, grid[m], grid[m+1]) for m, (x0, D0) in enumerate(starts)]
+    if pool is None:
+        results = [Integrate_segment(*job) for job in jobs]
+    else:
+        results = list(pool.map(Integrate_segment, *zip(*jobs)))
+    Dq = np.zeros((7, len(z)))
+    Dq[range(7), Q_index] = 1
+    ends = np.array([X for X, Sx, Sq in results])
+    G = np.array([Sx @ D0 + Sq @ Dq for (X, Sx, Sq), (x0, D0) in zip(results, starts)])
+    return ends, G
+
+def Supplemented_NOX(z):
+    '''Amounts of NOX added by the three supplementations (μM), the integrals 
+    of A_k times the pulse over tau (O1-O3 of FunctionforPF), and the gradient 
+    of their sum with respect to z.'''
+    tf = z[0]
+    w = 4/tf
+    amounts, grad = np.zeros(3), np.zeros(len(z))
+    for k in range(3):
+        A, c = z[8+k], z[11+k]
+        F = (SIM.Log_cosh(100-c)-SIM.Log_cosh(-c)-SIM.Log_cosh(100-c-w)+SIM.Log_cosh(-c-w))/100
+        dF_dc = (-np.tanh(100-c)+np.tanh(-c)+np.tanh(100-c-w)-np.tanh(-c-w))/100
+        dF_dw = (np.tanh(100-c-w)-np.tanh(-c-w))/100
+        amounts[k] = A*F
+        grad[8+k] = F
+        grad[11+k] = A*dF_dc
+        grad[0] += A*dF_dw*(-4/tf**2)
+    return amounts, grad
+
+def Guess_from_schedule(u, segments, p = None):
+    '''NLP variables for the control vector u of the simulation code; the
+    node states are taken from the simulation of the schedule.'''
+    u = np.asarray(u, dtype=float)
+    tf = u[0]
+    z = np.array([tf, SIM.S1_initial, SIM.S7_initial, *u[1:6], *(u[6:9]*tf),
+                  *(100*u[9:12]/tf)])
+    return Guess_nodes(z, segments, u[12], p)
+
+def Guess_from_point(point, segments, p = None):
+    '''NLP variables for a Pareto-optimal point (Extract_point) as the
+    initial guess.'''
+    tf = point['FinalTime']
+    z = np.array([tf, point['InitialS1Concentration'], point['InitialS7Concentration'],
+                  point['EUDH'], point['EGlucD'], point['EKdgD'], point['EKgsalDH'],
+                  point['ENOX'], point['A1']*tf, point['A2']*tf, point['A3']*tf,
+                  100*point['t1']/tf, 100*point['t2']/tf, 100*point['t3']/tf])
+    return Guess_nodes(z, segments, point['kLai'], p)
+
+def Guess_nodes(z, segments, kLa, p = None):
+    '''Appends the node states of the simulation of the decisions z.'''
+    if p is None:
+        p = Kinetics.Parameter_vector()
+    X = Trajectory(z, kLa, np.linspace(0, 1, segments+1), p)
+    return np.concatenate([z] + [X[m, Node_states] for m in range(1, segments)])
+
+def Trajectory(z, kLa, tau, p):
+    '''Simulates the decisions z from the initial state of the optimization
+    model and returns the states at the scaled times tau.'''
+    q = [float(zk) for zk in np.asarray(z)[Q_index]]
+    rhs, jac = SIM.Array_kernel(p, Schedule_controls(q, kLa))
+    x0, D0 = Initial_state(z, 0, len(Z_names))
+    return odeint(rhs, x0, np.asarray(tau)*q[0], Dfun = jac, hmax = 0.01*q[0],
+                  mxstep = 100000)
+
+def Solve_shooting(ECc, CCc = 0.005, kLa = 1.2, guess = None, segments = 4,
+                   max_workers = None, p = None, n = 101, tol = 1e-7, maxiter = 300):
+    '''Solves the epsilon point ECc of the problem of FunctionforPF by direct
+    multiple shooting with segments segments. guess is a vector of NLP
+    variables (e.g. the x of a previous result) or None for the default
+    schedule of the simulation code. The segments are integrated in
+    max_workers processes (serially if max_workers is None or 1). Returns the
+    point (like Extract_point, with the profiles on n scaled times) and the
+    scipy result.'''
+    start = time.perf_counter()
+    if p is None:
+        p = Kinetics.Parameter_vector()
+    if guess is None:
+        guess = Guess_from_schedule(SIM.Control_vector(), segments, p)
+    n_z = len(Z_names)
+    # SLSQP works on the variables x = z/scale, which are of order one
+    scale = np.maximum(np.abs(guess), 1)
+    bounds = [(None if lo is None else lo/sk, None if hi is None else hi/sk) 
+              for (lo, hi), sk in zip(Z_bounds + Node_bounds*(segments-1), scale)]
+    nodes = scale[n_z:].reshape(segments-1, 10)
+    cache = {}
+    pool = ProcessPoolExecutor(max_workers) if max_workers and max_workers > 1 else None
+
+    def evaluate(x):
+        key = x.tobytes()
+        if key not in cache:
+            cache.clear()
+            cache[key] = Shoot(x*scale, segments, p, kLa, pool)
+        return cache[key]
+
+    def objective(x):
+        z = x*scale
+        ends, G = evaluate(x)
+        grad = -G[-1,6]/(z[0]+30)
+        grad[0] += ends[-1,6]/(z[0]+30)**2
+        return -ends[-1,6]/(z[0]+30), grad*scale
+
+    def continuity(x):
+        z = x*scale
+        ends, G = evaluate(x)
+        return np.concatenate([(ends[m-1,Node_states]-z[n_z+10*(m-1):n_z+10*m])/nodes[m-1]
+                               for m in range(1, segments)])
+
+    def continuity_jacobian(x):
+        ends, G = evaluate(x)
+        rows = []
+        for m in range(1, segments):
+            D = G[m-1][Node_states].copy()
+            D[:, n_z+10*(m-1):n_z+10*m] -= np.eye(10)
+            rows.append(D*scale/nodes[m-1][:,None])
+        return np.vstack(rows)
+
+    def inequalities(x):
+        z = x*scale
+        ends, G = evaluate(x)
+        O = np.sum(Supplemented_NOX(z)[0])
+        return np.array([ends[-1,6]-Initial_titer-0.95*z[1],
+                         z[12]-z[11], z[13]-z[12],
+                         CCc*(z[0]+30)-(z[2]+Initial_titer),
+                         ECc*(z[0]+30)-(np.sum(z[3:8])+O)])
+
+    def inequalities_jacobian(x):
+        z = x*scale
+        ends, G = evaluate(x)
+        O, dO = Supplemented_NOX(z)
+        D = np.zeros((5, len(z)))
+        D[0] = G[-1,6]
+        D[0,1] -= 0.95
+        D[1,12], D[1,11] = 1, -1
+        D[2,13], D[2,12] = 1, -1
+        D[3,0], D[3,2] = CCc, -1
+        D[4] = -dO
+        D[4,0] += ECc
+        D[4,3:8] -= 1
+        return D*scale
+
+    constraints = [{'type': 'ineq', 'fun': inequalities, 'jac': inequalities_jacobian}]
+    if segments > 1:
+        constraints.append({'type': 'eq', 'fun': continuity, 'jac': continuity_jacobian})
+    try:
+        result = opt.minimize(objective, np.asarray(guess, dtype=float)/scale, jac = True,
+                              method = 'SLSQP', bounds = bounds, constraints = constraints,
+                              options = {'ftol': tol, 'maxiter': maxiter})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    result.x = result.x*scale
+    point = Shooting_point(result, ECc, CCc, kLa, p, n)
+    OPT.Record('solve', engine = 'shooting', ECi = ECc, segments = segments,
+               wall_time = time.perf_counter()-start, iterations = int(result.nit),
+               evaluations = int(result.nfev), termination = Termination(result), 
+               message = result.message)
+    return point, result
+
+def Termination(result):
+    '''The termination condition of IPOPT solves (info1 of Extract_point) 
+    that corresponds to the exit mode of SLSQP.'''
+    return str({0: pe.TerminationCondition.optimal, 
+                4: pe.TerminationCondition.infeasible, 
+                9: pe.TerminationCondition.maxIterations}.get(result.status, 
+                                                             pe.TerminationCondition.error))
+
+def Shooting_point(result, ECc, CCc, kLa, p, n):
+    '''Collects the solution of Solve_shooting in a point dict with the keys
+    of Extract_point; the profiles are simulated on n scaled times. info1 is 
+    the termination condition (Termination) and info2 the message of SLSQP.'''
+    z = result.x
+    tf = z[0]
+    tau = np.linspace(0, 1, n)
+    X = Trajectory(z, kLa, tau, p)
+    k = Kinetics.Constants(p, kLa)
+    q = z[Q_index]
+    values = {name: X[:,i] for i, name in enumerate(Kinetics.Substrates, 1)}
+    for enzyme, i in Kinetics.Enzyme_index.items():
+        values['E' + enzyme] = X[:,i]
+    for name, law in (('vI', 'I'), ('vII', 'II'), ('vIII', 'III'), ('vIV', 'IV'),
+                      ('vV', 'V'), ('vVI', 'VI'), ('rdNOX', 'dNOX'), ('NO2', 'O2')):
+        values[name] = Kinetics.Rate_laws[law](X.T, k)
+    values['rsNOX'] = Kinetics.Supplementation(tau*tf, tf, zip(q[1:4]/tf, q[4:7]*tf/100), np.tanh)
+    amounts, dO = Supplemented_NOX(z)
+    O = np.sum(amounts)
+    point = {'ECi': ECc, 'CCi': CCc, 'kLai': kLa, 'tau': tau}
+    for label, name in OPT.Profiles:
+        point[label] = values[name]
+    point['SpaceTimeYield'] = X[-1,6]/(tf+30)
+    point['EnzymeConsumption'] = (np.sum(z[3:8])+O)/(tf+30)
+    point['CofactorConsumption'] = (z[2]+Initial_titer)/(tf+30)
+    point['FinalTime'] = tf
+    point['InitialS1Concentration'] = z[1]
+    point['InitialS7Concentration'] = z[2]
+    for name, j in (('EUDH', 3), ('EGlucD', 4), ('EKdgD', 5), ('EKgsalDH', 6), ('ENOX', 7)):
+        point[name] = z[j]
+    for k in range(3):
+        point['A{}'.format(k+1)] = z[8+k]/tf
+        point['t{}'.format(k+1)] = z[11+k]*tf/100
+    point['TotalEnzymeConcentration'] = np.sum(z[3:8])+O
+    point['Yield'] = (X[-1,6]-X[0,6])/z[1]
+    point['info1'] = Termination(result)
+    point['info2'] = result.message
+    for k in range(3):
+        point['O{}s'.format(k+1)] = amounts[k]
+    return point
+
+
+if __name__ == '__main__':
+    # the epsilon values of the enzyme consumption, solved as one warm-start chain
+    epsilons = [0.05, 0.1, 0.15]
+    # the number of shooting segments and worker processes
+    segments = 4
+    max_workers = 4
+    OPT.Set_profile('Profile.jsonl')
+
+    guess = None
+    points = []
+    for ECi in epsilons:
+        point, result = Solve_shooting(ECi, guess = guess, segments = segments,
+                                       max_workers = max_workers)
+        print(ECi, point['SpaceTimeYield'], point['Yield'], result.message)
+        guess = result.x
+        points.append(point)
+    OPT.Save_results(points, 'ShootingPoints.npz')
@@ -18,40 +18,14 @@ from scipy.integrate import odeint
 import math as mt
 import scipy.optimize as opt
 import pylab
+import json
+import time
 
 #------------------------------------------------------------------ Parameters 
+'''The kinetic parameters, rate laws and stoichiometry are defined once in 
+Kinetics_CascadeMOO.py, which is shared with the optimization code.'''
 
-# Maximum reaction rates (U/mg)
-Vmax = {}
-Vmax['UDH'] =     221.333
-Vmax['GlucD'] =     8.876
-Vmax['KdgD'] =      5.109
-Vmax['KgsalDH'] =  40.701
-Vmax['NOX'] =      16.409
-# Kinetic parameters (mM)
-Km = {}
-Km['UDH',1] =       0.0780
-Km['UDH',7] =       0.5884
-Km['GlucD',3] =     0.2945
-Km['KdgD',4] =      0.4652
-Km['KgsalDH',5] =   0.4812
-Km['KgsalDH',7] =   0.1760
-Km['NOX',7] =       0.1420
-Km['NOX',8] =       0.0050
-Km['NOX',9] =       0.0045
-# Molecular weights (mg/mmol)
-MW = {}
-MW['UDH'] =     31210
-MW['GlucD'] =   51010
-MW['KdgD'] =    34790
-MW['KgsalDH'] = 57700
-MW['NOX'] =     51940
-# First order decay constant for NOX (min^(-1))
-kNOX = 0.030 
-# Rate constant for the glucaro-1,4-lactone opening (min^(-1))
-kII = 0.013 
-# Oxygen solubilty (mM)
-S9_Star = 1*0.2099/0.774
+import Kinetics_CascadeMOO as Kinetics
 
 #----------------------------------------------------------- Control variables
 '''You can find the values of the control variables in Tables 6-13 of the 
@@ -89,28 +63,28 @@ t_2 = 285
 t_3 = 376
 # Oxygen mass transfer coefficient (min^(-1))
 kLa = 1.2 
+# Representation of the NOX supplementations ('tanh', or the more accurate and 
+# more expensive 'impulse' or 'segment', see EXACT_PULSES)
+pulses = 'tanh'
 
 
 #-----------------------------------------------------------------------------
 def Reaction_rates(X,t):
+    k           = Kinetics.Constants(Kinetics.Parameter_list(), kLa)
     v           = {}
-    v['I']      = (Vmax['UDH']*X[1]*X[7])/((Km['UDH',7]*X[7])+(Km['UDH',1]*X[1])+(X[1]*X[7]))*MW['UDH']*X[10]/1000000
-    v['II']     = kII*X[2]
-    v['III']    = (Vmax['GlucD']*X[3])/(Km['GlucD',3]+X[3])*MW['GlucD']*X[11]/1000000 
-    v['IV']     = (Vmax['KdgD']*X[4])/(Km['KdgD',4]+X[4])*MW['KdgD']*X[12]/1000000
-    v['V']      = (Vmax['KgsalDH']*X[5]*X[7])/((Km['KgsalDH',7]*X[7])+(Km['KgsalDH',5]*X[5])+(X[5]*X[7]))*MW['KgsalDH']*X[13]/1000000 
-    v['VI']     = (Vmax['NOX']*X[8]*X[9])/(Km['NOX',8]+X[8]*(1+X[7]/Km['NOX',7])*(Km['NOX',9]+X[9]))*MW['NOX']*X[14]/1000000
+    for name in ['I', 'II', 'III', 'IV', 'V', 'VI']:
+        v[name] = Kinetics.Rate_laws[name](X, k)
     return(v)
 
 def NOX_deactivation_and_supplementation(X,t):
     r           = {}
-    r['_d^NOX'] = kNOX*X[14]
-    r['_s^NOX'] = (A_1*(mt.tanh(100*t/t_f-100*t_1/t_f)-mt.tanh(100*t/t_f-(100*t_1/t_f+4/t_f)))+A_2*(mt.tanh(100*t/t_f-100*t_2/t_f)-mt.tanh(100*t/t_f-(100*t_2/t_f+4/t_f)))+A_3*(mt.tanh(100*t/t_f-100*t_3/t_f)-mt.tanh(100*t/t_f-(100*t_3/t_f+4/t_f))))
+    r['_d^NOX'] = Kinetics.kNOX*X[14]
+    r['_s^NOX'] = Kinetics.Supplementation(t, t_f, [(A_1, t_1), (A_2, t_2), (A_3, t_3)], mt.tanh)
     return(r)
 
 def Oxygen_transfer(X,t):
     N           = {}
-    N['_O2']    = kLa*(S9_Star-X[9])
+    N['_O2']    = kLa*(Kinetics.S9_Star-X[9])
     return(N)
 
 #-------------------------------------------------------DIFFERENTIAL_EQUATIONS
@@ -119,67 +93,490 @@ def Material_balances(X,t):
     v = Reaction_rates(X,t)
     N = Oxygen_transfer(X,t)
     r = NOX_deactivation_and_supplementation(X,t)
-    dS1dt = -v['I']
-    dS2dt = +v['I']-v['II']
-    dS3dt = +v['II']-v['III']
-    dS4dt = +v['III']-v['IV']
-    dS5dt = +v['IV']-v['V']
-    dS6dt = +v['V']
-    dS7dt = +v['VI']-v['I']-v['V']
-    dS8dt = -dS7dt
-    dS9dt = -1/2*v['VI']+N['_O2']
-    dEUDHdt      = 0
-    dEGlucDdt    = 0
-    dEKdgDdt     = 0
-    dEKgsalDHdt  = 0
-    dENOXdt      = -r['_d^NOX']+r['_s^NOX']
-    dXdt = [0, dS1dt, dS2dt, dS3dt, dS4dt, dS5dt, dS6dt, dS7dt, dS8dt, dS9dt, dEUDHdt, dEGlucDdt, dEKdgDdt, dEKgsalDHdt, dENOXdt]
+    v['O2'] = N['_O2']
+    v['dNOX'] = r['_d^NOX']
+    v['sNOX'] = r['_s^NOX']
+    dXdt = [0] + [Kinetics.Balance(i, v) for i in range(1,15)]
     return(dXdt)
 
+#------------------------------------------------------------------ARRAY_KERNEL
+'''The functions above are kept as the reference implementation. The array 
+kernel below evaluates the same material balances without building dicts or 
+lists and supplies the analytic Jacobian to odeint (Dfun). Both are generated 
+from the rate laws of Kinetics_CascadeMOO.py when this file is imported.''' 
+
+# the generated right-hand side and Jacobian of the material balances 
+Balances_kernel = Kinetics.Compile()
+Jacobian_kernel = Kinetics.Compile(jacobian = True)
+Parameter_jacobian_kernel = Kinetics.Compile(parameters = True)
+
+def Control_vector():
+    '''Packs the control variables defined above into the control vector u.'''
+    return np.array([t_f, E_UDH_initial, E_GlucD_initial, E_KdgD_initial, 
+                     E_KgsalDH_initial, E_NOX_initial, A_1, A_2, A_3, 
+                     t_1, t_2, t_3, kLa], dtype=float)
+
+def Initial_state(u):
+    '''Initial state vector for the control vector u (13,) or the batch of 
+    control vectors u (13,N). The result has the shape (15,) or (15,N).'''
+    u = np.asarray(u, dtype=float)
+    X0 = np.zeros((15,) + u.shape[1:])
+    X0[1] = S1_initial
+    X0[7] = S7_initial
+    X0[9] = Kinetics.S9_Star
+    X0[10:15] = u[1:6]
+    return X0
+
+def NOX_supplementation_array(t, u, tanh = np.tanh):
+    '''The NOX supplementation rate r_s^NOX of the array kernel. math.tanh can 
+    be passed as tanh when t and u are plain floats.'''
+    return Kinetics.Supplementation(t, u[0], zip(u[6:9], u[9:12]), tanh)
+
+def Material_balances_array(X, t, p, u, dXdt, tanh = np.tanh):
+    '''Array version of Material_balances. X is a state vector (15,) or a batch 
+    of state vectors (15,N); p and u are broadcast against the rows of X. The 
+    time derivatives are written into dXdt, which is returned. The entries of 
+    the constant states (0 and 10-13) are not written, so dXdt has to be 
+    zero-initialized once by the caller.'''
+    return Balances_kernel(X, t, p, u, dXdt, tanh)
+
+def Jacobian_array(X, t, p, u, J):
+    '''Jacobian J[i,j] = d(dXdt[i])/dX[j] of Material_balances_array.
+    J has the shape (15,15) or (15,15,N). Only the structurally nonzero entries 
+    are written, so J has to be zero-initialized once by the caller.'''
+    return Jacobian_kernel(X, t, p, u, J, np.tanh)
+
+def Parameter_jacobian_array(X, t, p, u, Jp):
+    '''Jacobian Jp[i,j] = d(dXdt[i])/dp[j] of Material_balances_array with 
+    respect to the kinetic parameters (Kinetics.P_names). Jp has the shape (15,16) or 
+    (15,16,N) and has to be zero-initialized once by the caller.'''
+    return Parameter_jacobian_kernel(X, t, p, u, Jp, np.tanh)
+
+def Array_kernel(p, u):
+    '''Returns the functions (Material_balances, Jacobian) for odeint for the 
+    parameter vector p and the control vector u. Both write into buffers that 
+    are allocated once here. p, u and the state are passed to the kernel as 
+    plain floats, which is considerably faster than numpy scalars.'''
+    p = [float(pk) for pk in p]
+    u = [float(uk) for uk in u]
+    dXdt = np.zeros(15)
+    J = np.zeros((15,15))
+    def rhs(X, t):
+        return Material_balances_array(X.tolist(), t, p, u, dXdt, mt.tanh)
+    def jac(X, t):
+        return Jacobian_array(X.tolist(), t, p, u, J)
+    return rhs, jac
+
+def Check_array_kernel(n = 100, rtol = 1e-6):
+    '''Regression check of the array kernel against the dict-based 
+    Material_balances: the right-hand sides are compared along the reference 
+    trajectory, the analytic Jacobian against central finite differences of 
+    Material_balances and the two simulated trajectories against each other. 
+    Raises a RuntimeError if a deviation exceeds its tolerance and returns the 
+    maximum relative deviations otherwise (see tests/test_array_kernel.py).'''
+    p, u = Kinetics.Parameter_vector(), Control_vector()
+    rhs, jac = Array_kernel(p, u)
+    t = np.linspace(0,t_f,n)
+    X0 = Initial_state(u)
+    X_ref = odeint(Material_balances,X0,t)
+    X_arr = odeint(rhs,X0,t,Dfun=jac)
+    err = {'rhs': 0.0, 'jacobian': 0.0, 'trajectory': 0.0}
+    for X, tk in zip(X_ref, t):
+        f_ref = np.array(Material_balances(X,tk))
+        f_arr = rhs(X,tk)
+        err['rhs'] = max(err['rhs'], np.max(np.abs(f_arr-f_ref))/(np.max(np.abs(f_ref))+1e-12))
+        J_fd = np.zeros((15,15))
+        for j in range(1,15):
+            h = 1e-6*max(1.0, abs(X[j]))
+            Xp, Xm = X.copy(), X.copy()
+            Xp[j] += h
+            Xm[j] -= h
+            J_fd[:,j] = (np.array(Material_balances(Xp,tk))-np.array(Material_balances(Xm,tk)))/(2*h)
+        J_arr = jac(X,tk)
+        err['jacobian'] = max(err['jacobian'], np.max(np.abs(J_arr-J_fd))/(np.max(np.abs(J_fd))+1e-12))
+    err['trajectory'] = np.max(np.abs(X_arr-X_ref))/np.max(np.abs(X_ref))
+    # the trajectories are only equal up to the integration tolerance 
+    tol = {'rhs': rtol, 'jacobian': 1e3*rtol, 'trajectory': 1e3*rtol}
+    for key in err:
+        if not err[key] <= tol[key]:
+            raise RuntimeError('array kernel deviates from Material_balances ({}: {:.3e})'.format(key, err[key]))
+    return err
+
+#------------------------------------------------------------------EXACT_PULSES
+'''Each NOX supplementation is modelled as a tanh pulse of the width t_f/100, 
+which the integrator can step over entirely when it takes large steps. In the 
+exact pulse modes the horizon is split at the supplementations and the dose of 
+each pulse is added as a known quantity: 'impulse' adds the whole dose at once 
+at the centre of the pulse, 'segment' adds it at a constant rate over the width 
+2*t_f/100 of the pulse. In both modes the same amount of NOX as in the tanh 
+model is supplemented. The exact modes are accuracy options and cost more 
+than the tanh pulses: for the schedule above odeint needs 2395 evaluations of 
+the material balances with 'tanh', 2832 with 'impulse' and 5204 with 
+'segment'. The cost is not the restart after each supplementation (starting 
+each piece with the last step size saves about 1 %) but the fast dynamics 
+after the NOX is added, which odeint resolves in small steps.'''
+
+def Log_cosh(x):
+    '''ln(cosh(x)) without overflow for large |x|.'''
+    x = np.abs(x)
+    return x+np.log1p(np.exp(-2*x))-np.log(2)
+
+def Supplementation_segments(u, pulses):
+    '''Start times, end times (min) and doses (μM) of the three NOX 
+    supplementations of the control vector u (13,) or the batch of control 
+    vectors u (13,N) in the exact pulse mode pulses ('impulse' or 'segment'). 
+    The dose is the integral of the tanh pulse over [0, t_f]; the start and 
+    end times are equal for impulses.'''
+    u = np.asarray(u, dtype=float)
+    tf = u[0]
+    ts = u[9:12]
+    k = 100/tf
+    delta = 4/tf
+    # integral of A*(tanh(k*(t-ts))-tanh(k*(t-ts)-delta)) from 0 to t_f
+    dose = u[6:9]/k*(Log_cosh(k*(tf-ts))-Log_cosh(k*(tf-ts)-delta)
+                     -Log_cosh(-k*ts)+Log_cosh(-k*ts-delta))
+    centre = ts+delta/(2*k)
+    if pulses == 'impulse':
+        width = 0*tf
+    elif pulses == 'segment':
+        width = 2/k
+    else:
+        raise ValueError("unknown pulse mode '{}'".format(pulses))
+    start = np.clip(centre-width/2, 0, tf)
+    end = np.clip(centre+width/2, 0, tf)
+    return start, end, dose
+
+def Integrate(rhs, jac, x0, t, hmax, rtol = None, atol = None):
+    '''Integrates with odeint and the Jacobian jac from x0 over the times t 
+    (with the tolerances of odeint unless rtol and atol are given). The steps 
+    are limited to hmax (min), so that odeint cannot step over a 
+    supplementation pulse whatever the output times are. Raises a 
+    RuntimeError if odeint fails. Returns the trajectory and the infodict.'''
+    X, infodict = odeint(rhs, x0, t, Dfun=jac, hmax=hmax, mxstep=100000, full_output=True, 
+                         rtol=rtol, atol=atol)
+    if infodict['message'] != 'Integration successful.':
+        raise RuntimeError('odeint failed: {}'.format(infodict['message']))
+    return X, infodict
+
+def Simulate(u, t, p = None, pulses = 'tanh', full_output = False, rtol = None, atol = None):
+    '''Simulates the schedule with the control vector u at the times t (min) 
+    with odeint and the analytic Jacobian (see Integrate; the steps are at 
+    most t_f/100 long). With pulses = 'impulse' or 
+    'segment' the horizon is split at the supplementations, which are applied 
+    exactly (see above), and the integration is restarted after each of them; 
+    these modes need more evaluations of the material balances than 'tanh'. 
+    rtol and atol are passed to odeint. Returns the trajectory X (len(t) x 
+    15) and, if full_output is set, the summed odeint counters nfe, nje and 
+    nst.'''
+    u = np.asarray(u, dtype=float)
+    t = np.asarray(t, dtype=float)
+    if p is None:
+        p = Kinetics.Parameter_vector()
+    info = {'nfe': 0, 'nje': 0, 'nst': 0}
+    X0 = Initial_state(u)
+    if pulses == 'tanh':
+        rhs, jac = Array_kernel(p, u)
+        X, infodict = Integrate(rhs, jac, X0, t, u[0]/100, rtol, atol)
+        for key in info:
+            info[key] = int(infodict[key][-1])
+        return (X, info) if full_output else X
+    start, end, dose = Supplementation_segments(u, pulses)
+    u_smooth = u.copy()
+    u_smooth[6:9] = 0
+    rhs_smooth, jac = Array_kernel(p, u_smooth)
+    rate = np.where(end > start, dose/np.where(end > start, end-start, 1), 0)
+    breaks = np.unique(np.concatenate(([t[0], t[-1]], start, end)))
+    breaks = breaks[(breaks >= t[0]) & (breaks <= t[-1])]
+    X = np.empty((len(t),15))
+    x = X0
+    for ta, tb in zip(breaks[:-1], breaks[1:]):
+        # impulses are applied at the start of a piece and constant rates over it 
+        x = x.copy()
+        x[14] += np.sum(dose[(end == start) & (start == ta)])
+        r = np.sum(rate[(start <= ta) & (end >= tb)])
+        def rhs(X, tk):
+            dXdt = rhs_smooth(X, tk)
+            dXdt[14] += r
+            return dXdt
+        inside = (t >= ta) & ((t < tb) | (tb == breaks[-1]))
+        tk = np.concatenate(([ta], t[inside], [tb]))
+        Xk, infodict = Integrate(rhs, jac, x, tk, u[0]/100, rtol, atol)
+        X[inside] = Xk[1:-1]
+        x = Xk[-1]
+        for key in info:
+            info[key] += int(infodict[key][-1])
+    # an impulse at the last time (clipped to t_f) starts no piece 
+    X[t == breaks[-1], 14] += np.sum(dose[(end == start) & (start == breaks[-1])])
+    return (X, info) if full_output else X
+
+#-----------------------------------------------------------------BATCH_SOLVER
+'''Many schedules can be simulated in one vectorized pass. All schedules are 
+integrated together in the scaled time tau = t/t_f, in which they share the 
+same output grid, with the linearly implicit Rosenbrock method RODAS4 (Hairer 
+& Wanner). Every schedule keeps its own step size, so a supplementation pulse 
+of one schedule does not slow down the others. The linear systems of the 
+method are solved with the block structure of the Jacobian (the substrates 
+S1-S6 form a chain that is only coupled through S7, while S7, S8 and S9 form a 
+small dense block), which only needs elementwise operations over the batch.'''
+
+# Coefficients of RODAS4 (Hairer & Wanner, Solving ODEs II, Section VI.4)
+RODAS4 = {'gamma': 0.25,
+          'c': [0, 0.386, 0.21, 0.63, 1, 1],
+          'd': [0.25, -0.1043, 0.1035, -0.3620000000000023e-01, 0, 0],
+          'a': [[],
+                [0.1544e+01],
+                [0.9466785280815826, 0.2557011698983284],
+                [0.3314825187068521e+01, 0.2896124015972201e+01, 0.9986419139977817],
+                [0.1221224509226641e+01, 0.6019134481288629e+01, 0.1253708332932087e+02, 
+                 -0.6878860361058950],
+                [0.1221224509226641e+01, 0.6019134481288629e+01, 0.1253708332932087e+02, 
+                 -0.6878860361058950, 1]],
+          'C': [[],
+                [-0.5668800000000000e+01],
+                [-0.2430093356833875e+01, -0.2063599157091915],
+                [-0.1073529058151375, -0.9594562251023355e+01, -0.2047028614809616e+02],
+                [0.7496443313967647e+01, -0.1024680431464352e+02, -0.3399990352819905e+02, 
+                 0.1170890893206160e+02],
+                [0.8083246795921522e+01, -0.7981132988064893e+01, -0.3152159432874371e+02, 
+                 0.1631930543123136e+02, -0.6058818238834054e+01]]}
+
+def NOX_supplementation_derivative_array(t, u):
+    '''Time derivative of NOX_supplementation_array.'''
+    tf = u[0]
+    dr = 0
+    for A, ts in ((u[6], u[9]), (u[7], u[10]), (u[8], u[11])):
+        dr = dr + A*100/tf*(np.tanh(100*t/tf-(100*ts/tf+4/tf))**2-np.tanh(100*t/tf-100*ts/tf)**2)
+    return dr
+
+def Jacobian_pattern():
+    '''Structurally nonzero entries (i,j) of Jacobian_array, obtained from an 
+    evaluation at a state in which all concentrations are positive.'''
+    X = np.full(15, 0.5)
+    J = Jacobian_array(X, 0.0, Kinetics.Parameter_vector(), Control_vector(), np.zeros((15,15)))
+    return {(i,j) for i in range(15) for j in range(15) if J[i,j] != 0}
+
+def Factor_iteration_matrix(J, s, pattern):
+    '''Factorizes W = s*I - J for a batch of Jacobians J (15,15,N) with the 
+    nonzero entries pattern and shifts s (N,). Rows 1-6 are lower triangular 
+    apart from the column of S7, so S1-S6 are eliminated as k_i = a_i + b_i*k_7 
+    and the remaining 3x3 system of S7, S8 and S9 is inverted explicitly.'''
+    Wd = [s-J[i,i] for i in range(15)]
+    # the couplings that are used by the elimination 
+    lower = {i: [j for j in range(1,i) if (i,j) in pattern] for i in range(1,7)}
+    chain = {i: [j for j in range(1,7) if (i,j) in pattern] for i in (7,8,9)}
+    enzymes = {i: [j for j in range(10,15) if (i,j) in pattern] for i in range(1,10)}
+    b = {}
+    for i in range(1,7):
+        bi = J[i,7]
+        for j in lower[i]:
+            bi = bi+J[i,j]*b[j]
+        b[i] = bi/Wd[i]
+    M = {}
+    for r in (7,8,9):
+        for c in (7,8,9):
+            M[r,c] = Wd[r] if r == c else -J[r,c]
+        for j in chain[r]:
+            M[r,7] = M[r,7]-J[r,j]*b[j]
+    det = (M[7,7]*(M[8,8]*M[9,9]-M[8,9]*M[9,8])
+          -M[7,8]*(M[8,7]*M[9,9]-M[8,9]*M[9,7])
+          +M[7,9]*(M[8,7]*M[9,8]-M[8,8]*M[9,7]))
+    Minv = {(7,7): (M[8,8]*M[9,9]-M[8,9]*M[9,8])/det,
+            (7,8): (M[7,9]*M[9,8]-M[7,8]*M[9,9])/det,
+            (7,9): (M[7,8]*M[8,9]-M[7,9]*M[8,8])/det,
+            (8,7): (M[8,9]*M[9,7]-M[8,7]*M[9,9])/det,
+            (8,8): (M[7,7]*M[9,9]-M[7,9]*M[9,7])/det,
+            (8,9): (M[7,9]*M[8,7]-M[7,7]*M[8,9])/det,
+            (9,7): (M[8,7]*M[9,8]-M[8,8]*M[9,7])/det,
+            (9,8): (M[7,8]*M[9,7]-M[7,7]*M[9,8])/det,
+            (9,9): (M[7,7]*M[8,8]-M[7,8]*M[8,7])/det}
+    return J, Wd, b, Minv, lower, chain, enzymes
+
+def Solve_iteration_matrix(factors, rhs):
+    '''Solves W*k = rhs (15,N) with the factors of Factor_iteration_matrix.'''
+    J, Wd, b, Minv, lower, chain, enzymes = factors
+    k = np.empty_like(rhs)
+    # the rows of the enzymes only contain the diagonal 
+    for i in (0,10,11,12,13,14):
+        k[i] = rhs[i]/Wd[i]
+    r = {}
+    for i in range(1,10):
+        r[i] = rhs[i]
+        for j in enzymes[i]:
+            r[i] = r[i]+J[i,j]*k[j]
+    a = {}
+    for i in range(1,7):
+        ai = r[i]
+        for j in lower[i]:
+            ai = ai+J[i,j]*a[j]
+        a[i] = ai/Wd[i]
+    q = {}
+    for i in (7,8,9):
+        q[i] = r[i]
+        for j in chain[i]:
+            q[i] = q[i]+J[i,j]*a[j]
+    for i in (7,8,9):
+        k[i] = Minv[i,7]*q[7]+Minv[i,8]*q[8]+Minv[i,9]*q[9]
+    for i in range(1,7):
+        k[i] = a[i]+b[i]*k[7]
+    return k
+
+def Simulate_batch(U, n = 100, p = None, pulses = 'tanh', rtol = 1e-5, atol = 1e-7, X0 = None):
+    '''Simulates all schedules in U (N x 13, one control vector per row in the 
+    order of Kinetics.U_names) in one vectorized pass. p is a parameter vector (16,) or 
+    one parameter vector per schedule (16,N). pulses selects the tanh pulses 
+    or one of the exact pulse modes of Simulate; the steps of every schedule 
+    then end on its own supplementation times. X0 holds the initial states 
+    (15,N); by default they are those of Initial_state. Returns the time grids 
+    t (N x n) and the trajectories X (N x n x 15).'''
+    U = np.atleast_2d(np.asarray(U, dtype=float))
+    N = U.shape[0]
+    if p is None:
+        p = Kinetics.Parameter_vector()
+    p = np.asarray(p, dtype=float)
+    tau_grid = np.linspace(0,1,n)
+    X = np.empty((N,n,15))
+    g, c, d, a, C = RODAS4['gamma'], RODAS4['c'], RODAS4['d'], RODAS4['a'], RODAS4['C']
+    pattern = Jacobian_pattern()
+    # working arrays of the schedules that have not reached t_f yet 
+    lanes = np.arange(N)
+    u = U.T.copy()
+    y = Initial_state(u) if X0 is None else np.array(X0, dtype=float)
+    # supplementation rates (μM per unit of tau) and impulses that are not applied yet
+    if pulses == 'tanh':
+        start = end = np.full((3,N), np.inf)
+        dose = rate = np.zeros((3,N))
+    else:
+        start, end, dose = Supplementation_segments(u, pulses)
+        start, end = start/u[0], end/u[0]
+        rate = np.where(end > start, dose/np.where(end > start, end-start, 1), 0)
+        u[6:9] = 0
+    pending = (end == start) & (start <= 1)
+    tau = np.zeros(N)
+    due = pending & (start <= tau)
+    y[14] += np.sum(np.where(due, dose, 0), axis=0)
+    pending &= ~due
+    X[:,0] = y.T
+    h = np.full(N, 1e-4)
+    k_next = np.ones(N, dtype=int)
+    while lanes.size:
+        tf = u[0]
+        # the steps end exactly on the output grid and on the supplementations
+        events = np.concatenate((start, end))
+        target = np.minimum(tau_grid[k_next], np.min(np.where(events > tau, events, np.inf), axis=0))
+        h = np.minimum(h, target-tau)
+        r = np.sum(np.where((start <= tau+h/2) & (end > tau+h/2), rate, 0), axis=0)
+        J = np.zeros((15,15,lanes.size))
+        Jacobian_array(y, tau*tf, p, u, J)
+        J *= tf
+        ft = np.zeros((15,lanes.size))
+        ft[14] = tf*tf*NOX_supplementation_derivative_array(tau*tf, u)
+        factors = Factor_iteration_matrix(J, 1/(g*h), pattern)
+        k = []
+        y_stage = y
+        for i in range(6):
+            if i > 0:
+                y_stage = y+sum(a[i][j]*k[j] for j in range(i))
+            F = np.zeros((15,lanes.size))
+            Material_balances_array(y_stage, (tau+c[i]*h)*tf, p, u, F)
+            F *= tf
+            F[14] += r
+            rhs = F+sum(C[i][j]/h*k[j] for j in range(i))+d[i]*h*ft
+            k.append(Solve_iteration_matrix(factors, rhs))
+        y_new = y_stage+k[5]
+        scale = atol+rtol*np.maximum(np.abs(y), np.abs(y_new))
+        err = np.sqrt(np.mean((k[5]/scale)**2, axis=0))
+        accepted = err <= 1
+        y = np.where(accepted, y_new, y)
+        tau = np.where(accepted, tau+h, tau)
+        h = h*np.clip(0.9*np.maximum(err,1e-10)**(-1/4), 0.2, 6)
+        landed = accepted & (tau >= target-1e-12)
+        tau[landed] = target[landed]
+        due = pending & (start <= tau)
+        y[14] += np.sum(np.where(due, dose, 0), axis=0)
+        pending &= ~due
+        on_grid = landed & (tau >= tau_grid[k_next])
+        X[lanes[on_grid],k_next[on_grid]] = y[:,on_grid].T
+        k_next[on_grid] += 1
+        running = k_next < n
+        if not running.all():
+            lanes, u, y, tau, h, k_next = lanes[running], u[:,running], y[:,running], tau[running], h[running], k_next[running]
+            start, end, dose, rate, pending = start[:,running], end[:,running], dose[:,running], rate[:,running], pending[:,running]
+            if p.ndim == 2:
+                p = p[:,running]
+    t = U[:,:1]*tau_grid
+    return t, X
+
+def Performance(U, X):
+    '''The key performance indicators of the schedules U (N x 13) from their 
+    trajectories X (N x n x 15), defined as in FunctionforPF: the final 
+    titer of S6 (mM), the yield, the space-time yield (mM/min), the enzyme 
+    consumption with the supplemented NOX (μM/min), the cofactor consumption 
+    (mM/min) and the smallest oxygen concentration on the grid (mM). Returns 
+    a dict of arrays (N,).'''
+    U = np.atleast_2d(np.asarray(U, dtype=float))
+    tf = U[:,0]
+    start, end, dose = Supplementation_segments(U.T, 'impulse')
+    return {'S6': X[:,-1,6], 'Yield': (X[:,-1,6]-X[:,0,6])/X[:,0,1], 
+            'SpaceTimeYield': X[:,-1,6]/(tf+30), 
+            'EnzymeConsumption': (np.sum(U[:,1:6], axis=1)+np.sum(dose, axis=0))/(tf+30), 
+            'CofactorConsumption': (X[:,0,7]+X[:,0,8])/(tf+30), 
+            'S9_min': np.min(X[:,:,9], axis=1)}
+
 #-----------------------------------------------------------------------SOLVER
-t = np.linspace(0,t_f,100)
-X0 = [0, S1_initial, 0, 0, 0, 0, 0, S7_initial, 0, S9_Star, E_UDH_initial , E_GlucD_initial , E_KdgD_initial , E_KgsalDH_initial, E_NOX_initial]
-X = odeint(Material_balances,X0,t)
+if __name__ == '__main__':
+    # the file of fitted kinetic parameters (Estimation_CascadeMOO.py); None 
+    # keeps the parameters of Kinetics_CascadeMOO.py
+    parameter_file = None
+    if parameter_file is not None:
+        Kinetics.Load_parameters(parameter_file)
+    t = np.linspace(0,t_f,100)
+    u = Control_vector()
+    start = time.perf_counter()
+    X, info = Simulate(u, t, pulses = pulses, full_output = True)
+    # the wall time and the odeint counters of the simulation as a JSON line 
+    with open('Profile.jsonl', 'a') as file:
+        file.write(json.dumps(dict(kind = 'simulate', pulses = pulses, 
+                                   wall_time = time.perf_counter()-start, **info)) + '\n')
 
 #----------------------------------------------------------------------PLOTTING
-import matplotlib.pyplot as plt
-plt.figure(figsize=(9,8))
-plt.subplot(311)
-plt.plot(t,X[:,1] ,'b', label='S$_1$')
-plt.plot(t,X[:,2] ,'c', label='S$_2$')
-plt.plot(t,X[:,3], 'm', label='S$_3$')
-plt.plot(t,X[:,4] ,'y', label='S$_4$')
-plt.plot(t,X[:,5] , 'r', label='S$_5$')
-plt.plot(t,X[:,6], 'k', label='S$_6$') 
-plt.plot(t,X[:,7] , 'g', label='S$_7$')
-plt.plot(t,X[:,8], '0.75', label='S$_8$')
-plt.xlabel('$\it{t}$ / (min)', fontsize=17)
-plt.ylabel('$\it{S}$$_i$ / (mM)', fontsize=17)
-plt.grid(False)
-plt.xticks(fontsize=17)
-plt.yticks(fontsize=17)
-
-plt.subplot(312)
-plt.plot(t,X[:,10], 'b', label='E$^{UDH}$')
-plt.plot(t,X[:,11], 'r', label='E$^{GlucD}$')
-plt.plot(t,X[:,12], 'c', label='E$^{KdgD}$')
-plt.plot(t,X[:,13], 'g', label='E$^{KgsalDH}$')
-plt.plot(t,X[:,14], 'm', label='E$^{NOX}$')
-plt.xlabel('$\it{t}$ / (min)', fontsize=17)  
-plt.ylabel('$\it{E}$$^{j}$ / (μM)', fontsize=17)
-plt.grid(False)
-plt.yticks(fontsize=17)
-plt.xticks(fontsize=17)
-
-plt.subplot(313)
-plt.plot(t,X[:,9], 'b', label='S$_{9}$')
-plt.xlabel('$\it{t}$ / (min)', fontsize=17)
-plt.ylabel('$\it{S}$$_{9}$ / (mM)', fontsize=17)
-plt.grid(False)
-plt.xticks(fontsize=17)
-plt.yticks(fontsize=17)
-plt.subplots_adjust(left=None, bottom=None, right=None, top=None, wspace=0.01, hspace=0.5)  
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(9,8))
+    plt.subplot(311)
+    plt.plot(t,X[:,1] ,'b', label='S$_1$')
+    plt.plot(t,X[:,2] ,'c', label='S$_2$')
+    plt.plot(t,X[:,3], 'm', label='S$_3$')
+    plt.plot(t,X[:,4] ,'y', label='S$_4$')
+    plt.plot(t,X[:,5] , 'r', label='S$_5$')
+    plt.plot(t,X[:,6], 'k', label='S$_6$') 
+    plt.plot(t,X[:,7] , 'g', label='S$_7$')
+    plt.plot(t,X[:,8], '0.75', label='S$_8$')
+    plt.xlabel('$\it{t}$ / (min)', fontsize=17)
+    plt.ylabel('$\it{S}$$_i$ / (mM)', fontsize=17)
+    plt.grid(False)
+    plt.xticks(fontsize=17)
+    plt.yticks(fontsize=17)
+
+    plt.subplot(312)
+    plt.plot(t,X[:,10], 'b', label='E$^{UDH}$')
+    plt.plot(t,X[:,11], 'r', label='E$^{GlucD}$')
+    plt.plot(t,X[:,12], 'c', label='E$^{KdgD}$')
+    plt.plot(t,X[:,13], 'g', label='E$^{KgsalDH}$')
+    plt.plot(t,X[:,14], 'm', label='E$^{NOX}$')
+    plt.xlabel('$\it{t}$ / (min)', fontsize=17)  
+    plt.ylabel('$\it{E}$$^{j}$ / (μM)', fontsize=17)
+    plt.grid(False)
+    plt.yticks(fontsize=17)
+    plt.xticks(fontsize=17)
+
+    plt.subplot(313)
+    plt.plot(t,X[:,9], 'b', label='S$_{9}$')
+    plt.xlabel('$\it{t}$ / (min)', fontsize=17)
+    plt.ylabel('$\it{S}$$_{9}$ / (mM)', fontsize=17)
+    plt.grid(False)
+    plt.xticks(fontsize=17)
+    plt.yticks(fontsize=17)
+    plt.subplots_adjust(left=None, bottom=None, right=None, top=None, wspace=0.01, hspace=0.5)  
      
-pylab.savefig('ProcessScheduleSimulation.PNG')
-pylab.savefig('ProcessScheduleSimulation.pdf')
-plt.show()
+    pylab.savefig('ProcessScheduleSimulation.PNG')
+    pylab.savefig('ProcessScheduleSimulation.pdf')
+    plt.show()
@@ -0,0 +1,144 @@
+# ----------------------------------------------------------------------------
+# This code supplements the following paper:
+#
+# "Design of enzymatic cascade reactors through multi-objective
+#                  dynamic optimization"
+#
+# Authors: Leandros Paschalidis, Barbara Beer, Samuel Sutiono, Volker Sieber,
+# Jakob Burger
+#
+# The paper was submited to: Biochemical Engineering Journal.
+# ----------------------------------------------------------------------------
+'''Propagation of the uncertainty of the kinetic parameters to the Pareto-
+optimal schedules. Parameter sets are drawn from the distributions below and
+every schedule of a front is simulated under all of them with
+SIM.Simulate_batch, which takes one parameter vector per lane, so the
+parameter sets are an array dimension (16 x N) of one vectorized simulation.
+The chunks of lanes are simulated in a process pool. Run this file to
+propagate the uncertainty to the points of ParetoOptimalPoints.npz.'''
+
+import numpy as np
+import time
+from concurrent.futures import ProcessPoolExecutor
+import Kinetics_CascadeMOO as Kinetics
+import Simulation_CascadeMOO as SIM
+import Optimization1_CascadeMOO as OPT
+
+# the distributions of the uncertain parameters (the names of P_names, and
+# kLa): ('lognormal', s) multiplies the nominal value by exp(s*N(0,1)),
+# ('normal', s) by 1+s*N(0,1) (truncated at zero) and ('uniform', a, b) by a
+# factor drawn from [a, b]; the other parameters keep their nominal values
+Distributions = {name: ('lognormal', 0.1) for name in Kinetics.P_names}
+
+# the quantities reported for each schedule and the percentiles of their
+# distributions
+KPI_names = ['Yield', 'SpaceTimeYield', 'EnzymeConsumption', 'CofactorConsumption']
+Percentiles = [5, 25, 50, 75, 95]
+
+
+def Factors(distribution, n, rng):
+    '''n factors on the nominal value of a parameter drawn from
+    distribution (see Distributions).'''
+    kind = distribution[0]
+    if kind == 'lognormal':
+        return np.exp(distribution[1]*rng.standard_normal(n))
+    if kind == 'normal':
+        return np.maximum(1+distribution[1]*rng.standard_normal(n), 0)
+    if kind == 'uniform':
+        return rng.uniform(distribution[1], distribution[2], n)
+    raise ValueError('unknown distribution: {}'.format(kind))
+
+def Sample_parameters(n, distributions = Distributions, p = None, seed = None):
+    '''Draws n parameter sets. Returns the parameter vectors as an array
+    (16 x n, one column per set in the order of P_names) and the factors on
+    kLa (n,).'''
+    rng = np.random.default_rng(seed)
+    if p is None:
+        p = Kinetics.Parameter_vector()
+    P = np.repeat(np.asarray(p, dtype=float)[:,None], n, axis=1)
+    kLa = np.ones(n)
+    for name, distribution in distributions.items():
+        if name == 'kLa':
+            kLa = Factors(distribution, n, rng)
+        else:
+            P[Kinetics.P_names.index(name)] *= Factors(distribution, n, rng)
+    return P, kLa
+
+def Schedule(point):
+    '''The control vector (U_names) and the initial state (15,) of a
+    Pareto-optimal point (Extract_point or OPT.Get_point).'''
+    u = np.array([point['FinalTime'], point['EUDH'], point['EGlucD'], point['EKdgD'],
+                  point['EKgsalDH'], point['ENOX'], point['A1'], point['A2'], point['A3'],
+                  point['t1'], point['t2'], point['t3'], point['kLai']], dtype=float)
+    X0 = SIM.Initial_state(u)
+    X0[1:10] = [point[name][0] for name in Kinetics.Substrates]
+    return u, X0
+
+def Simulate_chunk(u, X0, P, kLa, n = 51):
+    '''Simulates the schedule u from X0 under the parameter sets P (16 x N)
+    and the factors kLa (N,) on its kLa in one batch. Returns the yield and
+    the space-time yield of each set (N,).'''
+    U = np.repeat(u[None,:], P.shape[1], axis=0)
+    U[:,12] *= kLa
+    t, X = SIM.Simulate_batch(U, n, p = P, X0 = np.repeat(X0[:,None], P.shape[1], axis=1))
+    return (X[:,-1,6]-X[:,0,6])/X[:,0,1], X[:,-1,6]/(u[0]+30)
+
+def Propagate(points, P, kLa, chunk = 500, max_workers = None, n = 51):
+    '''Simulates every point under all parameter sets P (16 x N) and kLa
+    factors (N,), in chunks of chunk sets that are distributed over a process
+    pool. Returns the samples of the KPIs as a dict of arrays (points x N).
+    The enzyme and cofactor consumptions depend only on the schedule and are
+    repeated for every set.'''
+    N = P.shape[1]
+    samples = {name: np.empty((len(points), N)) for name in KPI_names}
+    with ProcessPoolExecutor(max_workers = max_workers) as pool:
+        futures = {}
+        for k, point in enumerate(points):
+            u, X0 = Schedule(point)
+            for j in range(0, N, chunk):
+                future = pool.submit(Simulate_chunk, u, X0, P[:,j:j+chunk], kLa[j:j+chunk], n)
+                futures[future] = (k, slice(j, j+chunk))
+        for future, (k, lanes) in futures.items():
+            samples['Yield'][k,lanes], samples['SpaceTimeYield'][k,lanes] = future.result()
+    samples['EnzymeConsumption'][:] = [[point['EnzymeConsumption']] for point in points]
+    samples['CofactorConsumption'][:] = [[point['CofactorConsumption']] for point in points]
+    return samples
+
+def Summary(samples, yield_bound = 0.95):
+    '''The mean, the standard deviation and the Percentiles of every KPI of
+    every point, and the probability that the yield bound of the
+    optimization holds.'''
+    summary = {}
+    for name in KPI_names:
+        summary[name + '_mean'] = samples[name].mean(axis=1)
+        summary[name + '_std'] = samples[name].std(axis=1)
+        for q, values in zip(Percentiles, np.percentile(samples[name], Percentiles, axis=1)):
+            summary['{}_p{}'.format(name, q)] = values
+    summary['P_yield'] = np.mean(samples['Yield'] >= yield_bound, axis=1)
+    return summary
+
+
+if __name__ == '__main__':
+    # the number of parameter sets, the seed and the number of lanes that a
+    # worker simulates at once
+    n_sets = 2000
+    seed = 0
+    chunk = 500
+    # the front whose points are evaluated
+    Results = OPT.Load_results('ParetoOptimalPoints.npz')
+    points = [OPT.Get_point(Results, k) for k in range(len(Results['ECi']))]
+
+    start = time.perf_counter()
+    P, kLa = Sample_parameters(n_sets, seed = seed)
+    samples = Propagate(points, P, kLa, chunk)
+    summary = Summary(samples)
+    print('{} points x {} parameter sets in {:.1f} s'.format(len(points), n_sets,
+                                                           time.perf_counter()-start))
+    for k, point in enumerate(points):
+        print('ECi = {:.3f}: STY {:.4f} (5-95 %: {:.4f}-{:.4f}), yield {:.3f} '
+              '(5-95 %: {:.3f}-{:.3f}), P(yield >= 0.95) = {:.2f}'.format(
+              point['ECi'], point['SpaceTimeYield'], summary['SpaceTimeYield_p5'][k],
+              summary['SpaceTimeYield_p95'][k], point['Yield'], summary['Yield_p5'][k],
+              summary['Yield_p95'][k], summary['P_yield'][k]))
+    np.savez_compressed('UncertaintyPoints.npz', parameters = P, kLa = kLa,
+                        **samples, **summary)
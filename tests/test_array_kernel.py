@@ -0,0 +1,15 @@
+'''Regression test of the array kernel of Simulation_CascadeMOO against the 
+dict-based Material_balances.'''
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Simulation_CascadeMOO as SIM
+
+
+def test_array_kernel_matches_material_balances():
+    # Check_array_kernel raises if a deviation exceeds its tolerance
+    err = SIM.Check_array_kernel()
+    assert set(err) == {'rhs', 'jacobian', 'trajectory'}
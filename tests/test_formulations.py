@@ -0,0 +1,23 @@
+'''Test that the compact formulation of FunctionforPF has the optimum of the 
+full one (Compare_formulations). It needs the IPOPT executable and is skipped 
+without it.'''
+
+import sys
+import os
+
+import pyomo.environ as pe
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Optimization1_CascadeMOO as OPT
+
+
+@pytest.mark.skipif(not pe.SolverFactory('ipopt').available(exception_flag=False), 
+                    reason='IPOPT is not installed')
+def test_compact_formulation_has_the_optimum_of_the_full_one():
+    report = OPT.Compare_formulations(0.1, nfe = 20, timeout = 600)
+    full, compact = report['full'], report['compact']
+    assert full['termination'] == compact['termination'] == str(pe.TerminationCondition.optimal)
+    assert compact['variables'] < full['variables']
+    assert compact['objective'] == pytest.approx(full['objective'], rel = 1e-4)
@@ -0,0 +1,23 @@
+'''Test of the Saltelli design and the Sobol index estimators of 
+Sensitivity_CascadeMOO on the Ishigami function, whose indices are known.'''
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Sensitivity_CascadeMOO as SA
+
+
+def Ishigami(X, a = 7, b = 0.1):
+    return np.sin(X[...,0])+a*np.sin(X[...,1])**2+b*X[...,2]**4*np.sin(X[...,0])
+
+
+def test_indices_of_the_ishigami_function():
+    design = SA.Saltelli_design(2**13, ranges = [(-np.pi, np.pi)]*3)
+    first, total = SA.Indices(Ishigami(design))
+    # the analytic indices for a = 7, b = 0.1
+    assert np.allclose(first, [0.3139, 0.4424, 0], atol = 0.02)
+    assert np.allclose(total, [0.5576, 0.4424, 0.2437], atol = 0.02)
@@ -0,0 +1,43 @@
+'''Tests of the simulation code: the odeint path (Simulate) against the 
+vectorized RODAS4 path (Simulate_batch) for every representation of the NOX 
+supplementations.'''
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Simulation_CascadeMOO as SIM
+
+
+def Schedules():
+    '''The default schedule, three perturbed ones and one whose third 
+    supplementation is at t_f (an impulse clipped to the end of the batch).'''
+    u = SIM.Control_vector()
+    U = [u] + [u*f for f in np.random.default_rng(3).uniform(0.5, 1.5, (3, 13))]
+    last = u.copy()
+    last[11] = last[0]
+    return np.array(U + [last])
+
+
+@pytest.mark.parametrize('pulses', ['tanh', 'impulse', 'segment'])
+def test_simulate_matches_simulate_batch(pulses):
+    U = Schedules()
+    T, XB = SIM.Simulate_batch(U, 50, pulses = pulses)
+    for u, t, Xb in zip(U, T, XB):
+        X = SIM.Simulate(u, t, pulses = pulses)
+        assert np.max(np.abs(X-Xb)) <= 1e-5*np.max(np.abs(X))
+
+
+@pytest.mark.parametrize('pulses', ['tanh', 'impulse', 'segment'])
+def test_simulate_batch_matches_tight_odeint(pulses):
+    # perturbed schedules against odeint with tight tolerances, state by state 
+    u = SIM.Control_vector()
+    U = np.array([u*f for f in np.random.default_rng(1).uniform(0.5, 1.5, (4, 13))])
+    T, XB = SIM.Simulate_batch(U, 50, pulses = pulses)
+    for u, t, Xb in zip(U, T, XB):
+        X = SIM.Simulate(u, t, pulses = pulses, rtol = 1e-10, atol = 1e-12)
+        assert np.all(np.abs(Xb-X) <= 1e-4*np.max(np.abs(X), axis=0))
@@ -0,0 +1,73 @@
+'''Tests of the epsilon-constraint sweep of Optimization1_CascadeMOO that do 
+not need IPOPT: the solver run is replaced by one that returns given 
+termination conditions without touching the model.'''
+
+import math
+import sys
+import os
+
+import pyomo.environ as pe
+import pytest
+from pyomo.opt import SolverResults
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Optimization1_CascadeMOO as OPT
+
+
+def Fake_solver(monkeypatch, conditions):
+    '''Replaces OPT.Run_solver by a run that returns the next termination 
+    condition of conditions and leaves the model values as they are.'''
+    conditions = iter(conditions)
+    def Run_solver(solver, model, tee, timeout):
+        results = SolverResults()
+        results.solver.termination_condition = next(conditions)
+        results.solver.status = (pe.SolverStatus.ok 
+                                 if results.solver.termination_condition == pe.TerminationCondition.optimal 
+                                 else pe.SolverStatus.aborted)
+        return results
+    monkeypatch.setattr(OPT, 'Run_solver', Run_solver)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_chain_goes_on_after_timed_out_cold_point(monkeypatch, compact):
+    # the cold first point times out on a model that was never solved (no 
+    # values, and 0/0 in the rate expressions of the compact model)
+    Fake_solver(monkeypatch, [pe.TerminationCondition.maxTimeLimit, 
+                              pe.TerminationCondition.optimal])
+    points = OPT.Sweep_chain([0.05, 0.1], tee = False, timeout = 1, nfe = 3, compact = compact)
+    assert len(points) == 2
+    assert points[0]['info1'] == str(pe.TerminationCondition.maxTimeLimit)
+    assert math.isnan(points[0]['SpaceTimeYield'])
+    assert math.isnan(points[0]['A1'])
+    assert points[0]['S1'].shape == points[0]['tau'].shape
+    assert all(math.isnan(value) for value in points[0]['v1'])
+    assert points[1]['info1'] == str(pe.TerminationCondition.optimal)
+    assert points[1]['ECi'] == 0.1
+
+
+def test_resumed_chain_warm_starts_from_nearer_cached_point(monkeypatch, tmp_path):
+    cache_dir = str(tmp_path/'cache')
+    checkpoint = str(tmp_path/'chain.pkl')
+    optimal = pe.TerminationCondition.optimal
+    # a cached point near the last epsilon value of the chain 
+    Fake_solver(monkeypatch, [optimal])
+    OPT.Sweep_chain([0.14], tee = False, cache_dir = cache_dir, nfe = 3)
+    # the chain stops after its second point (the third solve fails) 
+    Fake_solver(monkeypatch, [optimal, optimal])
+    with pytest.raises(StopIteration):
+        OPT.Sweep_chain([0.05, 0.1, 0.15], tee = False, cache_dir = cache_dir, 
+                        checkpoint = checkpoint, nfe = 3)
+    # on resuming, the model holds the solution of 0.1, so the cached point 
+    # 0.14 is nearer to 0.15 and its solution is loaded as well
+    loaded = []
+    Load_solution = OPT.Load_solution
+    def Spy(model, solution):
+        loaded.append(solution)
+        Load_solution(model, solution)
+    monkeypatch.setattr(OPT, 'Load_solution', Spy)
+    Fake_solver(monkeypatch, [optimal])
+    points = OPT.Sweep_chain([0.05, 0.1, 0.15], tee = False, cache_dir = cache_dir, 
+                             checkpoint = checkpoint, nfe = 3)
+    assert [point['ECi'] for point in points] == [0.05, 0.1, 0.15]
+    assert len(loaded) == 2